@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+"""
+热榜源基准测试与健康检查脚本
+
+录制模式（--record）真实请求各个源，把所有 HTTP 响应保存到目录；
+回放模式（--replay）在本地启动一个桩 HTTP 服务器回放录制的响应，所有 httpx 请求都被改写到
+桩服务器，从而在不访问真实网站的情况下离线测量各个源的解析性能。
+
+对每个源统计 p50/p95/p99 延迟、吞吐量、传输字节数和解析耗时（总耗时减去网络耗时），
+可与基线结果对比，发现性能回退时以非零状态码退出。
+
+注意：拦截基于 httpx.AsyncHTTPTransport，只对使用 httpx 异步客户端的源生效。
+"""
+import sys
+import asyncio
+import argparse
+import contextvars
+import hashlib
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+import httpx
+
+# 当前请求所属源的统计对象，供传输层拦截器记录网络耗时和字节数
+_current_stats: contextvars.ContextVar = contextvars.ContextVar("current_stats", default=None)
+
+# 回放时透传原始 URL 的请求头
+ORIGINAL_URL_HEADER = "X-Bench-Original-Url"
+
+
+class FetchStats:
+    """单次抓取的网络统计"""
+
+    def __init__(self):
+        self.network_time = 0.0
+        self.bytes = 0
+        self.requests = 0
+
+
+class Recording:
+    """录制的 HTTP 响应集合，按 "方法 URL" 索引"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.index_file = self.directory / "index.json"
+        self.index: Dict[str, Dict[str, Any]] = {}
+        if self.index_file.exists():
+            self.index = json.loads(self.index_file.read_text(encoding="utf-8"))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(method: str, url: str) -> str:
+        return f"{method.upper()} {url}"
+
+    def add(self, method: str, url: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        """保存一条响应"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        filename = hashlib.sha1(body).hexdigest() + ".bin"
+        (self.directory / filename).write_bytes(body)
+        with self._lock:
+            self.index[self.key(method, url)] = {
+                "status": status,
+                "content_type": headers.get("content-type", "application/octet-stream"),
+                "file": filename,
+            }
+
+    def save(self) -> None:
+        with self._lock:
+            self.index_file.write_text(json.dumps(self.index, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def lookup(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        """查找响应；精确匹配失败时忽略查询参数再匹配一次（时间戳等动态参数）"""
+        entry = self.index.get(self.key(method, url))
+        if entry is None:
+            prefix = self.key(method, url.split("?", 1)[0])
+            for key, value in self.index.items():
+                if key.split("?", 1)[0] == prefix:
+                    return value
+        return entry
+
+    def body(self, entry: Dict[str, Any]) -> bytes:
+        return (self.directory / entry["file"]).read_bytes()
+
+
+class StubServer:
+    """在后台线程中运行的本地桩 HTTP 服务器，回放录制的响应"""
+
+    def __init__(self, recording: Recording, latency: float = 0.0):
+        self.recording = recording
+        self.latency = latency
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        recording = self.recording
+        latency = self.latency
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _replay(self):
+                if latency:
+                    time.sleep(latency)
+                url = self.headers.get(ORIGINAL_URL_HEADER, "")
+                entry = recording.lookup(self.command, url)
+                if entry is None:
+                    body = f"no recording for {self.command} {url}".encode("utf-8")
+                    status, content_type = 404, "text/plain"
+                else:
+                    body = recording.body(entry)
+                    status, content_type = entry["status"], entry["content_type"]
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_HEAD = _replay
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def install_interceptor(recording: Optional[Recording] = None, record: bool = False,
+                        stub_url: Optional[str] = None) -> None:
+    """
+    拦截 httpx 异步传输层：统计网络耗时和字节数，并按需录制响应或改写到桩服务器
+
+    Args:
+        recording: 录制集合
+        record: 是否录制响应
+        stub_url: 桩服务器地址，设置后所有请求都被改写到该地址
+    """
+    original = httpx.AsyncHTTPTransport.handle_async_request
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        original_url = str(request.url)
+        if stub_url is not None:
+            request.headers[ORIGINAL_URL_HEADER] = original_url
+            request.url = httpx.URL(stub_url + "/replay")
+
+        start = time.perf_counter()
+        response = await original(self, request)
+        try:
+            raw = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        elapsed = time.perf_counter() - start
+
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.network_time += elapsed
+            stats.bytes += len(raw)
+            stats.requests += 1
+
+        # 用原始（可能压缩的）字节重建响应，由客户端照常解码
+        replayed = httpx.Response(response.status_code, headers=response.headers, content=raw,
+                                  extensions=response.extensions, request=request)
+        if record and recording is not None:
+            # 保存解码后的内容，回放时不再声明压缩
+            recording.add(request.method, original_url, response.status_code,
+                          dict(response.headers), replayed.content)
+        return replayed
+
+    httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered), max(1, math.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+async def run_benchmark(source_manager, source_ids: List[str], iterations: int,
+                        concurrency: int, timeout: float) -> Dict[str, Any]:
+    """并发运行所有源若干轮，返回汇总结果"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    samples: Dict[str, List[Dict[str, Any]]] = {source_id: [] for source_id in source_ids}
+
+    async def run_one(source_id: str) -> None:
+        async with semaphore:
+            stats = FetchStats()
+            _current_stats.set(stats)
+            start = time.perf_counter()
+            error = None
+            count = 0
+            try:
+                items = await asyncio.wait_for(source_manager.fetch_from_source(source_id), timeout)
+                count = len(items)
+            except Exception as e:
+                error = repr(e)
+            latency = time.perf_counter() - start
+            samples[source_id].append({
+                "latency": latency,
+                "network_time": stats.network_time,
+                "parse_time": max(0.0, latency - stats.network_time),
+                "bytes": stats.bytes,
+                "requests": stats.requests,
+                "items": count,
+                "error": error,
+            })
+
+    start = time.perf_counter()
+    # gather 为每个协程创建独立的任务和上下文，各自的统计对象互不干扰
+    await asyncio.gather(*[run_one(source_id) for _ in range(iterations) for source_id in source_ids])
+    wall_time = time.perf_counter() - start
+
+    results = {}
+    for source_id, runs in samples.items():
+        ok = [r for r in runs if r["error"] is None]
+        latencies = [r["latency"] for r in ok]
+        results[source_id] = {
+            "runs": len(runs),
+            "errors": len(runs) - len(ok),
+            "last_error": next((r["error"] for r in reversed(runs) if r["error"]), None),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "parse_time": sum(r["parse_time"] for r in ok) / len(ok) if ok else 0.0,
+            "bytes": sum(r["bytes"] for r in ok) / len(ok) if ok else 0,
+            "items": ok[-1]["items"] if ok else 0,
+        }
+    total_ok = sum(r["runs"] - r["errors"] for r in results.values())
+    return {
+        "wall_time": wall_time,
+        "throughput": total_ok / wall_time if wall_time else 0.0,
+        "total_bytes": sum(r["bytes"] * (r["runs"] - r["errors"]) for r in results.values()),
+        "sources": results,
+    }
+
+
+def print_report(report: Dict[str, Any], source_manager) -> None:
+    """打印基准测试结果"""
+    print(f"\n{'源':<20}{'成功/总数':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}"
+          f"{'解析(ms)':>10}{'字节':>10}{'条目':>6}")
+    for source_id, r in report["sources"].items():
+        print(f"{source_id:<20}{r['runs'] - r['errors']:>5}/{r['runs']:<4}"
+              f"{r['p50'] * 1000:>10.1f}{r['p95'] * 1000:>10.1f}{r['p99'] * 1000:>10.1f}"
+              f"{r['parse_time'] * 1000:>10.1f}{r['bytes']:>10.0f}{r['items']:>6}")
+    print(f"\n总耗时: {report['wall_time']:.2f}秒, 吞吐量: {report['throughput']:.1f} 次/秒, "
+          f"传输: {report['total_bytes'] / 1024:.1f} KB")
+
+    failed = [source_id for source_id, r in report["sources"].items() if r["errors"]]
+    if failed:
+        print("\n以下源存在失败:")
+        for source_id in failed:
+            source = source_manager.get_source(source_id)
+            print(f"- {source_id} ({source.name}): {report['sources'][source_id]['last_error']}")
+
+
+def compare_baseline(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """与基线比较 p95 和解析耗时，返回发生回退的描述"""
+    regressions = []
+    for source_id, r in report["sources"].items():
+        base = baseline.get("sources", {}).get(source_id)
+        if not base:
+            continue
+        for metric in ("p95", "parse_time"):
+            if base[metric] > 0 and r[metric] > base[metric] * threshold:
+                regressions.append(f"{source_id} {metric}: {base[metric] * 1000:.1f}ms -> {r[metric] * 1000:.1f}ms")
+    return regressions
+
+
+def main():
+    """主函数，运行基准测试"""
+    # 将当前目录添加到模块搜索路径，以便导入rag_news模块
+    sys.path.insert(0, ".")
+
+    from rag_news.sources import source_manager
+
+    parser = argparse.ArgumentParser(description="热榜源基准测试")
+    parser.add_argument("-s", "--source", action="append", help="只测试指定的源ID，可重复指定")
+    parser.add_argument("-n", "--iterations", type=int, default=5, help="每个源的运行轮数")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="并发数")
+    parser.add_argument("--timeout", type=float, default=30, help="单次抓取超时时间（秒）")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", metavar="DIR", help="真实请求并把响应录制到目录（只运行一轮）")
+    mode.add_argument("--replay", metavar="DIR", help="从目录回放录制的响应")
+    parser.add_argument("--latency", type=float, default=0.0, help="回放时桩服务器附加的延迟（秒）")
+    parser.add_argument("--json", help="把结果保存为 JSON 文件")
+    parser.add_argument("--baseline", help="与之比较的基线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=1.2, help="超过基线多少倍视为性能回退")
+    args = parser.parse_args()
+
+    source_ids = args.source or list(source_manager.get_all_sources().keys())
+    unknown = [s for s in source_ids if s not in source_manager.get_all_sources()]
+    if unknown:
+        print(f"未知的源ID: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(2)
+
+    stub = None
+    recording = None
+    iterations = args.iterations
+    if args.record:
+        recording = Recording(args.record)
+        install_interceptor(recording, record=True)
+        iterations = 1
+    elif args.replay:
+        recording = Recording(args.replay)
+        stub = StubServer(recording, args.latency)
+        stub.start()
+        install_interceptor(stub_url=stub.base_url)
+        print(f"桩服务器已启动: {stub.base_url}，回放 {len(recording.index)} 条响应")
+    else:
+        install_interceptor()
+
+    print(f"开始测试 {len(source_ids)} 个热榜源，每个 {iterations} 轮，并发 {args.concurrency}...")
+    try:
+        report = asyncio.run(run_benchmark(source_manager, source_ids, iterations,
+                                           args.concurrency, args.timeout))
+    finally:
+        if stub is not None:
+            stub.stop()
+        if args.record:
+            recording.save()
+            print(f"已录制 {len(recording.index)} 条响应到 {args.record}")
+
+    print_report(report, source_manager)
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"结果已保存到 {args.json}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare_baseline(report, baseline, args.threshold)
+        if regressions:
+            print("\n性能回退:")
+            for line in regressions:
+                print(f"- {line}")
+            sys.exit(1)
+        print("\n未发现性能回退")
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,7 @@ from rag_news.core.database import get_db
 from rag_news.core.models.knowledge_base import KnowledgeBase, KnowledgeFile
 from rag_news.api.auth_utils import get_current_active_user
 from rag_news.core.models.user import User
+from rag_news.core.services.knowledge_file_processor import knowledge_file_processor, parsed_output_path
 
 # 创建路由
 kb_router = APIRouter(prefix="/knowledge-base", tags=["知识库"])
@@ -212,6 +213,9 @@ async def upload_file(
     db.commit()
     db.refresh(new_file)
     
+    # 后台解析，状态由 pending 变为 processing -> completed / error
+    knowledge_file_processor.submit(new_file.id)
+    
     return new_file
 
 # 获取知识库的所有文件
@@ -285,9 +289,15 @@ async def delete_file(
             detail="文件不存在"
         )
     
+    # 先终止正在进行的解析，否则解析子进程可能在删除后重新写出解析结果
+    await knowledge_file_processor.cancel(file_id)
+
     # 删除文件
     if os.path.exists(file.file_path):
         os.remove(file.file_path)
+    parsed_path = parsed_output_path(file.file_path)
+    if os.path.exists(parsed_path):
+        os.remove(parsed_path)
     
     # 删除数据库记录
     db.delete(file)
@@ -17,6 +17,7 @@ from rag_news.core.models.knowledge_base import KnowledgeBase, KnowledgeFile
 # 最后导入路由
 from rag_news.api.auth_routes import router as auth_router
 from rag_news.api.knowledge_base_routes import kb_router
+from rag_news.core.services.knowledge_file_processor import knowledge_file_processor
 
 # 创建数据库表
 Base.metadata.create_all(bind=engine)
@@ -27,9 +28,11 @@ async def lifespan(app: FastAPI):
     """应用程序生命周期事件处理器"""
     # 启动时执行
     create_test_user()
+    # 重新排队上次没有解析完的知识库文件
+    knowledge_file_processor.resume()
     yield
     # 关闭时执行
-    pass
+    await knowledge_file_processor.close()
 
 
 # 创建测试用户函数
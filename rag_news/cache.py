@@ -1,8 +1,26 @@
 import json
 import time
 import os
+import re
+import sys
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+
+import orjson
+import zstandard
+
+
+def _estimate_size(value: Any) -> int:
+    """估算缓存值占用的字节数（按序列化后的长度近似）"""
+    try:
+        return len(orjson.dumps(value))
+    except TypeError:
+        return sys.getsizeof(value)
 
 class Cache:
     """缓存基类"""
@@ -18,39 +36,211 @@ class Cache:
         
     def get(self, key: str) -> Optional[Dict[str, Any]]:
         """获取缓存数据"""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """获取缓存数据及其写入时间戳，不存在或过期返回None"""
+        record = self.get_record(key)
+        return record[:2] if record is not None else None
+
+    def get_record(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """获取缓存数据、写入时间戳及本条目的过期时间（秒），不存在或过期返回None"""
         raise NotImplementedError
         
-    def set(self, key: str, value: Dict[str, Any]) -> None:
-        """设置缓存数据"""
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None,
+            timestamp: Optional[float] = None) -> None:
+        """
+        设置缓存数据
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 本条目的过期时间（秒），默认使用实例的 ttl
+            timestamp: 条目的原始写入时间，默认当前时间；在层级缓存间复制时用于保留数据年龄
+        """
         raise NotImplementedError
 
+    def delete(self, key: str) -> None:
+        """删除缓存数据"""
+        raise NotImplementedError
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """批量获取缓存数据，只返回命中的键"""
+        result = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None,
+                 timestamp: Optional[float] = None) -> None:
+        """批量设置缓存数据"""
+        for key, value in items.items():
+            self.set(key, value, ttl, timestamp)
+
+    def set_entries(self, entries: Dict[str, Tuple[Any, Optional[float], Optional[float]]]) -> None:
+        """批量设置缓存数据，每个条目带各自的 (value, ttl, timestamp)"""
+        for key, (value, ttl, timestamp) in entries.items():
+            self.set(key, value, ttl, timestamp)
+
 
 class MemoryCache(Cache):
-    """内存缓存实现"""
-    
-    def __init__(self, ttl: int = 1800):
+    """内存缓存实现
+
+    基于 OrderedDict 的 LRU 缓存，支持条目数上限与近似字节上限，
+    超出任一上限时以 O(1) 代价淘汰最久未使用的条目。可选的后台清理线程
+    会定期批量删除过期条目，避免长时间运行的进程内存只增不减。
+    """
+
+    def __init__(self, ttl: int = 1800, max_entries: int = 10000,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 sweep_interval: Optional[float] = None):
+        """
+        初始化内存缓存
+
+        Args:
+            ttl: 缓存过期时间（秒），默认30分钟
+            max_entries: 最大条目数，0 表示不限制
+            max_bytes: 近似字节上限（按序列化后大小估算），0 表示不限制
+            sweep_interval: 后台过期清理间隔（秒），None 表示不启动清理线程
+        """
         super().__init__(ttl)
-        self.cache: Dict[str, Dict[str, Any]] = {}
-        
-    def get(self, key: str) -> Optional[Dict[str, Any]]:
-        """获取缓存数据，如果不存在或过期返回None"""
-        if key not in self.cache:
-            return None
-            
-        data = self.cache[key]
-        # 检查缓存是否过期
-        if time.time() - data['timestamp'] > self.ttl:
-            del self.cache[key]
-            return None
-            
-        return data['value']
-        
-    def set(self, key: str, value: Dict[str, Any]) -> None:
-        """设置缓存数据"""
-        self.cache[key] = {
-            'value': value,
-            'timestamp': time.time()
-        }
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (value, timestamp, expire_at, size)
+        self.cache: "OrderedDict[str, Tuple[Any, float, float, int]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.RLock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        if sweep_interval:
+            self.start_sweeper(sweep_interval)
+
+    def get_record(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """获取缓存数据、写入时间戳及过期时间，如果不存在或过期返回None"""
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            # 检查缓存是否过期
+            if time.time() > entry[2]:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1], entry[2] - entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None,
+            timestamp: Optional[float] = None) -> None:
+        """设置缓存数据
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 本条目的过期时间（秒），默认使用实例的 ttl
+            timestamp: 条目的原始写入时间，默认当前时间
+        """
+        size = _estimate_size(value)
+        now = time.time() if timestamp is None else timestamp
+        expire_at = now + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            if key in self.cache:
+                self._remove(key)
+            # 单个条目超过字节上限时直接放弃缓存
+            if self.max_bytes and size > self.max_bytes:
+                return
+            self.cache[key] = (value, now, expire_at, size)
+            self.total_bytes += size
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        """删除缓存数据"""
+        with self._lock:
+            if key in self.cache:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self.cache.clear()
+            self.total_bytes = 0
+
+    def purge_expired(self) -> int:
+        """批量删除所有过期条目，返回删除数量"""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, entry in self.cache.items() if now > entry[2]]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def start_sweeper(self, interval: float = 60) -> None:
+        """启动后台过期清理线程"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop_event.clear()
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop, args=(interval,),
+            name="MemoryCacheSweeper", daemon=True
+        )
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """停止后台过期清理线程"""
+        self._stop_event.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.cache),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def _sweep_loop(self, interval: float) -> None:
+        """后台清理循环"""
+        while not self._stop_event.wait(interval):
+            self.purge_expired()
+
+    def _remove(self, key: str) -> None:
+        """删除条目并更新字节统计（调用方需持有锁）"""
+        entry = self.cache.pop(key)
+        self.total_bytes -= entry[3]
+
+    def _evict(self) -> None:
+        """按 LRU 顺序淘汰条目直到满足上限（调用方需持有锁）"""
+        while self.cache and (
+            (self.max_entries and len(self.cache) > self.max_entries)
+            or (self.max_bytes and self.total_bytes > self.max_bytes)
+        ):
+            _, entry = self.cache.popitem(last=False)
+            self.total_bytes -= entry[3]
+            self.evictions += 1
 
 
 class FileCache(Cache):
@@ -72,8 +262,8 @@ class FileCache(Cache):
         """获取缓存文件路径"""
         return self.cache_dir / f"{key}.json"
         
-    def get(self, key: str) -> Optional[Dict[str, Any]]:
-        """从文件获取缓存数据"""
+    def get_record(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """从文件获取缓存数据、写入时间戳及过期时间"""
         cache_file = self._get_cache_path(key)
         
         if not cache_file.exists():
@@ -84,16 +274,18 @@ class FileCache(Cache):
                 data = json.load(f)
                 
             # 检查缓存是否过期
-            if time.time() - data['timestamp'] > self.ttl:
+            ttl = data.get('ttl', self.ttl)
+            if time.time() - data['timestamp'] > ttl:
                 os.remove(cache_file)
                 return None
                 
-            return data['value']
+            return data['value'], data['timestamp'], ttl
         except Exception as e:
             print(f"读取缓存失败: {e}")
             return None
             
-    def set(self, key: str, value: Dict[str, Any]) -> None:
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None,
+            timestamp: Optional[float] = None) -> None:
         """将数据缓存到文件"""
         cache_file = self._get_cache_path(key)
         
@@ -101,14 +293,463 @@ class FileCache(Cache):
             with open(cache_file, 'w', encoding='utf-8') as f:
                 json.dump({
                     'value': value,
-                    'timestamp': time.time()
+                    'timestamp': time.time() if timestamp is None else timestamp,
+                    'ttl': self.ttl if ttl is None else ttl
                 }, f, ensure_ascii=False)
         except Exception as e:
             print(f"写入缓存失败: {e}")
 
+    def delete(self, key: str) -> None:
+        """删除缓存数据"""
+        cache_file = self._get_cache_path(key)
+        if cache_file.exists():
+            os.remove(cache_file)
+
+
+class ShardedFileCache(Cache):
+    """分片文件缓存实现
+
+    键经过哈希后分散到两级子目录（如 ``ab/cd/<key>.<hash>.cache``），避免单个目录
+    中堆积数万个文件。写入采用“临时文件 + 原子重命名”，进程中途崩溃不会留下
+    半写的条目；读取时遇到损坏的条目会直接删除，不会反复失败。数据使用 orjson
+    序列化，可选 zstd 压缩，读取时按帧头自动识别是否压缩。
+    """
+
+    SUFFIX = ".cache"
+    ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+    def __init__(self, cache_dir: str = 'cache', ttl: int = 1800, compress: bool = True,
+                 compress_level: int = 3, fsync: bool = False):
+        """
+        初始化分片文件缓存
+
+        Args:
+            cache_dir: 缓存目录
+            ttl: 缓存过期时间（秒）
+            compress: 是否使用 zstd 压缩写入
+            compress_level: zstd 压缩级别
+            fsync: 重命名前是否 fsync，牺牲写入速度换取掉电安全
+        """
+        super().__init__(ttl)
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True, parents=True)
+        self.compress = compress
+        self.compress_level = compress_level
+        self.fsync = fsync
+        # zstd 压缩/解压对象不能被多个线程同时使用，按线程各自持有
+        self._local = threading.local()
+
+    @staticmethod
+    def _sanitize_key(key: str) -> str:
+        """将键转换为可读且安全的文件名前缀"""
+        return re.sub(r'[^A-Za-z0-9_.-]', '_', key)[:64].strip('.') or '_'
+
+    def _get_cache_path(self, key: str) -> Path:
+        """获取缓存文件路径"""
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        name = f"{self._sanitize_key(key)}.{digest[:16]}{self.SUFFIX}"
+        return self.cache_dir / digest[:2] / digest[2:4] / name
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        if not hasattr(self._local, 'compressor'):
+            self._local.compressor = zstandard.ZstdCompressor(level=self.compress_level)
+        return self._local.compressor
+
+    def _decompressor(self) -> zstandard.ZstdDecompressor:
+        if not hasattr(self._local, 'decompressor'):
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local.decompressor
+
+    def _encode(self, payload: Dict[str, Any]) -> bytes:
+        data = orjson.dumps(payload)
+        if self.compress:
+            data = self._compressor().compress(data)
+        return data
+
+    def _decode(self, data: bytes) -> Dict[str, Any]:
+        if data[:4] == self.ZSTD_MAGIC:
+            data = self._decompressor().decompress(data)
+        return orjson.loads(data)
+
+    def get_record(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """从文件获取缓存数据、写入时间戳及过期时间"""
+        cache_file = self._get_cache_path(key)
+
+        try:
+            data = self._decode(cache_file.read_bytes())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # 损坏的条目直接删除，下次重新获取
+            print(f"读取缓存失败，已删除损坏条目 {cache_file}: {e}")
+            self._unlink(cache_file)
+            return None
+
+        # 哈希冲突或过期
+        if data.get('key') != key:
+            return None
+        if time.time() > data['expire_at']:
+            self._unlink(cache_file)
+            return None
+
+        return data['value'], data['timestamp'], data['expire_at'] - data['timestamp']
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None,
+            timestamp: Optional[float] = None) -> None:
+        """原子地将数据缓存到文件"""
+        cache_file = self._get_cache_path(key)
+        now = time.time() if timestamp is None else timestamp
+
+        try:
+            data = self._encode({
+                'key': key,
+                'value': value,
+                'timestamp': now,
+                'expire_at': now + (self.ttl if ttl is None else ttl),
+            })
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_file.parent, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                os.replace(tmp_path, cache_file)
+            except BaseException:
+                self._unlink(Path(tmp_path))
+                raise
+        except Exception as e:
+            print(f"写入缓存失败: {e}")
+
+    def delete(self, key: str) -> None:
+        """删除缓存数据"""
+        self._unlink(self._get_cache_path(key))
+
+    def purge_expired(self) -> int:
+        """遍历所有分片删除过期、损坏及残留的临时文件，返回删除数量"""
+        removed = 0
+        now = time.time()
+        for path in self.cache_dir.glob('*/*/*'):
+            if path.name.startswith('.tmp-'):
+                # 残留的临时文件只在足够旧时清理，避免误删正在写入的文件
+                try:
+                    stale = now - path.stat().st_mtime > 3600
+                except FileNotFoundError:
+                    continue
+                if stale:
+                    self._unlink(path)
+                    removed += 1
+                continue
+            if path.suffix != self.SUFFIX:
+                continue
+            try:
+                expired = now > self._decode(path.read_bytes())['expire_at']
+            except FileNotFoundError:
+                continue
+            except Exception:
+                expired = True
+            if expired:
+                self._unlink(path)
+                removed += 1
+        return removed
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SQLiteCache(Cache):
+    """SQLite 缓存实现
+
+    所有条目存放在单个 WAL 模式的 SQLite 文件中，过期时间列带索引，
+    批量读写在一条语句/一个事务内完成。单文件存储便于在主机之间拷贝。
+    """
+
+    def __init__(self, db_path: str = 'cache/cache.db', ttl: int = 1800):
+        """
+        初始化 SQLite 缓存
+
+        Args:
+            db_path: 数据库文件路径
+            ttl: 缓存过期时间（秒）
+        """
+        super().__init__(ttl)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(exist_ok=True, parents=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "timestamp REAL NOT NULL, expire_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expire_at ON cache (expire_at)")
+
+    def get_record(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """获取缓存数据、写入时间戳及过期时间，如果不存在或过期返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, timestamp, expire_at FROM cache WHERE key = ? AND expire_at >= ?",
+                (key, time.time())
+            ).fetchone()
+        return (orjson.loads(row[0]), row[1], row[2] - row[1]) if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None,
+            timestamp: Optional[float] = None) -> None:
+        """设置缓存数据"""
+        self.set_many({key: value}, ttl, timestamp)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """批量获取缓存数据，只返回命中的键"""
+        result = {}
+        now = time.time()
+        # SQLite 默认最多 999 个绑定参数，按批查询
+        with self._lock:
+            for i in range(0, len(keys), 900):
+                batch = keys[i:i + 900]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND expire_at >= ?",
+                    (*batch, now)
+                ).fetchall()
+                for key, value in rows:
+                    result[key] = orjson.loads(value)
+        return result
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None,
+                 timestamp: Optional[float] = None) -> None:
+        """在一个事务中批量设置缓存数据"""
+        self.set_entries({key: (value, ttl, timestamp) for key, value in items.items()})
+
+    def set_entries(self, entries: Dict[str, Tuple[Any, Optional[float], Optional[float]]]) -> None:
+        """在一个事务中批量设置各自带 (value, ttl, timestamp) 的缓存数据"""
+        now = time.time()
+        rows = []
+        for key, (value, ttl, timestamp) in entries.items():
+            written = now if timestamp is None else timestamp
+            rows.append((key, orjson.dumps(value), written, written + (self.ttl if ttl is None else ttl)))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value, timestamp, expire_at) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, key: str) -> None:
+        """删除缓存数据"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self, vacuum: bool = True) -> int:
+        """删除所有过期条目并可选地回收磁盘空间，返回删除数量"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM cache WHERE expire_at < ?", (time.time(),))
+            removed = cursor.rowcount
+            if vacuum and removed:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._conn.execute("VACUUM")
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache(Cache):
+    """层级缓存
+
+    按从快到慢的顺序组合多个缓存后端。读取时逐层查找，命中较慢层时按提升策略
+    复制到较快层（保留原始写入时间）；写入支持写穿（同步写所有层）和写回
+    （只写最快层，累积后批量刷到其余层）两种策略。另外支持对失败的请求做短期
+    负缓存，并分层统计命中率。
+    """
+
+    PROMOTE_ALL = 'all'  # 复制到所有更快的层
+    PROMOTE_TOP = 'top'  # 只复制到最快的一层
+    PROMOTE_NONE = 'none'  # 不提升
+
+    WRITE_THROUGH = 'write_through'
+    WRITE_BACK = 'write_back'
+
+    NEGATIVE_MARKER = '__negative__'
+
+    def __init__(self, tiers: List[Cache], promotion: str = PROMOTE_ALL,
+                 write_policy: str = WRITE_THROUGH, negative_ttl: float = 60,
+                 write_back_batch: int = 100):
+        """
+        初始化层级缓存
+
+        Args:
+            tiers: 缓存后端列表，按从快到慢排列
+            promotion: 提升策略，'all' / 'top' / 'none'
+            write_policy: 写入策略，'write_through' / 'write_back'
+            negative_ttl: 负缓存过期时间（秒）
+            write_back_batch: 写回模式下累积多少条脏数据后自动刷盘
+        """
+        if not tiers:
+            raise ValueError("至少需要一个缓存层")
+        if promotion not in (self.PROMOTE_ALL, self.PROMOTE_TOP, self.PROMOTE_NONE):
+            raise ValueError(f"未知的提升策略: {promotion}")
+        if write_policy not in (self.WRITE_THROUGH, self.WRITE_BACK):
+            raise ValueError(f"未知的写入策略: {write_policy}")
+        super().__init__(tiers[0].ttl)
+        self.tiers = tiers
+        self.promotion = promotion
+        self.write_policy = write_policy
+        self.negative_ttl = negative_ttl
+        self.write_back_batch = write_back_batch
+        self._lock = threading.RLock()
+        # 写回模式下尚未写入较慢层的条目: key -> (value, ttl, timestamp)
+        self._dirty: "OrderedDict[str, Tuple[Any, Optional[float], float]]" = OrderedDict()
+        self.tier_hits = [0] * len(tiers)
+        self.tier_misses = [0] * len(tiers)
+        self.misses = 0
+        self.negative_hits = 0
+        self.promotions = 0
+
+    @classmethod
+    def is_negative(cls, value: Any) -> bool:
+        """判断缓存值是否为负缓存标记"""
+        return isinstance(value, dict) and value.get(cls.NEGATIVE_MARKER) is True
+
+    def get_record(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """
+        逐层获取缓存数据、写入时间戳及过期时间
+
+        负缓存条目也会返回，调用方可用 is_negative 判断。
+        """
+        for i, tier in enumerate(self.tiers):
+            entry = tier.get_record(key)
+            if entry is None and i == 0:
+                # 最快层中已被淘汰但尚未写回的条目
+                entry = self._get_dirty(key)
+            if entry is None:
+                self.tier_misses[i] += 1
+                continue
+
+            self.tier_hits[i] += 1
+            if self.is_negative(entry[0]):
+                self.negative_hits += 1
+            elif i > 0:
+                self._promote(key, entry, i)
+            return entry
+
+        self.misses += 1
+        return None
+
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存数据，未命中或命中负缓存时返回None"""
+        entry = self.get_entry(key)
+        if entry is None or self.is_negative(entry[0]):
+            return None
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None,
+            timestamp: Optional[float] = None) -> None:
+        """按写入策略设置缓存数据"""
+        self.tiers[0].set(key, value, ttl, timestamp)
+        if len(self.tiers) == 1:
+            return
+
+        if self.write_policy == self.WRITE_THROUGH:
+            for tier in self.tiers[1:]:
+                tier.set(key, value, ttl, timestamp)
+            return
+
+        with self._lock:
+            self._dirty[key] = (value, ttl, time.time() if timestamp is None else timestamp)
+            self._dirty.move_to_end(key)
+            should_flush = len(self._dirty) >= self.write_back_batch
+        if should_flush:
+            self.flush()
+
+    def set_negative(self, key: str, error: str = '', ttl: Optional[float] = None) -> None:
+        """为失败的请求写入负缓存，只写最快层"""
+        self.tiers[0].set(key, {self.NEGATIVE_MARKER: True, 'error': error},
+                          self.negative_ttl if ttl is None else ttl)
+
+    def delete(self, key: str) -> None:
+        """从所有层删除缓存数据"""
+        with self._lock:
+            self._dirty.pop(key, None)
+        for tier in self.tiers:
+            tier.delete(key)
+
+    def flush(self) -> int:
+        """将写回模式下的脏数据批量写入较慢的层，返回写入条目数"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, OrderedDict()
+        if not dirty:
+            return 0
+
+        # 保留每个条目原始的写入时间和 ttl，较慢层中的过期时间与最快层一致
+        for tier in self.tiers[1:]:
+            tier.set_entries(dirty)
+        return len(dirty)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回分层命中统计"""
+        tiers = []
+        for tier, hits, misses in zip(self.tiers, self.tier_hits, self.tier_misses):
+            lookups = hits + misses
+            tiers.append({
+                'name': type(tier).__name__,
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+            })
+        hits = sum(self.tier_hits)
+        lookups = hits + self.misses
+        return {
+            'tiers': tiers,
+            'hits': hits,
+            'misses': self.misses,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+            'negative_hits': self.negative_hits,
+            'promotions': self.promotions,
+            'dirty': len(self._dirty),
+        }
+
+    def _get_dirty(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        with self._lock:
+            if key not in self._dirty:
+                return None
+            value, ttl, timestamp = self._dirty[key]
+        return value, timestamp, self.tiers[0].ttl if ttl is None else ttl
+
+    def _promote(self, key: str, entry: Tuple[Any, float, float], hit_tier: int) -> None:
+        """按提升策略将较慢层命中的条目连同原始写入时间和 ttl 复制到较快层"""
+        if self.promotion == self.PROMOTE_NONE:
+            return
+        targets = self.tiers[:1] if self.promotion == self.PROMOTE_TOP else self.tiers[:hit_tier]
+        value, timestamp, ttl = entry
+        for tier in targets:
+            tier.set(key, value, ttl, timestamp)
+            self.promotions += 1
+
+
+# 默认使用内存缓存，每5分钟批量清理一次过期条目
+memory_cache = MemoryCache(sweep_interval=300)
 
-# 默认使用内存缓存
-memory_cache = MemoryCache()
+# 文件缓存实例，默认缓存目录为 'cache'，按哈希分片并使用 zstd 压缩
+file_cache = ShardedFileCache()
 
-# 文件缓存实例，默认缓存目录为 'cache'
-file_cache = FileCache() 
\ No newline at end of file
+# 热榜源数据的层级缓存：内存 -> 文件
+source_cache = TieredCache([memory_cache, file_cache])
@@ -0,0 +1,254 @@
+"""
+@comment: 支持条件请求（ETag / Last-Modified）的 HTTP 连接器
+
+按 URL 持久化服务端返回的 ETag 和 Last-Modified，下次请求时带上 If-None-Match /
+If-Modified-Since。服务端返回 304 时直接短路，调用方无需再解析和处理下游。
+对不支持条件请求的服务端，退而比较响应体哈希，内容未变同样视为未修改。
+
+校验信息不会在收到响应时立即保存：调用方处理完响应体后调用 commit，处理失败或中途放弃时
+下次请求仍会完整下载，不会因为 304 而漏掉没处理完的内容。
+
+用法:
+    url = "http://www.chinanews.com.cn/rss/scroll-news.xml"
+    async with ConditionalClient() as client:
+        response = await client.get(url)
+        if response.not_modified:
+            return
+        parse(response.text)
+        client.commit(url, response)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Union
+
+import httpx
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+
+class ValidatorStore:
+    """按 URL 持久化缓存校验信息"""
+
+    def __init__(self, path: str = 'cache/http_validators.json', autosave: int = 50):
+        """
+        初始化校验信息存储
+
+        Args:
+            path: 持久化文件路径
+            autosave: 累计多少次更新后自动落盘，0 表示只在显式调用 save 时落盘
+        """
+        self.path = path
+        self.autosave = autosave
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._data: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            print(f"加载校验信息失败: {e}")
+            return {}
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._data.get(url)
+
+    def update(self, url: str, etag: Optional[str], last_modified: Optional[str], digest: Optional[str]) -> None:
+        with self._lock:
+            self._data[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "digest": digest,
+                "updated_at": time.time(),
+            }
+            self._dirty += 1
+            should_save = self.autosave and self._dirty >= self.autosave
+        if should_save:
+            self.save()
+
+    def delete(self, url: str) -> None:
+        with self._lock:
+            if self._data.pop(url, None) is not None:
+                self._dirty += 1
+
+    def save(self) -> None:
+        """原子地写入持久化文件"""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._data)
+            self._dirty = 0
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"保存校验信息失败: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+class ConditionalResponse:
+    """条件请求结果"""
+
+    def __init__(self, url: str, status_code: int, not_modified: bool,
+                 content: bytes = b"", encoding: Optional[str] = None,
+                 headers: Optional[httpx.Headers] = None, digest: Optional[str] = None):
+        self.url = url
+        self.status_code = status_code
+        # 服务端返回 304，或响应体与上次完全相同
+        self.not_modified = not_modified
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self.headers = headers or httpx.Headers()
+        # 响应体哈希，commit 时与 ETag / Last-Modified 一起保存
+        self.digest = digest
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+
+class ConditionalClient:
+    """带条件请求的异步 HTTP 客户端"""
+
+    def __init__(self, store: Optional[ValidatorStore] = None, timeout: float = 10,
+                 max_connections: int = 100, headers: Optional[Dict[str, str]] = None,
+                 client: Optional[httpx.AsyncClient] = None):
+        """
+        初始化客户端
+
+        Args:
+            store: 校验信息存储，默认使用模块级共享实例
+            timeout: 请求超时时间（秒）
+            max_connections: 连接池最大连接数
+            headers: 额外的默认请求头
+            client: 复用已有的 httpx.AsyncClient，关闭时不会关闭它
+        """
+        self.store = store or validator_store
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            headers={**DEFAULT_HEADERS, **(headers or {})},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self.stats = {"requests": 0, "not_modified": 0, "unchanged_body": 0, "modified": 0}
+
+    async def __aenter__(self) -> "ConditionalClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._owns_client:
+            await self.client.aclose()
+        self.store.save()
+
+    def _conditional_headers(self, url: str, headers: Optional[Dict[str, str]],
+                             force: bool) -> tuple:
+        request_headers = dict(headers or {})
+        validators = None if force else self.store.get(url)
+        if validators:
+            if validators.get("etag"):
+                request_headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                request_headers["If-Modified-Since"] = validators["last_modified"]
+        return request_headers, validators
+
+    def commit(self, url: str, response: Union[ConditionalResponse, httpx.Response]) -> None:
+        """
+        响应处理完成后保存校验信息，之后对同一 URL 的请求才会带上条件请求头
+
+        Args:
+            url: 请求时使用的地址（重定向前）
+            response: get() 返回的 ConditionalResponse，或 stream() 得到的 httpx.Response
+        """
+        if response is None or response.status_code == 304:
+            return
+        digest = response.digest if isinstance(response, ConditionalResponse) else None
+        self.store.update(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), digest)
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+                  force: bool = False, encoding: Optional[str] = None) -> ConditionalResponse:
+        """
+        发起条件 GET 请求
+
+        Args:
+            url: 请求地址
+            headers: 额外请求头
+            force: 忽略已保存的校验信息，强制完整下载
+            encoding: 强制指定响应编码
+
+        Returns:
+            ConditionalResponse，not_modified 为 True 时 content 为空；处理完成后调用 commit 保存校验信息
+
+        Raises:
+            httpx.HTTPError: 请求失败或服务端返回错误状态码
+        """
+        request_headers, validators = self._conditional_headers(url, headers, force)
+        self.stats["requests"] += 1
+        response = await self.client.get(url, headers=request_headers)
+
+        if response.status_code == 304:
+            self.stats["not_modified"] += 1
+            return ConditionalResponse(url, 304, True, headers=response.headers)
+
+        response.raise_for_status()
+        content = response.content
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        unchanged = bool(validators) and validators.get("digest") == digest
+        self.stats["unchanged_body" if unchanged else "modified"] += 1
+        return ConditionalResponse(
+            url, response.status_code, unchanged,
+            content=b"" if unchanged else content,
+            encoding=encoding or response.encoding,
+            headers=response.headers,
+            digest=digest,
+        )
+
+    @asynccontextmanager
+    async def stream(self, url: str, headers: Optional[Dict[str, str]] = None,
+                     force: bool = False) -> AsyncIterator[Optional[httpx.Response]]:
+        """
+        流式条件 GET 请求，304 时得到 None，否则得到尚未读取响应体的 httpx.Response
+
+        流式读取不做响应体哈希比较；调用方完整处理响应体后调用 commit(url, response) 保存 ETag / Last-Modified。
+
+        Raises:
+            httpx.HTTPError: 请求失败或服务端返回错误状态码
+        """
+        request_headers, _ = self._conditional_headers(url, headers, force)
+        self.stats["requests"] += 1
+        async with self.client.stream("GET", url, headers=request_headers) as response:
+            if response.status_code == 304:
+                self.stats["not_modified"] += 1
+                yield None
+                return
+            response.raise_for_status()
+            self.stats["modified"] += 1
+            yield response
+
+
+# 创建默认的校验信息存储
+validator_store = ValidatorStore()
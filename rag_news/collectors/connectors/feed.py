@@ -0,0 +1,299 @@
+"""
+@comment: 流式增量解析的 RSS / Atom 连接器
+
+边下载边用 XMLPullParser 解析响应体，每个 <item> / <entry> 闭合时立即产出一条标准化的新闻，
+处理完的元素随即从树上摘除，超大的归档订阅源也只占用常数级内存。订阅源通常按时间倒序排列，
+遇到已经见过的条目就停止读取并断开连接，每次轮询的开销只和新增内容成正比。
+
+用法:
+    async with FeedReader() as reader:
+        async for item in reader.read("http://www.chinanews.com.cn/rss/scroll-news.xml"):
+            print(item["title"])
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Any, AsyncIterator, Container, Dict, Iterable, Iterator, List, Optional
+from xml.etree import ElementTree
+
+from .conditional import ConditionalClient
+
+# RSS 的 <item> 和 Atom 的 <entry>
+ITEM_TAGS = {"item", "entry"}
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _local(tag: str) -> str:
+    """去掉命名空间前缀，{http://www.w3.org/2005/Atom}entry -> entry"""
+    return tag.rsplit('}', 1)[-1] if tag[:1] == '{' else tag.split(':')[-1]
+
+
+def _text(elem: Optional[ElementTree.Element]) -> str:
+    if elem is None:
+        return ""
+    return _WHITESPACE.sub(' ', "".join(elem.itertext())).strip()
+
+
+def normalize_item(elem: ElementTree.Element) -> Dict[str, Any]:
+    """
+    将 RSS <item> 或 Atom <entry> 元素转换为统一格式
+
+    Returns:
+        与 NewsItem.to_dict() 一致的字典：id、title、url、extra
+    """
+    fields: Dict[str, ElementTree.Element] = {}
+    url = ""
+    for child in elem:
+        name = _local(child.tag)
+        if name == "link":
+            # Atom 的 link 放在 href 属性里，优先取 rel="alternate"
+            href = child.get("href")
+            if href and (not url or child.get("rel", "alternate") == "alternate"):
+                url = href
+            elif not href and not url:
+                url = _text(child)
+            continue
+        fields.setdefault(name, child)
+
+    guid = _text(fields.get("guid")) or _text(fields.get("id"))
+    title = _text(fields.get("title"))
+    item_id = guid or url or hashlib.blake2b(title.encode("utf-8"), digest_size=8).hexdigest()
+    published = next((_text(fields[k]) for k in ("pubDate", "published", "updated", "date") if k in fields), "")
+    summary = next((_text(fields[k]) for k in ("description", "summary", "content") if k in fields), "")
+    author = fields.get("author")
+    if author is not None and len(author):
+        # Atom 的 author 下还有 name 子元素
+        author_name = _text(next((c for c in author if _local(c.tag) == "name"), author))
+    else:
+        author_name = _text(author) or _text(fields.get("creator"))
+
+    return {
+        "id": item_id,
+        "title": title,
+        "url": url or guid,
+        "extra": {
+            "published": published,
+            "summary": summary,
+            "author": author_name,
+        },
+    }
+
+
+class FeedParser:
+    """增量 RSS / Atom 解析器，数据分块喂入，闭合的条目逐个取出"""
+
+    def __init__(self, max_summary_chars: int = 2000):
+        """
+        初始化解析器
+
+        Args:
+            max_summary_chars: 摘要最大长度，超出部分截断，0 表示不截断
+        """
+        self.max_summary_chars = max_summary_chars
+        self._parser = ElementTree.XMLPullParser(events=("start", "end"))
+        self._stack: List[ElementTree.Element] = []
+        self.items_parsed = 0
+
+    def feed(self, data: bytes) -> Iterator[Dict[str, Any]]:
+        """
+        喂入一段数据，产出本段数据中闭合的条目
+
+        Raises:
+            ElementTree.ParseError: XML 格式错误
+        """
+        self._parser.feed(data)
+        return self._drain()
+
+    def close(self) -> Iterator[Dict[str, Any]]:
+        """数据全部喂入后调用，产出剩余条目"""
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> Iterator[Dict[str, Any]]:
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                self._stack.append(elem)
+                continue
+            self._stack.pop()
+            if _local(elem.tag) not in ITEM_TAGS:
+                continue
+            item = normalize_item(elem)
+            # 从父元素上摘除已处理的条目，保证内存占用不随订阅源长度增长
+            elem.clear()
+            if self._stack:
+                self._stack[-1].remove(elem)
+            if self.max_summary_chars and len(item["extra"]["summary"]) > self.max_summary_chars:
+                item["extra"]["summary"] = item["extra"]["summary"][:self.max_summary_chars]
+            self.items_parsed += 1
+            yield item
+
+
+def parse_feed(chunks: Iterable[bytes], seen_ids: Container[str] = (),
+               stop_after_seen: int = 1) -> Iterator[Dict[str, Any]]:
+    """
+    同步增量解析订阅源
+
+    Args:
+        chunks: 响应体数据块
+        seen_ids: 已处理过的条目 ID
+        stop_after_seen: 连续遇到多少个已见条目后停止
+
+    Returns:
+        新条目的迭代器
+    """
+    parser = FeedParser()
+    seen_streak = 0
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            if item["id"] in seen_ids:
+                seen_streak += 1
+                if seen_streak >= stop_after_seen:
+                    return
+                continue
+            seen_streak = 0
+            yield item
+    yield from (item for item in parser.close() if item["id"] not in seen_ids)
+
+
+class FeedReader:
+    """按订阅源记录已见条目、只产出新条目的读取器"""
+
+    def __init__(self, state_dir: str = 'cache/feeds', keep_ids: int = 500,
+                 stop_after_seen: int = 1, max_items: Optional[int] = None,
+                 client: Optional[ConditionalClient] = None):
+        """
+        初始化读取器
+
+        Args:
+            state_dir: 已见条目 ID 的持久化目录
+            keep_ids: 每个订阅源保留的最近条目 ID 数量
+            stop_after_seen: 连续遇到多少个已见条目后停止，对排序不严格的订阅源可以调大
+            max_items: 单次读取的最大条目数，None 表示不限制
+            client: 条件请求客户端，默认新建
+        """
+        self.state_dir = state_dir
+        self.keep_ids = keep_ids
+        self.stop_after_seen = stop_after_seen
+        self.max_items = max_items
+        self._owns_client = client is None
+        self.client = client or ConditionalClient()
+
+    async def __aenter__(self) -> "FeedReader":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._owns_client:
+            await self.client.close()
+
+    def _state_path(self, url: str) -> str:
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.state_dir, f"{name}.json")
+
+    def load_state(self, url: str) -> Dict[str, Any]:
+        """加载订阅源状态：ids 为最近见过的条目 ID（从新到旧），partial 表示上次读取被 max_items 截断"""
+        path = self._state_path(url)
+        if not os.path.exists(path):
+            return {"ids": [], "partial": False}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {"ids": list(data.get("ids", [])), "partial": bool(data.get("partial", False))}
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"加载订阅源状态失败 {url}: {e}")
+            return {"ids": [], "partial": False}
+
+    def load_seen(self, url: str) -> List[str]:
+        """加载订阅源最近见过的条目 ID，按从新到旧排列"""
+        return self.load_state(url)["ids"]
+
+    def save_seen(self, url: str, ids: List[str], partial: bool = False) -> None:
+        """原子地保存订阅源最近见过的条目 ID"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"url": url, "ids": ids[:self.keep_ids], "partial": partial}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._state_path(url))
+        except Exception as e:
+            print(f"保存订阅源状态失败 {url}: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    async def read(self, url: str, force: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式读取订阅源，只产出未见过的条目
+
+        调用方中途停止迭代或处理出错时不会记录本次产出的条目，也不保存条件请求校验信息，
+        下次读取会再次完整下载并产出，宁可重复也不漏。被 max_items 截断时记录已产出的条目，
+        但不保存校验信息，下次读取跳过已见条目、继续产出剩余的条目。
+
+        Args:
+            url: 订阅源地址
+            force: 忽略条件请求校验信息和已见条目，完整读取
+
+        Raises:
+            httpx.HTTPError: 请求失败
+            ElementTree.ParseError: XML 格式错误
+        """
+        state = {"ids": [], "partial": False} if force else self.load_state(url)
+        seen_list = state["ids"]
+        seen = set(seen_list)
+        # 上次被截断时，已见条目之后还有没读到的条目，不能遇到已见条目就停止
+        stop_after_seen = None if state["partial"] else self.stop_after_seen
+        # 只需记住最新的 keep_ids 个条目，超长订阅源下不随条目数增长
+        new_ids: List[str] = []
+        count = 0
+        parser = FeedParser()
+        seen_streak = 0
+        finished = False
+        truncated = False
+
+        async with self.client.stream(url, force=force) as response:
+            if response is None:
+                return
+            async for chunk in response.aiter_bytes():
+                for item in parser.feed(chunk):
+                    if item["id"] in seen:
+                        seen_streak += 1
+                        if stop_after_seen and seen_streak >= stop_after_seen:
+                            finished = True
+                            break
+                        continue
+                    seen_streak = 0
+                    count += 1
+                    if len(new_ids) < self.keep_ids:
+                        new_ids.append(item["id"])
+                    yield item
+                    if self.max_items and count >= self.max_items:
+                        finished = truncated = True
+                        break
+                if finished:
+                    # 提前退出上下文会关闭连接，不再下载剩余内容
+                    break
+            else:
+                for item in parser.close():
+                    if item["id"] in seen:
+                        continue
+                    count += 1
+                    if len(new_ids) < self.keep_ids:
+                        new_ids.append(item["id"])
+                    yield item
+                    if self.max_items and count >= self.max_items:
+                        truncated = True
+                        break
+                finished = True
+            if finished and not truncated:
+                # 本次内容已全部处理，之后才带上条件请求头
+                self.client.commit(url, response)
+
+        if finished and (new_ids or truncated != state["partial"]):
+            fresh = set(new_ids)
+            self.save_seen(url, new_ids + [i for i in seen_list if i not in fresh], partial=truncated)
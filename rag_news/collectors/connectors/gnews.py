@@ -0,0 +1,432 @@
+"""
+@comment: 异步 GNews 连接器
+
+GNews 按请求次数计费（免费版每天 100 次），配额比 CPU 更早成为瓶颈。该连接器:
+
+- 复用连接池的 httpx 客户端，按配额预算（每日 / 每分钟）发起请求，每日用量持久化，重启不清零
+- 先取第一页得到总数，再在配额内并发获取后续页
+- 按 (接口, 查询, 语言, 时间窗口, 页码) 缓存响应，窗口起点按 cache_window 对齐，同一窗口内重复查询不消耗配额
+- 多个话题查询用 OR 合并成一次请求，再按关键词把结果分回各个查询
+
+用法:
+    async with GNewsClient(api_key) as client:
+        articles = await client.search("中欧峰会", lang="zh", pages=2)
+        grouped = await client.search_many(["中欧峰会", "关税", "新能源汽车"], lang="zh")
+"""
+
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from rag_news.cache import source_cache
+from rag_news.utils.singleflight import SingleFlight
+
+GNEWS_BASE_URL = "https://gnews.io/api/v4"
+# GNews 查询字符串长度上限
+MAX_QUERY_LENGTH = 200
+
+
+class QuotaExceeded(Exception):
+    """当日配额已用完"""
+
+
+class QuotaBudget:
+    """每日 / 每分钟请求配额"""
+
+    def __init__(self, daily: int = 100, per_minute: int = 30,
+                 state_file: Optional[str] = 'cache/gnews_quota.json'):
+        """
+        初始化配额预算
+
+        Args:
+            daily: 每日请求上限（按 UTC 日期计算，与 GNews 一致）
+            per_minute: 每分钟请求上限
+            state_file: 每日用量持久化文件，None 表示不持久化
+        """
+        self.daily = daily
+        self.per_minute = per_minute
+        self.state_file = state_file
+        self._recent: deque = deque()
+        self._lock = asyncio.Lock()
+        self._day, self._used = self._today(), 0
+        self._load()
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def _load(self) -> None:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get("day") == self._day:
+                self._used = int(state.get("used", 0))
+        except (OSError, ValueError) as e:
+            print(f"加载 GNews 配额状态失败: {e}")
+
+    def _save(self) -> None:
+        if not self.state_file:
+            return
+        directory = os.path.dirname(self.state_file) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"day": self._day, "used": self._used}, f)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            print(f"保存 GNews 配额状态失败: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    @property
+    def remaining(self) -> int:
+        """今日剩余请求次数"""
+        if self._day != self._today():
+            return self.daily
+        return max(0, self.daily - self._used)
+
+    async def acquire(self) -> None:
+        """
+        占用一次请求配额，每分钟配额用完时等待
+
+        Raises:
+            QuotaExceeded: 当日配额已用完
+        """
+        async with self._lock:
+            today = self._today()
+            if today != self._day:
+                self._day, self._used = today, 0
+            if self._used >= self.daily:
+                raise QuotaExceeded(f"GNews 今日配额已用完（{self.daily} 次）")
+            while True:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= 60:
+                    self._recent.popleft()
+                if len(self._recent) < self.per_minute:
+                    break
+                await asyncio.sleep(60 - (now - self._recent[0]))
+            self._recent.append(time.monotonic())
+            self._used += 1
+            self._save()
+
+    def exhaust(self) -> None:
+        """服务端返回配额耗尽时，将本地用量同步为已满"""
+        self._used = self.daily
+        self._save()
+
+
+def _normalize_query(query: str) -> str:
+    return re.sub(r'\s+', ' ', query.strip()).lower()
+
+
+# GNews 查询语法: 关键词、引号短语、括号，以及 AND / OR / NOT 运算符（相邻关键词之间默认为 AND）
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\()|(\))|([^\s()"]+)')
+_OPERATORS = ("AND", "OR", "NOT")
+
+
+def _tokenize_query(query: str) -> List[Tuple[str, str]]:
+    """将查询拆成 (类型, 值) 序列，类型为 term / op / ( / )"""
+    tokens = []
+    for phrase, left, right, word in _QUERY_TOKEN.findall(query):
+        if left:
+            tokens.append(("(", left))
+        elif right:
+            tokens.append((")", right))
+        elif word:
+            tokens.append(("op", word) if word in _OPERATORS else ("term", word.lower()))
+        elif phrase.strip():
+            tokens.append(("term", phrase.strip().lower()))
+    return tokens
+
+
+@lru_cache(maxsize=1024)
+def _parse_query(query: str) -> Optional[Tuple]:
+    """
+    将查询解析成表达式树，优先级 NOT > AND > OR
+
+    Returns:
+        ("term", 词) / ("not", 子树) / ("and", 子树列表) / ("or", 子树列表)，查询为空或语法错误时返回 None
+    """
+    tokens = _tokenize_query(query)
+    pos = 0
+
+    def peek() -> Optional[Tuple[str, str]]:
+        return tokens[pos] if pos < len(tokens) else None
+
+    def parse_or() -> Tuple:
+        nonlocal pos
+        operands = [parse_and()]
+        while peek() == ("op", "OR"):
+            pos += 1
+            operands.append(parse_and())
+        return operands[0] if len(operands) == 1 else ("or", operands)
+
+    def parse_and() -> Tuple:
+        nonlocal pos
+        operands = [parse_not()]
+        while (token := peek()) is not None and token not in (("op", "OR"), (")", ")")):
+            if token == ("op", "AND"):
+                pos += 1
+            operands.append(parse_not())
+        return operands[0] if len(operands) == 1 else ("and", operands)
+
+    def parse_not() -> Tuple:
+        nonlocal pos
+        token = peek()
+        if token == ("op", "NOT"):
+            pos += 1
+            return ("not", parse_not())
+        if token is None:
+            raise ValueError("查询不完整")
+        pos += 1
+        if token[0] == "term":
+            return token
+        if token[0] == "(":
+            node = parse_or()
+            if peek() != (")", ")"):
+                raise ValueError("括号不匹配")
+            pos += 1
+            return node
+        raise ValueError(f"意外的 {token[1]}")
+
+    if not tokens:
+        return None
+    try:
+        node = parse_or()
+    except ValueError:
+        return None
+    return node if pos == len(tokens) else None
+
+
+def _evaluate(node: Tuple, text: str) -> bool:
+    kind, value = node
+    if kind == "term":
+        return value in text
+    if kind == "not":
+        return not _evaluate(value, text)
+    if kind == "and":
+        return all(_evaluate(child, text) for child in value)
+    return any(_evaluate(child, text) for child in value)
+
+
+def matches_query(article: Dict[str, Any], query: str) -> bool:
+    """
+    文章的标题、描述或正文片段是否满足查询
+
+    按 GNews 的布尔语法求值：OR 任一操作数出现即可，NOT 要求关键词不出现，其余关键词都必须出现。
+    查询为空或语法无法解析时返回 False。
+    """
+    node = _parse_query(query)
+    if node is None:
+        return False
+    text = " ".join(str(article.get(k) or "") for k in ("title", "description", "content")).lower()
+    return _evaluate(node, text)
+
+
+def merge_queries(queries: List[str], max_length: int = MAX_QUERY_LENGTH) -> List[List[str]]:
+    """
+    将查询分组，每组用 OR 合并成一个请求，合并后长度不超过 max_length
+
+    Returns:
+        查询分组列表，重复的查询只出现一次
+    """
+    groups: List[List[str]] = []
+    length = 0
+    seen = set()
+    for query in queries:
+        key = _normalize_query(query)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        part_length = len(query) + 2  # 括号
+        if groups and length + len(" OR ") + part_length <= max_length:
+            groups[-1].append(query)
+            length += len(" OR ") + part_length
+        else:
+            groups.append([query])
+            length = part_length
+    return groups
+
+
+def combine_queries(queries: List[str]) -> str:
+    if len(queries) == 1:
+        return queries[0]
+    return " OR ".join(f"({q})" for q in queries)
+
+
+class GNewsClient:
+    """带配额控制和缓存的异步 GNews 客户端"""
+
+    def __init__(self, api_key: Optional[str] = None, quota: Optional[QuotaBudget] = None,
+                 page_size: int = 10, cache_ttl: int = 1800, cache_window: int = 1800,
+                 timeout: float = 15, cache=None):
+        """
+        初始化客户端
+
+        Args:
+            api_key: GNews API key，默认读取环境变量 GNEWS_API_KEY
+            quota: 配额预算，默认免费版额度
+            page_size: 每页条数（免费版最多 10）
+            cache_ttl: 响应缓存时间（秒）
+            cache_window: 默认时间窗口的对齐粒度（秒），同一粒度内的查询共用缓存
+            timeout: 请求超时时间（秒）
+            cache: 缓存实例，默认使用 source_cache
+        """
+        self.api_key = api_key or os.environ.get("GNEWS_API_KEY", "")
+        self.quota = quota or QuotaBudget()
+        self.page_size = page_size
+        self.cache_ttl = cache_ttl
+        self.cache_window = cache_window
+        self.cache = cache if cache is not None else source_cache
+        self.client = httpx.AsyncClient(base_url=GNEWS_BASE_URL, timeout=timeout)
+        self._flights = SingleFlight()
+        self.stats = {"requests": 0, "cache_hits": 0}
+
+    async def __aenter__(self) -> "GNewsClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    def _window(self, from_date: Optional[str], to_date: Optional[str],
+                lookback: Optional[int]) -> Tuple[Optional[str], Optional[str]]:
+        """未指定时间范围时，起始时间取 now - lookback 并按 cache_window 向下对齐，结束时间不限"""
+        if from_date or to_date or not lookback:
+            return from_date, to_date
+        start = (int(time.time()) - lookback) // self.cache_window * self.cache_window
+        return datetime.fromtimestamp(start, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"), None
+
+    async def _request(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """发起（或从缓存获取）一次 API 请求"""
+        params = {k: v for k, v in params.items() if v is not None}
+        key = "gnews:" + endpoint + ":" + json.dumps(params, sort_keys=True, ensure_ascii=False)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+        # 同一请求并发时只消耗一次配额
+        return await self._flights.do(key, self._fetch, endpoint, params, key)
+
+    async def _fetch(self, endpoint: str, params: Dict[str, Any], key: str) -> Dict[str, Any]:
+        await self.quota.acquire()
+        self.stats["requests"] += 1
+        response = await self.client.get(f"/{endpoint}", params={**params, "token": self.api_key})
+        if response.status_code == 403:
+            self.quota.exhaust()
+            raise QuotaExceeded(f"GNews 拒绝请求: {response.text[:200]}")
+        response.raise_for_status()
+        data = response.json()
+        self.cache.set(key, data, ttl=self.cache_ttl)
+        return data
+
+    async def _paged(self, endpoint: str, params: Dict[str, Any], pages: int) -> List[Dict[str, Any]]:
+        """先取第一页得到总数，再并发获取剩余页；配额不足时返回已取到的部分"""
+        first = await self._request(endpoint, {**params, "page": 1})
+        articles = list(first.get("articles", []))
+        total = first.get("totalArticles", len(articles))
+        needed = min(pages, -(-total // self.page_size)) if total else 1
+        if needed > 1:
+            results = await asyncio.gather(
+                *[self._request(endpoint, {**params, "page": page}) for page in range(2, needed + 1)],
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"GNews 分页请求失败: {result}")
+                    continue
+                articles.extend(result.get("articles", []))
+        return articles
+
+    async def search(self, query: str, lang: Optional[str] = None, country: Optional[str] = None,
+                     from_date: Optional[str] = None, to_date: Optional[str] = None,
+                     lookback: Optional[int] = 86400, pages: int = 1,
+                     sortby: str = "publishedAt") -> List[Dict[str, Any]]:
+        """
+        搜索新闻
+
+        Args:
+            query: 查询，支持 GNews 的引号短语和 AND / OR / NOT
+            lang: 语言，如 'zh'
+            country: 国家，如 'cn'
+            from_date: 起始时间（ISO 8601），与 to_date 都未指定时使用 lookback
+            to_date: 结束时间（ISO 8601）
+            lookback: 默认时间窗口长度（秒），None 表示不限时间
+            pages: 最多获取的页数
+            sortby: 排序方式，publishedAt 或 relevance
+
+        Returns:
+            文章列表
+
+        Raises:
+            QuotaExceeded: 第一页请求时配额已用完
+            httpx.HTTPError: 第一页请求失败
+        """
+        from_date, to_date = self._window(from_date, to_date, lookback)
+        params = {
+            "q": query, "lang": lang, "country": country, "from": from_date, "to": to_date,
+            "max": self.page_size, "sortby": sortby,
+        }
+        return await self._paged("search", params, pages)
+
+    async def search_many(self, queries: List[str], pages: int = 1,
+                          **kwargs) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        批量搜索多个话题，用 OR 合并以减少请求次数
+
+        合并查询的结果按关键词分回各查询；一篇文章都不匹配（关键词只出现在未返回的正文中）时，
+        分给该组的全部查询。
+
+        Args:
+            queries: 查询列表
+            pages: 每个合并请求最多获取的页数
+            **kwargs: 传递给 search 的其他参数
+
+        Returns:
+            查询 -> 文章列表，配额不足或失败的查询对应空列表
+        """
+        groups = merge_queries(queries)
+        results = await asyncio.gather(
+            *[self.search(combine_queries(group), pages=pages, **kwargs) for group in groups],
+            return_exceptions=True,
+        )
+        grouped: Dict[str, List[Dict[str, Any]]] = {query: [] for query in queries}
+        by_key: Dict[str, str] = {}
+        for query in queries:
+            by_key.setdefault(_normalize_query(query), query)
+        for group, articles in zip(groups, results):
+            if isinstance(articles, Exception):
+                print(f"GNews 搜索失败 {group}: {articles}")
+                continue
+            for article in articles:
+                matched = [q for q in group if matches_query(article, q)] or group
+                for query in matched:
+                    grouped[query].append(article)
+        # 重复（规范化后相同）的查询共享结果
+        for query in queries:
+            canonical = by_key.get(_normalize_query(query))
+            if canonical is not None and canonical != query:
+                grouped[query] = grouped[canonical]
+        return grouped
+
+    async def top_headlines(self, category: str = "general", lang: Optional[str] = None,
+                            country: Optional[str] = None, pages: int = 1) -> List[Dict[str, Any]]:
+        """获取头条新闻"""
+        params = {"category": category, "lang": lang, "country": country, "max": self.page_size}
+        return await self._paged("top-headlines", params, pages)
@@ -0,0 +1,310 @@
+"""
+@comment: 批量新闻文章采集：异步下载 + 多进程正文抽取
+
+下载是 I/O 密集型，用连接池复用的 httpx 客户端并发完成；HTML 正文抽取是 CPU 密集型，
+放进进程池在多核上并行。两个阶段之间用有界队列衔接，下载过快时自动等待抽取，内存占用可控。
+每个来源单独统计下载、抽取各阶段的成功数和按异常类型分类的失败数，不再静默吞掉错误。
+
+用法:
+    async with ArticleCollector() as collector:
+        async for article in collector.iter_articles({"cnn": urls}):
+            ...
+        print(collector.report())
+"""
+
+import asyncio
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+import httpx
+import newspaper
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+_DONE = object()
+
+
+def extract_article(url: str, html: str) -> Dict[str, Any]:
+    """在子进程中用 newspaper 从 HTML 中抽取正文，必须是模块级函数以便序列化"""
+    article = newspaper.Article(url)
+    article.download(input_html=html)
+    article.parse()
+    return {
+        "title": article.title,
+        "text": article.text,
+        "url": url,
+        "publish_date": article.publish_date.isoformat() if article.publish_date else None,
+        "authors": article.authors,
+        "top_image": article.top_image,
+    }
+
+
+def discover_articles(site_url: str) -> List[str]:
+    """用 newspaper 发现站点首页及分类页上的文章链接"""
+    paper = newspaper.build(site_url, memoize_articles=False)
+    return [article.url for article in paper.articles]
+
+
+class SourceStats:
+    """单个来源的采集统计"""
+
+    def __init__(self):
+        self.queued = 0
+        self.skipped = 0
+        self.downloaded = 0
+        self.extracted = 0
+        self.duplicates = 0
+        self.empty = 0
+        self.errors: Dict[str, Counter] = {"download": Counter(), "extract": Counter()}
+        self.last_error: Optional[str] = None
+
+    def record_error(self, stage: str, url: str, error: BaseException) -> None:
+        self.errors[stage][type(error).__name__] += 1
+        self.last_error = f"{stage} {url}: {type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "skipped": self.skipped,
+            "downloaded": self.downloaded,
+            "extracted": self.extracted,
+            "duplicates": self.duplicates,
+            "empty": self.empty,
+            "download_errors": dict(self.errors["download"]),
+            "extract_errors": dict(self.errors["extract"]),
+            "last_error": self.last_error,
+        }
+
+
+class ArticleCollector:
+    """文章下载与正文抽取流水线"""
+
+    def __init__(self, download_concurrency: int = 32, extract_workers: Optional[int] = None,
+                 queue_size: int = 64, timeout: float = 15, min_text_chars: int = 200,
+                 extractor: Callable[[str, str], Dict[str, Any]] = extract_article,
+                 frontier=None, dedup=None, archive=None):
+        """
+        初始化采集器
+
+        Args:
+            download_concurrency: 并发下载数
+            extract_workers: 抽取进程数，默认 CPU 核数
+            queue_size: 各阶段之间队列的容量
+            timeout: 下载超时时间（秒）
+            min_text_chars: 正文少于该长度的文章视为抽取失败，不输出
+            extractor: 正文抽取函数 (url, html) -> dict，必须可被序列化到子进程
+            frontier: URL frontier（rag_news.collectors.frontier.URLFrontier），用于跳过已抓取的 URL，
+                下载和抽取成功后才标记为已见
+            dedup: 近似重复索引（rag_news.processors.cleaners.dedup.NearDuplicateIndex），转载稿不输出
+            archive: 原始页面存档（rag_news.storage.PageArchive）
+        """
+        self.download_concurrency = download_concurrency
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.min_text_chars = min_text_chars
+        self.extractor = extractor
+        self.frontier = frontier
+        self.dedup = dedup
+        self.archive = archive
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            headers=DEFAULT_HEADERS,
+            limits=httpx.Limits(max_connections=download_concurrency,
+                                max_keepalive_connections=download_concurrency),
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.stats: Dict[str, SourceStats] = {}
+
+    async def __aenter__(self) -> "ArticleCollector":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _source_stats(self, source: str) -> SourceStats:
+        if source not in self.stats:
+            self.stats[source] = SourceStats()
+        return self.stats[source]
+
+    def _mark_seen(self, *urls: str) -> None:
+        """
+        下载和抽取都完成后才在 frontier 中标记 URL，包括请求的地址和重定向后的地址
+
+        下载或抽取失败的 URL 不标记，下次采集时会重试；正文过短和转载稿的结果不会变化，同样标记为已见。
+        """
+        if self.frontier is None:
+            return
+        for url in dict.fromkeys(urls):
+            try:
+                self.frontier.mark_seen(url)
+            except Exception as e:
+                print(f"标记已抓取 URL 失败 {url}: {e}")
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """返回各来源的采集统计"""
+        return {source: stats.to_dict() for source, stats in self.stats.items()}
+
+    async def discover(self, site_urls: Iterable[str]) -> Dict[str, List[str]]:
+        """并发发现多个站点的文章链接，发现失败的站点计入该站点的下载错误"""
+        site_urls = list(site_urls)
+        results = await asyncio.gather(
+            *[asyncio.to_thread(discover_articles, url) for url in site_urls],
+            return_exceptions=True,
+        )
+        sources = {}
+        for url, result in zip(site_urls, results):
+            if isinstance(result, Exception):
+                self._source_stats(url).record_error("download", url, result)
+                print(f"发现文章失败 {url}: {result}")
+                continue
+            sources[url] = result
+        return sources
+
+    async def iter_articles(self, sources: Dict[str, Iterable[str]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        下载并抽取文章，按完成顺序产出
+
+        Args:
+            sources: 来源名 -> 文章 URL 列表
+
+        Returns:
+            文章字典的异步迭代器，每条附带 source 字段
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.extract_workers)
+        url_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        html_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        out_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def produce():
+            # 本次已入队的 URL；frontier 要等下载和抽取完成后才标记，入队时还查不到
+            queued = set()
+            try:
+                for source, urls in sources.items():
+                    stats = self._source_stats(source)
+                    try:
+                        for url in urls:
+                            if url in queued:
+                                stats.skipped += 1
+                                continue
+                            if self.frontier is not None:
+                                try:
+                                    if self.frontier.seen(url):
+                                        stats.skipped += 1
+                                        continue
+                                except Exception as e:
+                                    stats.record_error("download", url, e)
+                                    continue
+                            queued.add(url)
+                            stats.queued += 1
+                            await url_queue.put((source, url))
+                    except Exception as e:
+                        # 来源的 URL 列表读取失败（例如惰性生成时出错），记录后继续处理其他来源
+                        stats.record_error("download", str(source), e)
+                        print(f"读取来源 {source} 的 URL 失败: {e}")
+            finally:
+                # 无论是否出错都通知下载协程退出，否则整条流水线会一直等待
+                for _ in range(self.download_concurrency):
+                    await url_queue.put(_DONE)
+
+        async def download():
+            while (job := await url_queue.get()) is not _DONE:
+                source, url = job
+                stats = self._source_stats(source)
+                try:
+                    response = await self.client.get(url)
+                    response.raise_for_status()
+                    html = response.text
+                except Exception as e:
+                    stats.record_error("download", url, e)
+                    continue
+                stats.downloaded += 1
+                if self.archive is not None:
+                    try:
+                        await asyncio.to_thread(self.archive.put, str(response.url), html,
+                                                status_code=response.status_code,
+                                                content_type=response.headers.get("Content-Type"))
+                    except Exception as e:
+                        print(f"页面存档失败 {url}: {e}")
+                await html_queue.put((source, url, str(response.url), html))
+
+        async def extract():
+            loop = asyncio.get_running_loop()
+            while (job := await html_queue.get()) is not _DONE:
+                source, requested_url, url, html = job
+                stats = self._source_stats(source)
+                try:
+                    article = await loop.run_in_executor(self._executor, self.extractor, url, html)
+                    if len(article.get("text") or "") < self.min_text_chars:
+                        stats.empty += 1
+                        self._mark_seen(requested_url, url)
+                        continue
+                    if self.dedup is not None:
+                        # MinHash 计算和 SQLite 写入放到线程中，不阻塞事件循环
+                        result = await asyncio.to_thread(self.dedup.add, f"{source}:{url}", article["text"],
+                                                         url=url, source=source, title=article.get("title", ""))
+                        if result.is_duplicate:
+                            stats.duplicates += 1
+                            self._mark_seen(requested_url, url)
+                            continue
+                        article["canonical_id"] = result.canonical_id
+                except Exception as e:
+                    stats.record_error("extract", url, e)
+                    continue
+                self._mark_seen(requested_url, url)
+                stats.extracted += 1
+                article["source"] = source
+                await out_queue.put(article)
+
+        async def run_stage(workers: List[asyncio.Task], queue: asyncio.Queue, count: int) -> None:
+            # 上游全部结束后通知下游的每个工作协程退出；即使有工作协程异常退出也要发出结束标记
+            try:
+                await asyncio.gather(*workers, return_exceptions=True)
+            finally:
+                for _ in range(count):
+                    await queue.put(_DONE)
+
+        # 抽取协程比进程多一个，进程返回结果时下一个任务已经在排队
+        extract_concurrency = self.extract_workers + 1
+        downloaders = [asyncio.create_task(download()) for _ in range(self.download_concurrency)]
+        extractors = [asyncio.create_task(extract()) for _ in range(extract_concurrency)]
+        producer = asyncio.create_task(produce())
+        tasks = [
+            producer,
+            *downloaders,
+            *extractors,
+            asyncio.create_task(run_stage(downloaders, html_queue, extract_concurrency)),
+            asyncio.create_task(run_stage(extractors, out_queue, 1)),
+        ]
+        try:
+            while (article := await out_queue.get()) is not _DONE:
+                yield article
+            # 遍历来源本身出错时流水线会提前结束，把异常抛给调用方而不是当作正常结束
+            await producer
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def collect(self, sources: Dict[str, Iterable[str]]) -> List[Dict[str, Any]]:
+        """下载并抽取全部文章"""
+        start = time.perf_counter()
+        articles = [article async for article in self.iter_articles(sources)]
+        print(f"采集完成: {len(articles)} 篇文章，耗时 {time.perf_counter() - start:.1f}s")
+        return articles
+
+    async def collect_sites(self, site_urls: Iterable[str]) -> List[Dict[str, Any]]:
+        """发现站点文章链接后批量采集"""
+        return await self.collect(await self.discover(site_urls))
@@ -16,13 +16,15 @@
 
 import json
 import asyncio
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode
+from crawl4ai import CrawlerRunConfig, CacheMode
 from crawl4ai import JsonCssExtractionStrategy
+from rag_news.collectors.crawlers.crawler_pool import get_crawler_pool, run_with_crawler_pools
+from rag_news.collectors.crawlers.fetcher import SmartFetcher
 
 # 基础示例1：简单爬取网页内容
 async def basic_crawl():
     """基础爬取示例"""
-    async with AsyncWebCrawler(verbose=True) as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         result = await crawler.arun(url="https://easyai.tech/ai-definition/machine-learning/")
         
         print("页面标题:", result.metadata.get('title', 'N/A'))
@@ -35,7 +37,7 @@ async def basic_crawl():
 # 基础示例2：提取特定内容
 async def extract_content():
     """使用CSS选择器提取特定内容"""
-    async with AsyncWebCrawler() as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         result = await crawler.arun(
             url="https://quotes.toscrape.com/",
             css_selector="div.quote"  # 提取引用内容
@@ -47,7 +49,7 @@ async def extract_content():
 # 基础示例3：等待页面加载
 async def wait_for_content():
     """等待动态内容加载"""
-    async with AsyncWebCrawler() as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         result = await crawler.arun(
             url="https://example.com",
             wait_for="css:div.content",  # 等待特定元素出现
@@ -59,7 +61,7 @@ async def wait_for_content():
 # 基础示例4：处理JavaScript渲染的页面
 async def handle_js_content():
     """处理需要JavaScript渲染的页面"""
-    async with AsyncWebCrawler() as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         result = await crawler.arun(
             url="https://httpbin.org/delay/2",
             js_code="window.scrollTo(0, document.body.scrollHeight);",  # 执行JS代码
@@ -70,24 +72,27 @@ async def handle_js_content():
 
 # 基础示例5：批量爬取多个URL
 async def batch_crawl():
-    """批量爬取多个页面"""
+    """批量爬取多个页面，服务端渲染的页面直接走 HTTP，需要 JS 的才启动浏览器"""
     urls = [
         "https://httpbin.org/get",
         "https://httpbin.org/user-agent",
         "https://httpbin.org/headers"
     ]
     
-    async with AsyncWebCrawler() as crawler:
-        for url in urls:
-            result = await crawler.arun(url=url)
+    async with SmartFetcher() as fetcher:
+        for url, result in zip(urls, await fetcher.fetch_many(urls)):
             print(f"\n=== {url} ===")
+            if isinstance(result, Exception):
+                print(f"失败: {result}")
+                continue
+            print(f"方式: {result.via}")
             print(f"状态: {result.status_code}")
-            print(f"内容长度: {len(result.markdown)}")
+            print(f"内容长度: {len(result.html)}")
 
 # 基础示例6：使用自定义请求头
 async def custom_headers():
     """使用自定义请求头"""
-    async with AsyncWebCrawler() as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         result = await crawler.arun(
             url="https://httpbin.org/headers",
             headers={
@@ -101,7 +106,7 @@ async def custom_headers():
 # 基础示例7：提取链接
 async def extract_links():
     """提取页面中的所有链接"""
-    async with AsyncWebCrawler() as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         result = await crawler.arun(url="https://quotes.toscrape.com/")
         
         print("页面中的链接:")
@@ -113,7 +118,7 @@ async def extract_links():
 # 基础示例8：保存媒体文件
 async def extract_media():
     """提取页面中的图片和媒体"""
-    async with AsyncWebCrawler() as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         result = await crawler.arun(url="https://quotes.toscrape.com/")
         
         print("页面中的图片:")
@@ -125,7 +130,7 @@ async def extract_media():
 # 基础示例9：错误处理
 async def error_handling():
     """错误处理示例"""
-    async with AsyncWebCrawler() as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         try:
             result = await crawler.arun(url="https://nonexistent-site-12345.com")
             print("爬取成功:", result.url)
@@ -140,7 +145,7 @@ async def complete_example():
         "verbose": True    # 详细日志
     }
     
-    async with AsyncWebCrawler(**config) as crawler:
+    async with get_crawler_pool(**config).lease() as crawler:
         # 爬取页面
         result = await crawler.arun(
             url="https://quotes.toscrape.com/",
@@ -169,30 +174,30 @@ if __name__ == "__main__":
     
     # 运行基础爬取
     print("1. 基础爬取示例:")
-    asyncio.run(basic_crawl())
+    asyncio.run(run_with_crawler_pools(basic_crawl()))
     
     print("\n" + "="*50 + "\n")
     
     # # 运行完整示例
     # print("2. 完整爬取示例:")
-    # asyncio.run(complete_example())
+    # asyncio.run(run_with_crawler_pools(complete_example()))
 
     # print("3. 提取特定内容:")
-    # asyncio.run(extract_content())
+    # asyncio.run(run_with_crawler_pools(extract_content()))
 
     # print("\n" + "="*50 + "\n")
 
     # print("4. 等待页面加载:")
-    # asyncio.run(wait_for_content())
+    # asyncio.run(run_with_crawler_pools(wait_for_content()))
 
     # print("\n" + "="*50 + "\n")
 
     # print("5. 处理JavaScript渲染的页面:")
-    # asyncio.run(handle_js_content())
+    # asyncio.run(run_with_crawler_pools(handle_js_content()))
 
     # print("\n" + "="*50 + "\n")
 
     # print("6. 批量爬取多个URL:")
-    # asyncio.run(batch_crawl())
+    # asyncio.run(run_with_crawler_pools(batch_crawl()))
 
     # print("\n" + "="*50 + "\n")
\ No newline at end of file
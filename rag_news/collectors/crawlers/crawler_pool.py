@@ -0,0 +1,241 @@
+"""
+@comment: 进程级共享的 crawl4ai 浏览器池
+
+每启动一个 AsyncWebCrawler 就会拉起一个新的无头浏览器，耗时数秒、占用数百 MB 内存。
+浏览器池常驻固定数量的已预热浏览器，按需独占租借给调用方，使用 N 次后或出现崩溃时回收重建，
+进程退出前统一关闭。
+
+用法:
+    pool = get_crawler_pool(headless=True)
+    async with pool.lease() as crawler:
+        result = await crawler.arun(url=...)
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from crawl4ai import AsyncWebCrawler
+
+# 浏览器已经崩溃或被关闭时 playwright 返回的错误信息片段
+CRASH_MARKERS = (
+    "Target page, context or browser has been closed",
+    "Browser has been closed",
+    "Browser closed",
+    "Connection closed",
+)
+
+
+def is_crash(error: object) -> bool:
+    """错误信息是否表明浏览器已经崩溃或被关闭"""
+    message = str(error or "")
+    return any(marker in message for marker in CRASH_MARKERS)
+
+
+# 补建实例失败后放进空闲队列的空位，取到它的调用方自己创建实例
+_VACANT = object()
+
+
+class _PooledCrawler:
+    """池中的一个浏览器实例"""
+
+    def __init__(self, crawler: AsyncWebCrawler):
+        self.crawler = crawler
+        self.uses = 0
+        self.broken = False
+
+
+class CrawlerPool:
+    """AsyncWebCrawler 浏览器池"""
+
+    def __init__(self, size: int = 2, max_uses: int = 100, **crawler_kwargs):
+        """
+        初始化浏览器池
+
+        Args:
+            size: 浏览器实例数量，即最大并发租借数
+            max_uses: 每个实例租借多少次后回收重建，0 表示不限制
+            **crawler_kwargs: 传递给 AsyncWebCrawler 的参数
+        """
+        self.size = size
+        self.max_uses = max_uses
+        self.crawler_kwargs = crawler_kwargs
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._created = 0
+        self._create_lock = asyncio.Lock()
+        self._closed = False
+        self._loop = asyncio.get_running_loop()
+        self.leases = 0
+        self.recycled = 0
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def start(self, warm: Optional[int] = None) -> None:
+        """预先启动浏览器实例
+
+        Args:
+            warm: 预热的实例数量，默认全部
+        """
+        count = self.size if warm is None else min(warm, self.size)
+        await asyncio.gather(*[self._add_crawler() for _ in range(count - self._created)])
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[AsyncWebCrawler]:
+        """独占租借一个浏览器实例，退出上下文时归还
+
+        只有表明浏览器崩溃的异常（见 CRASH_MARKERS）才会让该实例被回收重建；
+        调用方自身的错误和取消不影响实例复用。
+        """
+        pooled = await self._acquire()
+        try:
+            yield pooled.crawler
+        except Exception as e:
+            if is_crash(e):
+                pooled.broken = True
+            raise
+        finally:
+            await self._release(pooled)
+
+    async def arun(self, url: str, **kwargs) -> Any:
+        """租借一个实例执行 arun，结果显示浏览器崩溃时回收该实例"""
+        pooled = await self._acquire()
+        try:
+            result = await pooled.crawler.arun(url=url, **kwargs)
+            if is_crash(getattr(result, "error_message", None)):
+                pooled.broken = True
+            return result
+        except BaseException:
+            pooled.broken = True
+            raise
+        finally:
+            await self._release(pooled)
+
+    async def close(self) -> None:
+        """关闭池中所有空闲实例，租借中的实例会在归还时关闭"""
+        self._closed = True
+        while not self._idle.empty():
+            pooled = self._idle.get_nowait()
+            if pooled is not _VACANT:
+                await self._close_crawler(pooled)
+
+    def stats(self) -> Dict[str, int]:
+        """返回浏览器池统计信息"""
+        return {
+            "size": self.size,
+            "created": self._created,
+            "idle": self._idle.qsize(),
+            "leases": self.leases,
+            "recycled": self.recycled,
+        }
+
+    async def _acquire(self) -> _PooledCrawler:
+        if self._closed:
+            raise RuntimeError("浏览器池已关闭")
+        if self._idle.empty():
+            async with self._create_lock:
+                if self._idle.empty() and self._created < self.size:
+                    await self._add_crawler()
+        pooled = await self._idle.get()
+        if pooled is _VACANT:
+            pooled = await self._fill_vacancy()
+        pooled.uses += 1
+        self.leases += 1
+        return pooled
+
+    async def _fill_vacancy(self) -> _PooledCrawler:
+        """为取到的空位创建实例，失败时把空位交还队列，让下一个等待者重试"""
+        try:
+            if self._closed:
+                raise RuntimeError("浏览器池已关闭")
+            async with self._create_lock:
+                return await self._new_crawler()
+        except BaseException:
+            self._idle.put_nowait(_VACANT)
+            raise
+
+    async def _release(self, pooled: _PooledCrawler) -> None:
+        worn_out = self.max_uses and pooled.uses >= self.max_uses
+        if self._closed or pooled.broken or worn_out:
+            await self._close_crawler(pooled)
+            self.recycled += 1
+            if not self._closed:
+                # 用新实例补足池容量；补建失败只记录日志，不能掩盖调用方原本的异常，
+                # 同时留下空位唤醒一个等待者，由它自己创建实例
+                try:
+                    async with self._create_lock:
+                        await self._add_crawler()
+                except Exception as e:
+                    print(f"补建浏览器失败: {e}")
+                    self._idle.put_nowait(_VACANT)
+                except BaseException:
+                    self._idle.put_nowait(_VACANT)
+                    raise
+            return
+        self._idle.put_nowait(pooled)
+
+    async def _new_crawler(self) -> _PooledCrawler:
+        self._created += 1
+        try:
+            crawler = AsyncWebCrawler(**self.crawler_kwargs)
+            await crawler.start()
+        except BaseException:
+            self._created -= 1
+            raise
+        return _PooledCrawler(crawler)
+
+    async def _add_crawler(self) -> None:
+        self._idle.put_nowait(await self._new_crawler())
+
+    async def _close_crawler(self, pooled: _PooledCrawler) -> None:
+        self._created -= 1
+        try:
+            await pooled.crawler.close()
+        except Exception as e:
+            print(f"关闭浏览器失败: {e}")
+
+
+# 进程内的浏览器池，按 AsyncWebCrawler 参数区分
+_pools: Dict[Tuple, CrawlerPool] = {}
+
+
+def _pool_key(crawler_kwargs: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((k, repr(v)) for k, v in crawler_kwargs.items()))
+
+
+def get_crawler_pool(size: int = 2, max_uses: int = 100, **crawler_kwargs) -> CrawlerPool:
+    """
+    获取（必要时创建）与给定 AsyncWebCrawler 参数对应的进程级浏览器池，需在事件循环中调用
+
+    size 和 max_uses 只在首次创建该池时生效。浏览器绑定在事件循环上，
+    换了事件循环（例如多次 asyncio.run）时会为新的循环创建新池。
+    """
+    loop = asyncio.get_running_loop()
+    key = _pool_key(crawler_kwargs)
+    pool = _pools.get(key)
+    if pool is None or pool.closed or pool.loop is not loop:
+        pool = CrawlerPool(size=size, max_uses=max_uses, **crawler_kwargs)
+        _pools[key] = pool
+    return pool
+
+
+async def shutdown_crawler_pools() -> None:
+    """关闭当前事件循环上的所有浏览器池，应在程序退出前调用"""
+    loop = asyncio.get_running_loop()
+    for key, pool in list(_pools.items()):
+        if pool.loop is loop:
+            await pool.close()
+            del _pools[key]
+
+
+async def run_with_crawler_pools(coro) -> Any:
+    """运行协程，结束后关闭浏览器池；用于 asyncio.run 的入口"""
+    try:
+        return await coro
+    finally:
+        await shutdown_crawler_pools()
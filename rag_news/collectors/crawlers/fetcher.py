@@ -0,0 +1,257 @@
+"""
+@comment: 先走普通 HTTP、必要时回退到无头浏览器的页面抓取
+
+大部分新闻页面是服务端渲染的，用连接池复用的 httpx 客户端（keep-alive，可选 HTTP/2，
+gzip/brotli 压缩）直接请求即可，比启动浏览器快一个数量级、内存也少得多。只有当启发式规则
+判断页面依赖 JavaScript（正文几乎为空、命中已知 SPA 特征，或该域名此前多次需要 JS）时，
+才通过浏览器池交给 crawl4ai 渲染。
+"""
+
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from rag_news.collectors.crawlers.crawler_pool import get_crawler_pool
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Accept-Encoding": ACCEPT_ENCODING,
+}
+
+# 单页应用的典型特征：空的挂载点或要求开启 JavaScript 的提示
+SPA_MARKERS = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>'
+    r'|enable javascript|javascript is (?:disabled|required)|请(?:开启|启用)\s*javascript',
+    re.IGNORECASE,
+)
+_SCRIPT_STYLE = re.compile(r'<(script|style|noscript|template)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAGS = re.compile(r'<[^>]+>')
+_SPACES = re.compile(r'\s+')
+
+
+def visible_text_length(html: str) -> int:
+    """粗略估计页面可见文本长度"""
+    text = _SCRIPT_STYLE.sub(' ', html)
+    text = _TAGS.sub(' ', text)
+    return len(_SPACES.sub('', text))
+
+
+def needs_javascript(html: str, min_text_chars: int = 200) -> bool:
+    """启发式判断页面是否需要 JavaScript 渲染"""
+    if not html or not html.strip():
+        return True
+    if visible_text_length(html) < min_text_chars:
+        return True
+    # 只检查页面前部，避免正文中偶然出现的文字造成误判
+    return SPA_MARKERS.search(html[:20000]) is not None
+
+
+class FetchResult:
+    """页面抓取结果"""
+
+    def __init__(self, url: str, final_url: str, status_code: int, html: str,
+                 via: str, elapsed: float, markdown: Optional[str] = None):
+        self.url = url
+        self.final_url = final_url
+        self.status_code = status_code
+        self.html = html
+        self.via = via  # 'http' 或 'browser'
+        self.elapsed = elapsed
+        self.markdown = markdown
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "final_url": self.final_url,
+            "status_code": self.status_code,
+            "html": self.html,
+            "markdown": self.markdown,
+            "via": self.via,
+            "elapsed": self.elapsed,
+        }
+
+
+class SmartFetcher:
+    """HTTP 优先、按需回退到无头浏览器的抓取器"""
+
+    def __init__(self, timeout: float = 15, max_connections: int = 100,
+                 http2: bool = True, min_text_chars: int = 200,
+                 learn_threshold: int = 3, reprobe_every: int = 50,
+                 state_file: Optional[str] = 'cache/fetcher_domains.json',
+                 browser_kwargs: Optional[Dict[str, Any]] = None, archive=None):
+        """
+        初始化抓取器
+
+        Args:
+            timeout: HTTP 请求超时时间（秒）
+            max_connections: 连接池最大连接数
+            http2: 是否启用 HTTP/2（需要安装 h2）
+            min_text_chars: 可见文本少于该长度时认为需要 JavaScript
+            learn_threshold: 某域名连续多少次需要 JavaScript 后直接走浏览器
+            reprobe_every: 已标记为需要 JavaScript 的域名每隔多少次请求重新尝试 HTTP
+            state_file: 域名学习结果的持久化文件，None 表示不持久化
+            browser_kwargs: 传递给浏览器池（AsyncWebCrawler）的参数
+            archive: 原始页面存档（rag_news.storage.PageArchive），设置后成功抓取的页面都会存档
+        """
+        self.min_text_chars = min_text_chars
+        self.learn_threshold = learn_threshold
+        self.reprobe_every = reprobe_every
+        self.browser_kwargs = browser_kwargs or {"headless": True}
+        self.archive = archive
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            http2=http2 and HTTP2_AVAILABLE,
+            follow_redirects=True,
+            headers=DEFAULT_HEADERS,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        # 域名 -> 连续需要 JavaScript 的次数
+        self._js_streak: Dict[str, int] = {}
+        # 域名 -> 被标记后经过的请求数，用于定期重新探测
+        self._js_requests: Dict[str, int] = {}
+        self.stats = {"http": 0, "browser": 0, "fallbacks": 0}
+        self.state_file = state_file
+        self.load_state()
+
+    async def __aenter__(self) -> "SmartFetcher":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+        self.save_state()
+
+    def load_state(self) -> None:
+        """加载已学习的域名状态"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self._js_streak = {k: int(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"加载域名状态失败: {e}")
+
+    def save_state(self) -> None:
+        """原子地保存域名状态"""
+        if not self.state_file:
+            return
+        directory = os.path.dirname(self.state_file) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._js_streak, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            print(f"保存域名状态失败: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _domain(self, url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def _prefers_browser(self, domain: str) -> bool:
+        """该域名是否已学习为需要 JavaScript"""
+        if self._js_streak.get(domain, 0) < self.learn_threshold:
+            return False
+        count = self._js_requests.get(domain, 0) + 1
+        self._js_requests[domain] = count
+        # 每隔一段时间重新探测一次，站点改版后可以回到 HTTP
+        return count % self.reprobe_every != 0
+
+    def _learn(self, domain: str, js_needed: bool) -> None:
+        if js_needed:
+            self._js_streak[domain] = self._js_streak.get(domain, 0) + 1
+        else:
+            self._js_streak.pop(domain, None)
+            self._js_requests.pop(domain, None)
+
+    async def fetch(self, url: str, force_browser: bool = False, **browser_kwargs) -> FetchResult:
+        """
+        抓取页面
+
+        Args:
+            url: 页面地址
+            force_browser: 直接使用浏览器
+            **browser_kwargs: 回退到浏览器时传递给 arun 的参数
+
+        Returns:
+            FetchResult
+        """
+        domain = self._domain(url)
+        if not force_browser and not self._prefers_browser(domain):
+            start = time.perf_counter()
+            try:
+                response = await self.client.get(url)
+                html = response.text
+                js_needed = response.status_code < 400 and needs_javascript(html, self.min_text_chars)
+                # 4xx/5xx 多为反爬或真实错误，交给浏览器再试一次
+                if response.status_code < 400 and not js_needed:
+                    self._learn(domain, False)
+                    self.stats["http"] += 1
+                    return await self._archived(FetchResult(url, str(response.url), response.status_code, html,
+                                                      "http", time.perf_counter() - start),
+                                          response.headers.get("Content-Type"))
+                if js_needed:
+                    self._learn(domain, True)
+            except httpx.HTTPError as e:
+                print(f"HTTP 抓取失败，改用浏览器 {url}: {e}")
+            self.stats["fallbacks"] += 1
+
+        return await self._archived(await self._fetch_with_browser(url, **browser_kwargs))
+
+    async def _archived(self, result: FetchResult, content_type: Optional[str] = None) -> FetchResult:
+        """将抓取结果写入页面存档，存档失败不影响抓取；压缩和写盘在线程中进行，不阻塞事件循环"""
+        if self.archive is None or not result.html:
+            return result
+        try:
+            await asyncio.to_thread(self.archive.put, result.final_url, result.html, kind="html",
+                                    status_code=result.status_code, content_type=content_type)
+            if result.markdown:
+                await asyncio.to_thread(self.archive.put, result.final_url, result.markdown,
+                                        kind="markdown", status_code=result.status_code)
+        except Exception as e:
+            print(f"页面存档失败 {result.url}: {e}")
+        return result
+
+    async def fetch_many(self, urls, concurrency: int = 16):
+        """并发抓取多个页面，按输入顺序返回结果，失败的位置为异常对象"""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_one(url):
+            async with semaphore:
+                return await self.fetch(url)
+
+        return await asyncio.gather(*[fetch_one(url) for url in urls], return_exceptions=True)
+
+    async def _fetch_with_browser(self, url: str, **kwargs) -> FetchResult:
+        start = time.perf_counter()
+        result = await get_crawler_pool(**self.browser_kwargs).arun(url, **kwargs)
+        self.stats["browser"] += 1
+        return FetchResult(url, result.url or url, result.status_code or 0, result.html or "",
+                           "browser", time.perf_counter() - start, markdown=str(result.markdown or ""))
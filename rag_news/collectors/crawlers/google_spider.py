@@ -8,7 +8,8 @@
 
 import asyncio
 import urllib.parse
-from crawl4ai import AsyncWebCrawler
+from rag_news.collectors.crawlers.crawler_pool import get_crawler_pool, run_with_crawler_pools
+from rag_news.utils.rate_limit import HostRateLimiter
 import json
 import random
 import time
@@ -28,7 +29,7 @@ async def basic_google_search(query):
         "Connection": "keep-alive"
     }
     
-    async with AsyncWebCrawler(headless=True, verbose=True) as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         try:
             result = await crawler.arun(
                 url=search_url,
@@ -64,7 +65,7 @@ async def parse_google_results(query):
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
     }
     
-    async with AsyncWebCrawler(headless=True) as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         try:
             result = await crawler.arun(
                 url=search_url,
@@ -122,7 +123,7 @@ async def advanced_google_search(query):
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
     }
     
-    async with AsyncWebCrawler(headless=True, verbose=True) as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         try:
             result = await crawler.arun(
                 url=search_url,
@@ -140,27 +141,69 @@ async def advanced_google_search(query):
             print(f"高级搜索失败: {e}")
 
 # 示例4：批量Google搜索
-async def batch_google_search(queries, delay=5):
-    """批量进行Google搜索"""
-    results = []
-    
-    async with AsyncWebCrawler(headless=True) as crawler:
-        for i, query in enumerate(queries):
-            try:
-                print(f"正在搜索 {i+1}/{len(queries)}: {query}")
-                
-                search_url = f"https://www.google.com/search?q={urllib.parse.quote(query)}"
-                
-                result = await crawler.arun(
-                    url=search_url,
-                    headers={
-                        "User-Agent": f"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.{random.randint(1000,9999)} Safari/537.36"
-                    },
-                    wait_for="css:div#search",
-                    delay_before_return_html=2.0
-                )
-                
-                search_result = {
+# 所有批量搜索共享的按主机限流器，多个批次并行时整体仍遵守同一速率
+search_rate_limiter = HostRateLimiter(rate=0.2, capacity=2)
+
+GOOGLE_SEARCH_URL = "https://www.google.com/search"
+
+# 被限流或出现验证码时的首次退避时间（秒），之后每次翻倍
+CAPTCHA_BACKOFF = 30
+
+def is_blocked(result):
+    """判断搜索结果是否被限流或要求验证码"""
+    if result.status_code == 429:
+        return True
+    url = result.url or ""
+    content = (result.markdown or "")[:5000].lower()
+    return "/sorry/" in url or "unusual traffic" in content or "captcha" in content
+
+async def stream_google_search(queries, concurrency=4, limiter=None, max_retries=3):
+    """
+    并发批量搜索，按完成顺序逐个产出结果
+
+    Args:
+        queries: 查询列表
+        concurrency: 同时进行的搜索数量
+        limiter: 按主机的令牌桶限流器，默认使用全局共享的 search_rate_limiter
+        max_retries: 被限流或出现验证码时的最大重试次数
+
+    Yields:
+        搜索结果字典，包含 query、success 等字段
+    """
+    limiter = limiter or search_rate_limiter
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    pool = get_crawler_pool(size=concurrency, headless=True)
+
+    async def search_one(query):
+        search_url = f"{GOOGLE_SEARCH_URL}?q={urllib.parse.quote(query)}"
+        async with semaphore:
+            for attempt in range(max_retries + 1):
+                await limiter.acquire(search_url)
+                try:
+                    result = await pool.arun(
+                        url=search_url,
+                        headers={
+                            "User-Agent": f"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.{random.randint(1000,9999)} Safari/537.36"
+                        },
+                        wait_for="css:div#search",
+                        delay_before_return_html=2.0
+                    )
+                except Exception as e:
+                    print(f"搜索 '{query}' 失败: {e}")
+                    return {"query": query, "error": str(e), "success": False}
+
+                if is_blocked(result):
+                    if attempt == max_retries:
+                        # 最后一次尝试不再退避，否则只会无谓地拖慢同一主机上的其他查询
+                        print(f"搜索 '{query}' 被限流，放弃 ({attempt + 1}/{max_retries + 1})")
+                        break
+                    # 整个主机退避，同时影响其他并发的查询
+                    wait = CAPTCHA_BACKOFF * (2 ** attempt) * random.uniform(0.8, 1.2)
+                    print(f"搜索 '{query}' 被限流，{wait:.0f} 秒后重试 ({attempt + 1}/{max_retries + 1})")
+                    limiter.backoff(search_url, wait)
+                    continue
+
+                return {
                     "query": query,
                     "url": search_url,
                     "status": result.status_code,
@@ -168,23 +211,33 @@ async def batch_google_search(queries, delay=5):
                     "content_length": len(result.markdown),
                     "success": result.status_code == 200
                 }
-                
-                results.append(search_result)
-                
-                # 添加延迟避免被封
-                if i < len(queries) - 1:
-                    print(f"等待 {delay} 秒...")
-                    await asyncio.sleep(delay)
-                    
-            except Exception as e:
-                print(f"搜索 '{query}' 失败: {e}")
-                results.append({
-                    "query": query,
-                    "error": str(e),
-                    "success": False
-                })
-    
-    return results
+
+        return {"query": query, "url": search_url, "error": "被限流或需要验证码", "success": False}
+
+    tasks = [asyncio.ensure_future(search_one(query)) for query in queries]
+    try:
+        for i, next_done in enumerate(asyncio.as_completed(tasks), 1):
+            search_result = await next_done
+            print(f"完成搜索 {i}/{len(queries)}: {search_result['query']}")
+            yield search_result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def batch_google_search(queries, concurrency=4):
+    """
+    批量进行Google搜索，结果按查询顺序返回
+
+    请求速率由全局共享的 search_rate_limiter 控制，多个批次并行时整体仍遵守同一速率。
+
+    Args:
+        queries: 查询列表
+        concurrency: 同时进行的搜索数量
+    """
+    results = {}
+    async for search_result in stream_google_search(queries, concurrency, search_rate_limiter):
+        results[search_result["query"]] = search_result
+    return [results[query] for query in queries]
 
 # 示例5：使用代理进行Google搜索（如果有代理的话）
 async def proxy_google_search(query, proxy_url=None):
@@ -200,7 +253,7 @@ async def proxy_google_search(query, proxy_url=None):
     if proxy_url:
         config["proxy"] = proxy_url
     
-    async with AsyncWebCrawler(**config) as crawler:
+    async with get_crawler_pool(**config).lease() as crawler:
         try:
             result = await crawler.arun(
                 url=search_url,
@@ -232,7 +285,7 @@ async def specialized_google_search(query, search_type="web"):
     else:
         search_url = f"{base_url}?q={urllib.parse.quote(query)}"
     
-    async with AsyncWebCrawler(headless=True) as crawler:
+    async with get_crawler_pool(headless=True).lease() as crawler:
         try:
             result = await crawler.arun(
                 url=search_url,
@@ -290,7 +343,7 @@ async def main():
     
     # 批量搜索（使用较短的查询列表）
     print("4. 批量搜索:")
-    batch_results = await batch_google_search(test_queries[:2], delay=3)
+    batch_results = await batch_google_search(test_queries[:2])
     
     print("批量搜索结果:")
     for result in batch_results:
@@ -302,4 +355,4 @@ if __name__ == "__main__":
     print("建议使用合理的延迟和真实的User-Agent\n")
     
     # 运行主函数
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(run_with_crawler_pools(main()))
\ No newline at end of file
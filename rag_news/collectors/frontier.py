@@ -0,0 +1,386 @@
+"""
+@comment: 持久化的 URL 待抓取队列（frontier）
+
+同一篇稿件会被多个热榜、多个订阅源以不同形式的链接转载（带统计参数、移动版域名、锚点等）。
+frontier 先把 URL 规范化，再用持久化的布隆过滤器加最近精确集合去重，只有从未见过的 URL 才会入队。
+出队按优先级进行，同时保证同一主机两次请求之间至少间隔 host_delay 秒。
+
+用法:
+    frontier = URLFrontier()
+    frontier.add(url, priority=10, meta={"source": "weibo"})
+    item = frontier.pop()          # 没有可抓取的 URL 时返回 None
+    item = await frontier.get()    # 等待直到有可抓取的 URL
+    frontier.save()
+"""
+
+import asyncio
+import hashlib
+import heapq
+import json
+import math
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 常见的统计、分享参数，对页面内容没有影响
+TRACKING_PARAMS = {
+    "spm", "scm", "from", "share_token", "share_from", "share_source", "shareid", "share_medium",
+    "wfr", "tt_from", "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
+    "fbclid", "gclid", "yclid", "mc_cid", "mc_eid", "ref", "ref_src", "isappinstalled",
+    "timestamp", "vd_source", "_wv", "chksm", "sessionid", "xsec_source", "xsec_token",
+}
+TRACKING_PREFIXES = ("utm_", "hmsr", "hmpl", "hmcu", "hmkw", "hmci")
+# 移动版 / 桌面版前缀，规范化时统一去掉
+MOBILE_HOST_PREFIXES = ("m.", "wap.", "mobile.", "3g.", "touch.", "www.")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    规范化 URL，用作去重的键
+
+    - scheme、主机名小写，去掉默认端口和 m./wap./www. 等前缀
+    - 去掉锚点和统计参数，其余参数按名称排序
+    - 去掉路径末尾多余的斜杠，http 统一为 https
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    for prefix in MOBILE_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") >= 2:
+            host = host[len(prefix):]
+            break
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or port == DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+    if scheme == "http":
+        scheme = "https"
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+class BloomFilter:
+    """定长布隆过滤器，可保存到文件"""
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        """
+        初始化布隆过滤器
+
+        Args:
+            capacity: 预计容纳的元素数量
+            error_rate: 容纳 capacity 个元素时的误判率
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> List[int]:
+        # 双重哈希：由两个 64 位哈希值派生出 k 个位置
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: str) -> bool:
+        """添加元素，返回是否为新元素（可能因误判返回 False）"""
+        added = False
+        for p in self._positions(key):
+            mask = 1 << (p & 7)
+            if not self.bits[p >> 3] & mask:
+                self.bits[p >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    @property
+    def saturated(self) -> bool:
+        return self.count >= self.capacity
+
+    def save(self, path: str) -> None:
+        header = json.dumps({
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "count": self.count,
+        }).encode("utf-8")
+        _atomic_write(path, len(header).to_bytes(4, "little") + header + bytes(self.bits))
+
+    @classmethod
+    def load(cls, path: str) -> "BloomFilter":
+        with open(path, "rb") as f:
+            data = f.read()
+        size = int.from_bytes(data[:4], "little")
+        header = json.loads(data[4:4 + size])
+        bloom = cls(header["capacity"], header["error_rate"])
+        bits = data[4 + size:]
+        if len(bits) != len(bloom.bits):
+            raise ValueError("布隆过滤器文件大小不匹配")
+        bloom.bits = bytearray(bits)
+        bloom.count = header["count"]
+        return bloom
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class FrontierItem:
+    """队列中的一个 URL"""
+
+    __slots__ = ("url", "key", "priority", "meta", "added_at")
+
+    def __init__(self, url: str, key: str, priority: float = 0,
+                 meta: Optional[Dict[str, Any]] = None, added_at: Optional[float] = None):
+        self.url = url
+        self.key = key
+        self.priority = priority
+        self.meta = meta or {}
+        self.added_at = added_at or time.time()
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.key).netloc
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "key": self.key,
+            "priority": self.priority,
+            "meta": self.meta,
+            "added_at": self.added_at,
+        }
+
+
+class URLFrontier:
+    """按优先级和主机调度的去重 URL 队列"""
+
+    def __init__(self, state_dir: Optional[str] = 'cache/frontier', host_delay: float = 1.0,
+                 bloom_capacity: int = 1_000_000, bloom_error_rate: float = 0.001,
+                 recent_size: int = 100_000):
+        """
+        初始化 frontier
+
+        Args:
+            state_dir: 持久化目录，None 表示不持久化
+            host_delay: 同一主机两次出队之间的最小间隔（秒）
+            bloom_capacity: 布隆过滤器容量，写满后用最近集合重建
+            bloom_error_rate: 布隆过滤器误判率
+            recent_size: 最近精确集合的大小
+        """
+        self.state_dir = state_dir
+        self.host_delay = host_delay
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.recent_size = recent_size
+
+        self.bloom = BloomFilter(bloom_capacity, bloom_error_rate)
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        # 主机 -> 该主机待抓取 URL 的堆 [(-priority, seq, item)]
+        self._queues: Dict[str, List[Tuple[float, int, FrontierItem]]] = {}
+        # 已到冷却时间的主机，按其最高优先级排序 [(-priority, seq, host)]
+        self._ready: List[Tuple[float, int, str]] = []
+        # 冷却中的主机 [(ready_at, seq, host)]
+        self._waiting: List[Tuple[float, int, str]] = []
+        self._next_fetch: Dict[str, float] = {}
+        self._scheduled: Dict[str, int] = {}  # 主机 -> 当前有效的调度序号
+        self._seq = 0
+        self._size = 0
+        self._changed = asyncio.Event()
+        self.stats = {"added": 0, "duplicates": 0, "popped": 0}
+        self.load()
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ---------- 去重 ----------
+
+    def seen(self, url: str) -> bool:
+        """URL 是否已入队或抓取过（布隆过滤器可能有极小概率误判为已见）"""
+        key = canonicalize_url(url)
+        return key in self._recent or key in self.bloom
+
+    def mark_seen(self, url: str) -> None:
+        """将 URL 标记为已见，例如通过其他途径抓取过"""
+        self._remember(canonicalize_url(url))
+
+    def _remember(self, key: str) -> None:
+        self._recent[key] = None
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.recent_size:
+            self._recent.popitem(last=False)
+        self.bloom.add(key)
+        if self.bloom.saturated:
+            # 布隆过滤器写满后误判率会快速上升，用最近集合重建
+            self.bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+            for recent_key in self._recent:
+                self.bloom.add(recent_key)
+
+    # ---------- 入队 ----------
+
+    def add(self, url: str, priority: float = 0, meta: Optional[Dict[str, Any]] = None,
+            force: bool = False) -> bool:
+        """
+        添加 URL
+
+        Args:
+            url: 待抓取的 URL
+            priority: 优先级，越大越先抓取
+            meta: 附带的信息，出队时原样返回
+            force: 跳过去重，用于失败重试
+
+        Returns:
+            是否入队
+        """
+        key = canonicalize_url(url)
+        if not force and (key in self._recent or key in self.bloom):
+            self.stats["duplicates"] += 1
+            return False
+        self._remember(key)
+        self._push(FrontierItem(url, key, priority, meta))
+        self.stats["added"] += 1
+        return True
+
+    def add_many(self, urls: Iterable[str], priority: float = 0,
+                 meta: Optional[Dict[str, Any]] = None) -> int:
+        """批量添加 URL，返回实际入队数量"""
+        return sum(self.add(url, priority, meta) for url in urls)
+
+    def _push(self, item: FrontierItem) -> None:
+        host = item.host
+        queue = self._queues.setdefault(host, [])
+        self._seq += 1
+        heapq.heappush(queue, (-item.priority, self._seq, item))
+        self._size += 1
+        if queue[0][2] is item:
+            # 新 URL 成为该主机优先级最高的 URL，重新调度该主机
+            self._schedule(host)
+        self._changed.set()
+
+    def _schedule(self, host: str) -> None:
+        self._seq += 1
+        self._scheduled[host] = self._seq
+        ready_at = self._next_fetch.get(host, 0)
+        if ready_at <= time.monotonic():
+            heapq.heappush(self._ready, (self._queues[host][0][0], self._seq, host))
+        else:
+            heapq.heappush(self._waiting, (ready_at, self._seq, host))
+
+    # ---------- 出队 ----------
+
+    def _promote(self, now: float) -> None:
+        while self._waiting and self._waiting[0][0] <= now:
+            _, seq, host = heapq.heappop(self._waiting)
+            if self._scheduled.get(host) == seq:
+                heapq.heappush(self._ready, (self._queues[host][0][0], seq, host))
+
+    def pop(self) -> Optional[FrontierItem]:
+        """取出当前可抓取的优先级最高的 URL，没有时返回 None"""
+        now = time.monotonic()
+        self._promote(now)
+        while self._ready:
+            _, seq, host = heapq.heappop(self._ready)
+            if self._scheduled.get(host) != seq:
+                continue  # 过期的调度记录
+            queue = self._queues[host]
+            item = heapq.heappop(queue)[2]
+            self._size -= 1
+            self._next_fetch[host] = now + self.host_delay
+            if queue:
+                self._schedule(host)
+            else:
+                del self._queues[host]
+                del self._scheduled[host]
+            self.stats["popped"] += 1
+            return item
+        return None
+
+    def next_ready_in(self) -> Optional[float]:
+        """距离下一个 URL 可出队还需等待的秒数，队列为空时返回 None"""
+        if not self._size:
+            return None
+        now = time.monotonic()
+        self._promote(now)
+        if any(self._scheduled.get(host) == seq for _, seq, host in self._ready):
+            return 0.0
+        while self._waiting and self._scheduled.get(self._waiting[0][2]) != self._waiting[0][1]:
+            heapq.heappop(self._waiting)
+        return max(0.0, self._waiting[0][0] - now) if self._waiting else None
+
+    async def get(self) -> FrontierItem:
+        """等待直到有可抓取的 URL"""
+        while True:
+            item = self.pop()
+            if item is not None:
+                return item
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=self.next_ready_in())
+            except asyncio.TimeoutError:
+                pass
+
+    # ---------- 持久化 ----------
+
+    def _paths(self) -> Tuple[str, str]:
+        return os.path.join(self.state_dir, "bloom.bin"), os.path.join(self.state_dir, "state.json")
+
+    def load(self) -> None:
+        """加载持久化状态"""
+        if not self.state_dir:
+            return
+        bloom_path, state_path = self._paths()
+        try:
+            if os.path.exists(bloom_path):
+                self.bloom = BloomFilter.load(bloom_path)
+            if os.path.exists(state_path):
+                with open(state_path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                self._recent = OrderedDict.fromkeys(state.get("recent", [])[-self.recent_size:])
+                for data in state.get("pending", []):
+                    self._push(FrontierItem(**data))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"加载 frontier 状态失败: {e}")
+
+    def save(self) -> None:
+        """保存布隆过滤器、最近集合和待抓取队列"""
+        if not self.state_dir:
+            return
+        bloom_path, state_path = self._paths()
+        pending = [entry[2].to_dict() for queue in self._queues.values() for entry in queue]
+        state = {"recent": list(self._recent), "pending": pending, "saved_at": time.time()}
+        try:
+            self.bloom.save(bloom_path)
+            _atomic_write(state_path, json.dumps(state, ensure_ascii=False).encode("utf-8"))
+        except Exception as e:
+            print(f"保存 frontier 状态失败: {e}")
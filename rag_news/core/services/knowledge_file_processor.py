@@ -0,0 +1,156 @@
+"""
+@comment: 知识库上传文件的后台解析
+
+上传接口保存文件后立即返回，解析在后台进行，KnowledgeFile.status 依次经过
+pending -> processing -> completed / error。同时解析的文件数受 max_workers 限制，
+每个文件在独立子进程中解析，有超时和内存上限；解析结果写在文件所在目录的 parsed/ 下。
+服务重启时，上次没处理完的文件会重新排队；删除文件前先用 cancel 终止它正在进行的解析。
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+from rag_news.core.database import SessionLocal
+from rag_news.core.models.knowledge_base import KnowledgeFile
+from rag_news.processors.parsers.document_parser import read_sections
+from rag_news.processors.parsers.isolated import ParseJob
+
+
+def parsed_output_path(file_path: str) -> str:
+    """上传文件对应的解析结果路径：<知识库目录>/parsed/<文件名>.jsonl"""
+    directory, filename = os.path.split(file_path)
+    return os.path.join(directory, "parsed", f"{filename}.jsonl")
+
+
+class KnowledgeFileProcessor:
+    """知识库文件解析调度器"""
+
+    def __init__(self, max_workers: int = 2, timeout: float = 600, memory_limit_mb: Optional[int] = 1536,
+                 section_chars: int = 4000, session_factory=SessionLocal):
+        """
+        初始化调度器
+
+        Args:
+            max_workers: 同时解析的文件数
+            timeout: 单个文件的解析超时时间（秒）
+            memory_limit_mb: 解析子进程的内存上限（MB），None 表示不限制
+            section_chars: 非 PDF 文档每段的最大字符数
+            session_factory: 数据库会话工厂
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.section_chars = section_chars
+        self.session_factory = session_factory
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # file_id -> 后台解析任务
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def _claim(self, file_id: int) -> Optional[Dict[str, Any]]:
+        """把 pending 状态的文件标记为 processing，已被其他任务处理或已删除的文件返回 None"""
+        db = self.session_factory()
+        try:
+            claimed = db.query(KnowledgeFile).filter(
+                KnowledgeFile.id == file_id,
+                KnowledgeFile.status == "pending"
+            ).update({"status": "processing"}, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                return None
+            file = db.query(KnowledgeFile).filter(KnowledgeFile.id == file_id).first()
+            return {"file_path": file.file_path, "file_type": file.file_type}
+        finally:
+            db.close()
+
+    def _set_status(self, file_id: int, status: str) -> None:
+        db = self.session_factory()
+        try:
+            db.query(KnowledgeFile).filter(
+                KnowledgeFile.id == file_id
+            ).update({"status": status}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    async def process(self, file_id: int) -> Optional[Dict[str, Any]]:
+        """
+        解析一个文件并更新状态
+
+        Args:
+            file_id: KnowledgeFile ID
+
+        Returns:
+            解析统计信息（sections、chars、pages、output），文件不是 pending 状态或解析失败时返回 None
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        async with self._semaphore:
+            file = self._claim(file_id)
+            if file is None:
+                return None
+            job = ParseJob(file["file_path"], parsed_output_path(file["file_path"]), file["file_type"],
+                           self.section_chars, self.memory_limit_mb)
+            try:
+                job.start()
+                result = await asyncio.to_thread(job.wait, self.timeout)
+            except asyncio.CancelledError:
+                # 服务关闭时中断的文件放回队列，下次启动重新解析
+                self._set_status(file_id, "pending")
+                raise
+            except Exception as e:
+                print(f"解析文件 {file['file_path']} 失败: {e}")
+                self._set_status(file_id, "error")
+                return None
+            finally:
+                job.terminate()
+        self._set_status(file_id, "completed")
+        return result
+
+    def submit(self, file_id: int) -> asyncio.Task:
+        """在当前事件循环中后台解析文件，不等待结果"""
+        task = asyncio.get_running_loop().create_task(self.process(file_id))
+        self._tasks[file_id] = task
+
+        def forget(done: asyncio.Task) -> None:
+            if self._tasks.get(file_id) is done:
+                del self._tasks[file_id]
+
+        task.add_done_callback(forget)
+        return task
+
+    async def cancel(self, file_id: int) -> None:
+        """取消文件的后台解析并等待解析子进程退出，之后不会再写出解析结果"""
+        task = self._tasks.get(file_id)
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    def resume(self) -> List[asyncio.Task]:
+        """服务启动时调用：上次中断在 processing 状态的文件重置为 pending，所有 pending 文件重新排队"""
+        db = self.session_factory()
+        try:
+            db.query(KnowledgeFile).filter(
+                KnowledgeFile.status == "processing"
+            ).update({"status": "pending"}, synchronize_session=False)
+            db.commit()
+            file_ids = [row.id for row in db.query(KnowledgeFile.id).filter(KnowledgeFile.status == "pending")]
+        finally:
+            db.close()
+        return [self.submit(file_id) for file_id in file_ids]
+
+    async def close(self) -> None:
+        """取消所有后台任务，正在运行的解析子进程会被终止"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def iter_sections(file: KnowledgeFile) -> Iterator[Dict[str, Any]]:
+        """逐段读取已解析完成的文件"""
+        return read_sections(parsed_output_path(file.file_path))
+
+
+knowledge_file_processor = KnowledgeFileProcessor()
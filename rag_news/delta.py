@@ -0,0 +1,128 @@
+"""
+增量抓取：按源持久化条目指纹，只输出新增或内容变化的条目及其排名变化
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import orjson
+
+
+class FingerprintStore:
+    """按源持久化的条目指纹集合
+
+    每个源一个文件，记录 {条目键: [内容指纹, 排名]}。条目键优先使用 id，没有时使用 url；
+    内容指纹只由标题和链接计算，热度等每次都会变化的字段不参与比较。
+    """
+
+    def __init__(self, store_dir: str = 'cache/fingerprints'):
+        """
+        初始化指纹存储
+
+        Args:
+            store_dir: 指纹文件目录
+        """
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(exist_ok=True, parents=True)
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, Dict[str, List[Any]]] = {}
+
+    @staticmethod
+    def item_key(item: Dict[str, Any]) -> str:
+        """条目的唯一键"""
+        return str(item.get('id') or item.get('url') or item.get('title', ''))
+
+    @staticmethod
+    def fingerprint(item: Dict[str, Any]) -> str:
+        """条目内容指纹"""
+        content = f"{item.get('title', '')}\x00{item.get('url', '')}"
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=8).hexdigest()
+
+    def _path(self, source_id: str) -> Path:
+        return self.store_dir / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', source_id)}.json"
+
+    def load(self, source_id: str) -> Dict[str, List[Any]]:
+        """读取某个源上一次的指纹集合"""
+        if source_id not in self._loaded:
+            try:
+                self._loaded[source_id] = orjson.loads(self._path(source_id).read_bytes())
+            except FileNotFoundError:
+                self._loaded[source_id] = {}
+            except Exception as e:
+                print(f"读取指纹失败，按首次抓取处理 {source_id}: {e}")
+                self._loaded[source_id] = {}
+        return self._loaded[source_id]
+
+    def save(self, source_id: str, fingerprints: Dict[str, List[Any]]) -> None:
+        """原子地保存某个源的指纹集合"""
+        self._loaded[source_id] = fingerprints
+        path = self._path(source_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(orjson.dumps(fingerprints))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def diff(self, source_id: str, items: List[Dict[str, Any]], include_moved: bool = False,
+             update: bool = True) -> List[Dict[str, Any]]:
+        """
+        计算与上一次抓取相比的增量
+
+        Args:
+            source_id: 源ID
+            items: 本次抓取的条目（按排名排序）
+            include_moved: 是否同时输出内容未变、只有排名变化的条目
+            update: 是否用本次结果更新持久化的指纹；items 为空时不更新，避免一次抓取失败
+                清空指纹、下次把整个榜单当成新条目
+
+        Returns:
+            增量条目列表，每个条目附加 delta 字段：
+            {'status': 'new' | 'changed' | 'moved', 'rank': 当前排名,
+             'prev_rank': 上次排名或None, 'rank_change': 排名上升的名次（新条目为None）}
+        """
+        with self._lock:
+            previous = self.load(source_id)
+            current: Dict[str, List[Any]] = {}
+            delta = []
+            for rank, item in enumerate(items, 1):
+                key = self.item_key(item)
+                fingerprint = self.fingerprint(item)
+                current[key] = [fingerprint, rank]
+
+                prev = previous.get(key)
+                if prev is None:
+                    status = 'new'
+                elif prev[0] != fingerprint:
+                    status = 'changed'
+                elif prev[1] != rank and include_moved:
+                    status = 'moved'
+                else:
+                    continue
+
+                prev_rank: Optional[int] = prev[1] if prev is not None else None
+                delta.append({
+                    **item,
+                    'delta': {
+                        'status': status,
+                        'rank': rank,
+                        'prev_rank': prev_rank,
+                        'rank_change': prev_rank - rank if prev_rank is not None else None,
+                    },
+                })
+
+            if update and items:
+                self.save(source_id, current)
+        return delta
+
+
+# 默认指纹存储，与文件缓存放在同一目录下
+fingerprint_store = FingerprintStore()
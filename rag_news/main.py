@@ -1,17 +1,38 @@
 import asyncio
 import json
 import argparse
+import contextlib
 import sys
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple, BinaryIO
 from pathlib import Path
 import time
 
+import orjson
+
 from .sources import source_manager
 from .sources.utils import NewsItem
-from .cache import memory_cache, file_cache
+from .cache import source_cache
+from .delta import fingerprint_store
+from .utils.singleflight import SingleFlight
+
+# 同一个源的并发请求只向上游发起一次
+_source_flights = SingleFlight()
+
+# stale-while-revalidate 模式下的软/硬过期时间（秒）
+SOFT_TTL = 300
+HARD_TTL = 1800
+
+# 后台刷新任务，保留引用避免被垃圾回收
+_background_tasks = set()
+
+# 并发抓取所有源时的默认并发数和单个源超时时间（秒）
+DEFAULT_CONCURRENCY = 8
+SOURCE_TIMEOUT = 10
 
-async def fetch_source(source_id: str, use_cache: bool = True, cache_force: bool = False) -> List[Dict[str, Any]]:
+async def fetch_source(source_id: str, use_cache: bool = True, cache_force: bool = False,
+                       stale_while_revalidate: bool = False, soft_ttl: float = SOFT_TTL,
+                       hard_ttl: float = HARD_TTL, delta: bool = False) -> List[Dict[str, Any]]:
     """
     获取单个源的数据
     
@@ -19,46 +40,178 @@ async def fetch_source(source_id: str, use_cache: bool = True, cache_force: bool
         source_id: 源ID
         use_cache: 是否使用缓存
         cache_force: 是否强制刷新缓存
+        stale_while_revalidate: 缓存超过软过期时间后先返回旧数据，同时在后台刷新
+        soft_ttl: 软过期时间（秒），仅在 stale_while_revalidate 模式下生效
+        hard_ttl: 硬过期时间（秒），超过后阻塞等待刷新
+        delta: 只返回相比上一次增量抓取新增或内容变化的条目（附带排名变化）
     """
+    data = await _fetch_source_data(source_id, use_cache, cache_force,
+                                    stale_while_revalidate, soft_ttl, hard_ttl)
+    if data is None:
+        # 获取失败时不计算增量，保留上一次的指纹
+        return []
+    if delta:
+        return fingerprint_store.diff(source_id, data)
+    return data
+
+async def _fetch_source_data(source_id: str, use_cache: bool, cache_force: bool,
+                             stale_while_revalidate: bool, soft_ttl: float,
+                             hard_ttl: float) -> Optional[List[Dict[str, Any]]]:
+    """按缓存策略获取单个源的完整数据，获取失败或近期失败过时返回 None"""
     cache_key = f"source_{source_id}"
+    ttl = hard_ttl if stale_while_revalidate else None
     
     # 如果使用缓存且不是强制刷新
     if use_cache and not cache_force:
-        # 优先使用内存缓存
-        cached_data = memory_cache.get(cache_key)
-        if cached_data:
-            print(f"使用内存缓存: {source_id}")
-            return cached_data
-        
-        # 其次使用文件缓存
-        cached_data = file_cache.get(cache_key)
-        if cached_data:
-            print(f"使用文件缓存: {source_id}")
-            # 同步到内存缓存
-            memory_cache.set(cache_key, cached_data)
-            return cached_data
+        # 层级缓存：先查内存，再查文件，文件命中会提升到内存
+        entry = source_cache.get_entry(cache_key)
+        if entry is not None and source_cache.is_negative(entry[0]):
+            # 近期获取失败过，短时间内不再请求上游
+            print(f"获取{source_id}近期失败，跳过: {entry[0].get('error', '')}", file=sys.stderr)
+            return None
+        if entry is not None and entry[0]:
+            cached_data, timestamp = entry
+            age = time.time() - timestamp
+            if not stale_while_revalidate or age <= soft_ttl:
+                print(f"使用缓存: {source_id}")
+                return cached_data
+            if age <= hard_ttl:
+                # 超过软过期：先返回旧数据，后台刷新
+                print(f"使用过期缓存并后台刷新: {source_id}")
+                _schedule_refresh(source_id, cache_key, hard_ttl)
+                return cached_data
     
     try:
-        # 获取新数据
-        items = await source_manager.fetch_from_source(source_id)
-        data = [item.to_dict() for item in items]
-        
-        # 更新缓存
-        if use_cache:
-            memory_cache.set(cache_key, data)
-            file_cache.set(cache_key, data)
-        
-        return data
+        return await refresh_source(source_id, use_cache, ttl)
     except Exception as e:
         print(f"获取{source_id}失败: {e}", file=sys.stderr)
-        return []
+        if use_cache:
+            source_cache.set_negative(cache_key, str(e))
+        return None
 
-async def fetch_all_sources(use_cache: bool = True, cache_force: bool = False) -> Dict[str, List[Dict[str, Any]]]:
-    """获取所有源的数据"""
-    all_data = {}
-    for source_id in source_manager.get_all_sources().keys():
-        all_data[source_id] = await fetch_source(source_id, use_cache, cache_force)
-    return all_data
+def _schedule_refresh(source_id: str, cache_key: str, ttl: float) -> None:
+    """在后台刷新源数据，已有刷新在进行时不重复发起"""
+    if _source_flights.in_flight(cache_key):
+        return
+
+    async def refresh():
+        try:
+            await refresh_source(source_id, True, ttl)
+        except Exception as e:
+            print(f"后台刷新{source_id}失败: {e}", file=sys.stderr)
+
+    task = asyncio.ensure_future(refresh())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def refresh_source(source_id: str, use_cache: bool = True,
+                         ttl: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    从上游获取源数据并更新缓存，失败时抛出异常
+
+    并发调用方共享同一次上游请求。
+
+    Args:
+        source_id: 源ID
+        use_cache: 是否写入缓存
+        ttl: 缓存过期时间（秒），默认使用缓存的 ttl
+    """
+    cache_key = f"source_{source_id}"
+    return await _source_flights.do(cache_key, _fetch_and_cache, source_id, cache_key, use_cache, ttl)
+
+async def _fetch_and_cache(source_id: str, cache_key: str, use_cache: bool,
+                           ttl: Optional[float] = None) -> List[Dict[str, Any]]:
+    """从上游获取源数据并更新缓存"""
+    items = await source_manager.fetch_from_source(source_id)
+    data = [item.to_dict() for item in items]
+    
+    # 更新缓存
+    if use_cache:
+        source_cache.set(cache_key, data, ttl=ttl)
+    
+    return data
+
+async def iter_all_sources(use_cache: bool = True, cache_force: bool = False,
+                           stale_while_revalidate: bool = False,
+                           concurrency: int = DEFAULT_CONCURRENCY,
+                           timeout: Optional[float] = SOURCE_TIMEOUT,
+                           deadline: Optional[float] = None, delta: bool = False
+                           ) -> AsyncIterator[Tuple[str, List[Dict[str, Any]], bool]]:
+    """
+    并发获取所有源的数据，按完成顺序逐个产出
+
+    Args:
+        use_cache: 是否使用缓存
+        cache_force: 是否强制刷新缓存
+        stale_while_revalidate: 是否启用 stale-while-revalidate 模式
+        concurrency: 最大并发数
+        timeout: 单个源的超时时间（秒），None 表示不限制
+        deadline: 整体截止时间（秒），到期后未完成的源记为超时
+        delta: 只产出相比上一次增量抓取新增或内容变化的条目
+
+    Yields:
+        (源ID, 数据列表, 是否超时)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch_one(source_id: str) -> Tuple[str, List[Dict[str, Any]], bool]:
+        async with semaphore:
+            try:
+                items = await asyncio.wait_for(
+                    fetch_source(source_id, use_cache, cache_force, stale_while_revalidate,
+                                 delta=delta), timeout
+                )
+                return source_id, items, False
+            except asyncio.TimeoutError:
+                print(f"获取{source_id}超时", file=sys.stderr)
+                return source_id, [], True
+
+    tasks = {asyncio.ensure_future(fetch_one(source_id)): source_id
+             for source_id in source_manager.get_all_sources().keys()}
+    end_time = time.monotonic() + deadline if deadline is not None else None
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = None if end_time is None else max(0, end_time - time.monotonic())
+            done, pending = await asyncio.wait(pending, timeout=remaining,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # 到达整体截止时间
+                break
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    for task in pending:
+        print(f"获取{tasks[task]}超过整体截止时间", file=sys.stderr)
+        yield tasks[task], [], True
+
+async def fetch_all_sources(use_cache: bool = True, cache_force: bool = False,
+                            stale_while_revalidate: bool = False,
+                            concurrency: int = DEFAULT_CONCURRENCY,
+                            timeout: Optional[float] = SOURCE_TIMEOUT,
+                            deadline: Optional[float] = None, delta: bool = False
+                            ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[str]]:
+    """
+    并发获取所有源的数据
+
+    Returns:
+        (按源注册顺序排列的 {源ID: 数据列表}, 超时的源ID列表)
+    """
+    results = {}
+    timed_out = []
+    async for source_id, items, is_timeout in iter_all_sources(
+        use_cache, cache_force, stale_while_revalidate, concurrency, timeout, deadline, delta
+    ):
+        results[source_id] = items
+        if is_timeout:
+            timed_out.append(source_id)
+
+    all_data = {source_id: results[source_id]
+                for source_id in source_manager.get_all_sources().keys() if source_id in results}
+    return all_data, timed_out
 
 def save_to_file(data: Dict[str, Any], filename: str) -> None:
     """保存数据到文件"""
@@ -70,6 +223,69 @@ def save_to_file(data: Dict[str, Any], filename: str) -> None:
     
     print(f"数据已保存到 {path}")
 
+def write_ndjson(out: BinaryIO, source_id: str, items: List[Dict[str, Any]],
+                 per_item: bool = True, timed_out: bool = False) -> int:
+    """
+    以 NDJSON 格式写出一个源的数据，并立即刷新
+
+    Args:
+        out: 二进制输出流
+        source_id: 源ID
+        items: 数据列表
+        per_item: True 时每个条目一行，False 时每个源一行
+        timed_out: 该源是否超时
+
+    Returns:
+        写出的行数
+    """
+    fetched_at = time.time()
+    if per_item:
+        lines = [
+            orjson.dumps({'source': source_id, 'rank': rank, 'fetched_at': fetched_at, 'item': item},
+                         option=orjson.OPT_APPEND_NEWLINE)
+            for rank, item in enumerate(items, 1)
+        ]
+    else:
+        lines = [orjson.dumps({'source': source_id, 'fetched_at': fetched_at, 'timed_out': timed_out,
+                               'items': items}, option=orjson.OPT_APPEND_NEWLINE)]
+    out.write(b''.join(lines))
+    out.flush()
+    return len(lines)
+
+async def stream_all_sources(out: BinaryIO, per_item: bool = True, **kwargs) -> List[str]:
+    """
+    并发获取所有源，按完成顺序以 NDJSON 流式写出，不在内存中累积结果
+
+    Args:
+        out: 二进制输出流
+        per_item: True 时每个条目一行，False 时每个源一行
+        **kwargs: 传递给 iter_all_sources 的参数
+
+    Returns:
+        超时的源ID列表
+    """
+    timed_out = []
+    async for source_id, items, is_timeout in iter_all_sources(**kwargs):
+        write_ndjson(out, source_id, items, per_item, is_timeout)
+        if is_timeout:
+            timed_out.append(source_id)
+    return timed_out
+
+@contextlib.contextmanager
+def open_stream(filename: str):
+    """打开 NDJSON 输出流，'-' 表示标准输出；输出到标准输出时提示信息改写到标准错误"""
+    if filename == '-':
+        out = sys.stdout.buffer
+        with contextlib.redirect_stdout(sys.stderr):
+            yield out
+        return
+
+    path = Path(filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as out:
+        yield out
+    print(f"数据已保存到 {path}")
+
 def print_items(items: List[Dict[str, Any]], title: str = None) -> None:
     """打印条目列表"""
     if title:
@@ -88,6 +304,12 @@ def print_items(items: List[Dict[str, Any]], title: str = None) -> None:
         print(f"   链接: {item['url']}")
         if item.get('extra') and item['extra'].get('info'):
             print(f"   信息: {item['extra']['info']}")
+        if item.get('delta'):
+            change = item['delta']
+            if change['prev_rank'] is None:
+                print(f"   变化: 新上榜 (第{change['rank']}名)")
+            else:
+                print(f"   变化: {change['status']} (第{change['prev_rank']}名 -> 第{change['rank']}名)")
         print()
 
 async def main():
@@ -97,10 +319,19 @@ async def main():
     parser.add_argument("-l", "--list", action="store_true", help="列出所有可用的源")
     parser.add_argument("--no-cache", action="store_true", help="不使用缓存")
     parser.add_argument("--force", action="store_true", help="强制刷新缓存")
-    args = parser.parse_args()
+    parser.add_argument("--swr", action="store_true", help="缓存软过期后先返回旧数据并在后台刷新")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同时抓取的最大源数量")
+    parser.add_argument("--timeout", type=float, default=SOURCE_TIMEOUT, help="单个源的超时时间（秒）")
+    parser.add_argument("--deadline", type=float, default=None, help="抓取所有源的整体截止时间（秒）")
+    parser.add_argument("--stream", choices=["item", "source"],
+                        help="以 NDJSON 流式输出到 -o 指定的文件（'-' 为标准输出），每行一个条目或一个源")
+    parser.add_argument("--delta", action="store_true", help="只输出相比上次增量抓取新增或变化的条目")
+    args, _ = parser.parse_known_args()
     
     use_cache = not args.no_cache
     cache_force = args.force
+    swr = args.swr
+    delta = args.delta
     
     if args.list:
         print("可用的热榜源:")
@@ -113,10 +344,31 @@ async def main():
             print(f"未知的源ID: {args.source}", file=sys.stderr)
             print("可用的源: " + ", ".join(source_manager.get_all_sources().keys()))
             return
-            
+    
+    if args.stream:
+        # 流式输出：每个源完成后立即写出
+        per_item = args.stream == "item"
+        start_time = time.time()
+        with open_stream(args.output or '-') as out:
+            if args.source:
+                items = await fetch_source(args.source, use_cache, cache_force, swr, delta=delta)
+                write_ndjson(out, args.source, items, per_item)
+                timed_out = []
+            else:
+                timed_out = await stream_all_sources(
+                    out, per_item, use_cache=use_cache, cache_force=cache_force,
+                    stale_while_revalidate=swr, concurrency=args.concurrency,
+                    timeout=args.timeout, deadline=args.deadline, delta=delta
+                )
+            print(f"总耗时: {time.time() - start_time:.2f}秒")
+        if timed_out:
+            print(f"超时的源: {', '.join(timed_out)}", file=sys.stderr)
+        return
+    
+    if args.source:
         # 获取单个源的数据
         start_time = time.time()
-        items = await fetch_source(args.source, use_cache, cache_force)
+        items = await fetch_source(args.source, use_cache, cache_force, swr, delta=delta)
         end_time = time.time()
         
         source = source_manager.get_source(args.source)
@@ -129,7 +381,9 @@ async def main():
     else:
         # 获取所有源的数据
         start_time = time.time()
-        all_data = await fetch_all_sources(use_cache, cache_force)
+        all_data, timed_out = await fetch_all_sources(
+            use_cache, cache_force, swr, args.concurrency, args.timeout, args.deadline, delta
+        )
         end_time = time.time()
         
         # 打印所有数据
@@ -138,6 +392,8 @@ async def main():
             print_items(items, f"{source.name} ({len(items)}条)")
         
         print(f"总耗时: {end_time - start_time:.2f}秒")
+        if timed_out:
+            print(f"超时的源: {', '.join(timed_out)}", file=sys.stderr)
         
         # 保存到文件
         if args.output:
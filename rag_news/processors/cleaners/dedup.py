@@ -0,0 +1,260 @@
+"""
+@comment: 基于 MinHash + LSH 的近似重复新闻检测
+
+同一篇通稿会被几十个来源转载，只做了标点、署名、导语之类的细微改动。在切分、向量化之前，
+用字符 n-gram 的 MinHash 签名估计文档之间的 Jaccard 相似度，LSH 分桶让每篇文档只需和
+少数候选比较（与索引规模无关）。每个重复簇只保留一篇规范文档，其余转载记录为备用来源用于署名。
+
+签名索引保存在 SQLite 中，启动时在内存中重建分桶。
+
+用法:
+    result = dedup_index.add(doc_id, text, url=url, source="weibo")
+    if result.is_duplicate:
+        ...  # 跳过切分和向量化
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Mersenne 素数 2^61 - 1，用于 MinHash 的全域哈希
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# 去掉空白和标点，只保留文字和数字
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def shingles(text: str, size: int = 5) -> Set[int]:
+    """将文本规范化后切成字符 n-gram，返回其 32 位哈希集合"""
+    text = _NON_WORD.sub('', text.lower())
+    if len(text) <= size:
+        return {zlib.crc32(text.encode('utf-8'))} if text else set()
+    return {zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(len(text) - size + 1)}
+
+
+class DedupResult:
+    """近似重复检测结果"""
+
+    def __init__(self, doc_id: str, canonical_id: str, similarity: float = 1.0):
+        self.doc_id = doc_id
+        self.canonical_id = canonical_id
+        self.similarity = similarity
+
+    @property
+    def is_duplicate(self) -> bool:
+        return self.doc_id != self.canonical_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "doc_id": self.doc_id,
+            "canonical_id": self.canonical_id,
+            "is_duplicate": self.is_duplicate,
+            "similarity": self.similarity,
+        }
+
+
+class NearDuplicateIndex:
+    """持久化的 MinHash LSH 索引"""
+
+    def __init__(self, db_path: str = 'cache/dedup.db', num_perm: int = 128, bands: int = 16,
+                 threshold: float = 0.8, shingle_size: int = 5, seed: int = 1):
+        """
+        初始化索引
+
+        Args:
+            db_path: SQLite 数据库路径，None 表示只在内存中
+            num_perm: MinHash 排列数，即签名长度
+            bands: LSH 分段数，每段 num_perm // bands 行；段越多越容易成为候选
+            threshold: 估计 Jaccard 相似度不低于该值视为重复
+            shingle_size: 字符 n-gram 长度
+            seed: 生成哈希参数的随机种子，同一个索引必须保持不变
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+        # 每个分段一张桶表：段哈希 -> 规范文档 ID 列表
+        self._buckets: List[Dict[bytes, List[str]]] = [defaultdict(list) for _ in range(bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._lock = threading.RLock()
+
+        self.db_path = db_path
+        self._conn = None
+        if db_path:
+            Path(db_path).parent.mkdir(exist_ok=True, parents=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "doc_id TEXT PRIMARY KEY, canonical_id TEXT NOT NULL, signature BLOB, "
+                "url TEXT, source TEXT, title TEXT, similarity REAL, added_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_canonical ON documents (canonical_id)")
+            self._load()
+
+    def _load(self) -> None:
+        """从数据库加载规范文档签名并重建分桶"""
+        rows = self._conn.execute(
+            "SELECT doc_id, signature FROM documents WHERE doc_id = canonical_id AND signature IS NOT NULL"
+        ).fetchall()
+        for doc_id, blob in rows:
+            signature = np.frombuffer(blob, dtype=np.uint64)
+            if len(signature) == self.num_perm:
+                self._index(doc_id, signature)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """计算文本的 MinHash 签名，空文本或只有空白时没有分片，返回 None"""
+        hashes = np.fromiter(shingles(text, self.shingle_size), dtype=np.uint64)
+        if not len(hashes):
+            return None
+        # (num_perm, n) 的矩阵，每行取最小值；乘法溢出按 2^64 回绕，与常见 MinHash 实现一致
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1)
+
+    @staticmethod
+    def similarity(sig1: np.ndarray, sig2: np.ndarray) -> float:
+        """由签名估计 Jaccard 相似度"""
+        return float(np.count_nonzero(sig1 == sig2)) / len(sig1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _index(self, doc_id: str, signature: np.ndarray) -> None:
+        self._signatures[doc_id] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].append(doc_id)
+
+    def query(self, text: str = "", signature: Optional[np.ndarray] = None) -> Optional[Tuple[str, float]]:
+        """
+        查找与文本近似重复的规范文档
+
+        Returns:
+            (规范文档 ID, 估计相似度)，没有重复或文本为空时返回 None
+        """
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return None
+        best: Optional[Tuple[str, float]] = None
+        checked: Set[str] = set()
+        with self._lock:
+            for band, key in enumerate(self._band_keys(signature)):
+                for candidate in self._buckets[band].get(key, ()):
+                    if candidate in checked:
+                        continue
+                    checked.add(candidate)
+                    score = self.similarity(signature, self._signatures[candidate])
+                    if score >= self.threshold and (best is None or score > best[1]):
+                        best = (candidate, score)
+        return best
+
+    def add(self, doc_id: str, text: str, url: str = "", source: str = "",
+            title: str = "") -> DedupResult:
+        """
+        添加文档：与已有规范文档近似重复时记为其备用来源，否则成为新的规范文档
+
+        重复添加同一个 doc_id 时返回首次添加的结果。空文本无法比较，总是作为独立的规范文档，
+        但不进入分桶，也不会被其他文档匹配。
+
+        Returns:
+            DedupResult
+        """
+        signature = self.signature(text)
+        with self._lock:
+            existing = self._lookup(doc_id)
+            if existing is not None:
+                return existing
+            match = self.query(signature=signature) if signature is not None else None
+            if match is None:
+                canonical_id, score = doc_id, 1.0
+                if signature is not None:
+                    self._index(doc_id, signature)
+            else:
+                canonical_id, score = match
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO documents "
+                    "(doc_id, canonical_id, signature, url, source, title, similarity, added_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (doc_id, canonical_id, signature.tobytes() if match is None and signature is not None else None,
+                     url, source, title, score, time.time())
+                )
+        return DedupResult(doc_id, canonical_id, score)
+
+    def _lookup(self, doc_id: str) -> Optional[DedupResult]:
+        if self._conn is None:
+            return DedupResult(doc_id, doc_id) if doc_id in self._signatures else None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT canonical_id, similarity FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        return DedupResult(doc_id, row[0], row[1]) if row else None
+
+    def alternates(self, canonical_id: str) -> List[Dict[str, Any]]:
+        """返回规范文档的所有备用来源，用于署名"""
+        if self._conn is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, url, source, title, similarity, added_at FROM documents "
+                "WHERE canonical_id = ? AND doc_id != canonical_id ORDER BY added_at",
+                (canonical_id,)
+            ).fetchall()
+        return [
+            {"doc_id": r[0], "url": r[1], "source": r[2], "title": r[3], "similarity": r[4], "added_at": r[5]}
+            for r in rows
+        ]
+
+    def filter_items(self, items: Iterable[Dict[str, Any]], text_key: str = "content",
+                     source: str = "") -> List[Dict[str, Any]]:
+        """
+        过滤一批新闻，只返回规范文档；重复条目记录到索引中
+
+        Args:
+            items: NewsItem.to_dict() 格式的新闻，正文取 item[text_key]，没有时用标题
+            text_key: 正文字段名
+            source: 来源 ID
+
+        Returns:
+            非重复的新闻列表，每条附带 extra.canonical_id
+        """
+        unique = []
+        for item in items:
+            text = item.get(text_key) or item.get("extra", {}).get(text_key) or item.get("title", "")
+            item_id = str(item.get("id") or item.get("url"))
+            # 不同来源的条目 ID 可能冲突，加上来源前缀
+            doc_id = f"{source}:{item_id}" if source else item_id
+            result = self.add(doc_id, text, url=item.get("url", ""), source=source, title=item.get("title", ""))
+            if not result.is_duplicate:
+                item.setdefault("extra", {})["canonical_id"] = result.canonical_id
+                unique.append(item)
+        return unique
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+
+
+# 创建默认的近似重复索引
+dedup_index = NearDuplicateIndex()
@@ -0,0 +1,477 @@
+"""
+@comment: 知识库文件的流式文档解析
+
+PDF 按页、DOCX / HTML / Markdown / TXT 按标题和段落惰性产出文本段，不会把整篇文档一次性读进内存：
+TXT 和 Markdown 逐行读取；HTML 分块喂给标准库 HTMLParser；DOCX 直接从压缩包中流式读取
+word/document.xml，处理完的段落随即从树上摘除；PDF 用 pypdf 逐页抽取文本。
+解析结果逐段写入 JSONL 文件，下游分块、向量化时再按需读取。
+
+用法:
+    for section in parse_document("report.pdf"):
+        print(section.page, section.text[:50])
+"""
+
+import codecs
+import json
+import os
+import re
+import tempfile
+import zipfile
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+import charset_normalizer
+
+# (是否为标题, 文本)
+Block = Tuple[bool, str]
+
+_WHITESPACE = re.compile(r'\s+')
+_MD_HEADING = re.compile(r'^ {0,3}#{1,6}\s+(.*?)(?:\s+#+)?\s*$')
+_MD_FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+
+
+class ParseError(Exception):
+    """文件无法解析"""
+
+
+class Section:
+    """文档中的一段文本：PDF 的一页，或其他格式中一个标题下的若干段落"""
+
+    __slots__ = ("text", "index", "title", "page")
+
+    def __init__(self, text: str, index: int, title: Optional[str] = None, page: Optional[int] = None):
+        self.text = text
+        self.index = index
+        self.title = title
+        self.page = page
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "title": self.title,
+            "page": self.page,
+            "text": self.text,
+        }
+
+
+# ---------- 文本读取 ----------
+
+def detect_encoding(path: str, sample_size: int = 65536) -> str:
+    """根据文件开头的样本判断文本编码"""
+    with open(path, "rb") as f:
+        sample = f.read(sample_size)
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    # 中文文档最常见的是 UTF-8 和 GBK；charset_normalizer 对短的 GBK 文本常误判为韩文编码，先逐个严格试解码
+    for encoding in ("utf-8", "gb18030"):
+        try:
+            # 样本末尾可能截断了多字节字符，用增量解码器忽略不完整的结尾
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            pass
+    match = charset_normalizer.from_bytes(sample).best()
+    return match.encoding if match else "utf-8"
+
+
+def _read_lines(path: str, max_line_chars: int = 65536) -> Iterator[str]:
+    # 限制单次读取的长度，没有换行的超大文件也不会整体读进内存
+    with open(path, encoding=detect_encoding(path), errors="replace") as f:
+        while True:
+            line = f.readline(max_line_chars)
+            if not line:
+                return
+            yield line
+
+
+def _read_chunks(path: str, chunk_chars: int = 65536) -> Iterator[str]:
+    with open(path, encoding=detect_encoding(path), errors="replace") as f:
+        while True:
+            chunk = f.read(chunk_chars)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _group(blocks: Iterable[Block], section_chars: int) -> Iterator[Section]:
+    """
+    将段落合并成不超过 section_chars 的文本段，遇到标题时另起一段
+
+    标题文本作为新一段的开头，同时记录在 Section.title 中；超长段落按长度硬切。
+    """
+    index = 0
+    title: Optional[str] = None
+    parts: List[str] = []
+    size = 0
+    has_body = False
+    for is_heading, text in blocks:
+        text = text.strip()
+        if not text:
+            continue
+        if is_heading or (has_body and size + len(text) > section_chars):
+            if has_body:
+                yield Section("\n\n".join(parts), index, title)
+                index += 1
+            # 连续的标题之间没有正文时只保留最后一个
+            parts, size, has_body = [], 0, False
+        if is_heading:
+            title = text[:200]
+            parts, size = [text], len(text)
+            continue
+        while size + len(text) > section_chars:
+            cut = section_chars - size
+            parts.append(text[:cut])
+            yield Section("\n\n".join(parts), index, title)
+            index += 1
+            parts, size, text = [], 0, text[cut:]
+        parts.append(text)
+        size += len(text) + 2
+        has_body = True
+    if has_body:
+        yield Section("\n\n".join(parts), index, title)
+
+
+def _line_blocks(lines: Iterable[str], max_chars: int, markdown: bool = False) -> Iterator[Block]:
+    """按空行切出段落；Markdown 额外识别 # 标题，代码块内的空行和 # 不处理"""
+    parts: List[str] = []
+    size = 0
+    fence: Optional[str] = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if markdown:
+            if fence is None:
+                match = _MD_FENCE.match(line)
+                if match:
+                    fence = match.group(1)
+                else:
+                    heading = _MD_HEADING.match(line)
+                    if heading:
+                        if parts:
+                            yield False, "\n".join(parts)
+                            parts, size = [], 0
+                        yield True, heading.group(1)
+                        continue
+            elif line.lstrip().startswith(fence):
+                fence = None
+                parts.append(line)
+                size += len(line) + 1
+                continue
+        if fence is None and not line.strip():
+            if parts:
+                yield False, "\n".join(parts)
+                parts, size = [], 0
+            continue
+        parts.append(line)
+        size += len(line) + 1
+        if size >= max_chars:
+            yield False, "\n".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield False, "\n".join(parts)
+
+
+# ---------- 各格式解析器 ----------
+
+def parse_text(path: str, section_chars: int = 4000) -> Iterator[Section]:
+    """逐行读取纯文本文件，按空行分段"""
+    return _group(_line_blocks(_read_lines(path), section_chars), section_chars)
+
+
+def parse_markdown(path: str, section_chars: int = 4000) -> Iterator[Section]:
+    """逐行读取 Markdown 文件，按 # 标题分节"""
+    return _group(_line_blocks(_read_lines(path), section_chars, markdown=True), section_chars)
+
+
+class _HTMLBlockParser(HTMLParser):
+    """将 HTML 拆成段落和标题，忽略脚本和样式"""
+
+    BLOCK_TAGS = {
+        "p", "div", "br", "hr", "li", "ul", "ol", "dl", "dt", "dd", "tr", "td", "th", "table",
+        "section", "article", "header", "footer", "main", "aside", "nav", "blockquote", "pre",
+        "figure", "figcaption", "form",
+    }
+    HEADING_TAGS = {"title", "h1", "h2", "h3", "h4", "h5", "h6"}
+    SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[Block] = []
+        self._parts: List[str] = []
+        self._skip = 0
+        self._heading = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip += 1
+        elif tag in self.HEADING_TAGS:
+            self.flush()
+            self._heading = True
+        elif tag in self.BLOCK_TAGS:
+            self.flush()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.HEADING_TAGS or tag in self.BLOCK_TAGS:
+            self.flush()
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._parts.append(data)
+
+    def flush(self) -> None:
+        text = _WHITESPACE.sub(' ', "".join(self._parts)).strip()
+        self._parts = []
+        if text:
+            self.blocks.append((self._heading, text))
+        self._heading = False
+
+    def drain(self) -> List[Block]:
+        blocks, self.blocks = self.blocks, []
+        return blocks
+
+
+def _html_blocks(path: str) -> Iterator[Block]:
+    parser = _HTMLBlockParser()
+    for chunk in _read_chunks(path):
+        parser.feed(chunk)
+        yield from parser.drain()
+    parser.close()
+    parser.flush()
+    yield from parser.drain()
+
+
+def parse_html(path: str, section_chars: int = 4000) -> Iterator[Section]:
+    """分块解析 HTML 文件，按 <title> 和 <h1>-<h6> 分节"""
+    return _group(_html_blocks(path), section_chars)
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def _docx_heading_styles(zf: zipfile.ZipFile) -> set:
+    """从 styles.xml 找出标题样式的 styleId（中文版 Word 的标题样式 ID 是数字，只能按样式名判断）"""
+    try:
+        root = ElementTree.fromstring(zf.read("word/styles.xml"))
+    except KeyError:
+        return set()
+    headings = set()
+    for style in root.iter(f"{_W}style"):
+        name = style.find(f"{_W}name")
+        name = (name.get(f"{_W}val") or "").lower() if name is not None else ""
+        if name.startswith("heading") or name == "title" or style.find(f"{_W}pPr/{_W}outlineLvl") is not None:
+            headings.add(style.get(f"{_W}styleId"))
+    return headings
+
+
+def _docx_text(elem: ElementTree.Element) -> str:
+    parts = []
+    for node in elem.iter():
+        if node.tag == f"{_W}t":
+            parts.append(node.text or "")
+        elif node.tag == f"{_W}tab":
+            parts.append("\t")
+        elif node.tag in (f"{_W}br", f"{_W}cr"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _docx_is_heading(paragraph: ElementTree.Element, headings: set) -> bool:
+    properties = paragraph.find(f"{_W}pPr")
+    if properties is None:
+        return False
+    style = properties.find(f"{_W}pStyle")
+    if style is not None and style.get(f"{_W}val") in headings:
+        return True
+    return properties.find(f"{_W}outlineLvl") is not None
+
+
+def _docx_blocks(path: str, chunk_size: int = 65536) -> Iterator[Block]:
+    with zipfile.ZipFile(path) as zf:
+        headings = _docx_heading_styles(zf)
+        parser = ElementTree.XMLPullParser(events=("start", "end"))
+        stack: List[ElementTree.Element] = []
+        tables = 0
+        with zf.open("word/document.xml") as f:
+            while True:
+                data = f.read(chunk_size)
+                if data:
+                    parser.feed(data)
+                else:
+                    parser.close()
+                for event, elem in parser.read_events():
+                    if event == "start":
+                        stack.append(elem)
+                        if elem.tag == f"{_W}tbl":
+                            tables += 1
+                        continue
+                    stack.pop()
+                    if elem.tag == f"{_W}tbl":
+                        tables -= 1
+                    elif elem.tag == f"{_W}tr":
+                        # 表格按行输出，单元格之间用 | 分隔
+                        cells = [_WHITESPACE.sub(' ', _docx_text(cell)).strip() for cell in elem.iter(f"{_W}tc")]
+                        if any(cells):
+                            yield False, " | ".join(cells)
+                    elif elem.tag == f"{_W}p" and not tables:
+                        text = _docx_text(elem)
+                        if text.strip():
+                            yield _docx_is_heading(elem, headings), text
+                    else:
+                        continue
+                    # 从父元素上摘除已处理的段落和表格行，内存占用不随文档长度增长
+                    elem.clear()
+                    if stack:
+                        stack[-1].remove(elem)
+                if not data:
+                    break
+
+
+def parse_docx(path: str, section_chars: int = 4000) -> Iterator[Section]:
+    """流式解析 DOCX 文件，按标题样式分节"""
+    return _group(_docx_blocks(path), section_chars)
+
+
+def parse_pdf(path: str, section_chars: int = 4000) -> Iterator[Section]:
+    """
+    逐页抽取 PDF 文本，每页一段，没有文本层的扫描页跳过
+
+    pypdf 打开文件时只读取交叉引用表，页面内容在访问时才解析。
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ParseError("解析 PDF 需要安装 pypdf: pip install pypdf") from e
+
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        # 只设置了权限密码的 PDF 可以用空密码打开
+        reader.decrypt("")
+    index = 0
+    for number in range(len(reader.pages)):
+        text = (reader.pages[number].extract_text() or "").strip()
+        if text:
+            yield Section(text, index, page=number + 1)
+            index += 1
+
+
+PARSERS: Dict[str, Callable[[str, int], Iterator[Section]]] = {
+    ".pdf": parse_pdf,
+    ".docx": parse_docx,
+    ".html": parse_html,
+    ".htm": parse_html,
+    ".md": parse_markdown,
+    ".markdown": parse_markdown,
+    ".txt": parse_text,
+}
+
+# 文件没有扩展名时按上传时的 Content-Type 判断
+CONTENT_TYPES = {
+    "application/pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "text/html": ".html",
+    "text/markdown": ".md",
+    "text/x-markdown": ".md",
+    "text/plain": ".txt",
+}
+
+
+def get_parser(path: str, file_type: Optional[str] = None) -> Callable[[str, int], Iterator[Section]]:
+    """
+    按扩展名或 Content-Type 选择解析器
+
+    Raises:
+        ParseError: 不支持的文件类型
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in PARSERS:
+        content_type = (file_type or "").split(";")[0].strip().lower()
+        extension = CONTENT_TYPES.get(content_type, extension)
+    parser = PARSERS.get(extension)
+    if parser is None:
+        raise ParseError(f"不支持的文件类型: {extension or file_type}")
+    return parser
+
+
+def parse_document(path: str, file_type: Optional[str] = None, section_chars: int = 4000) -> Iterator[Section]:
+    """
+    惰性解析文档
+
+    Args:
+        path: 文件路径
+        file_type: 上传时的 Content-Type，扩展名无法识别时使用
+        section_chars: 非 PDF 文档每段的最大字符数
+
+    Returns:
+        Section 迭代器
+    """
+    return get_parser(path, file_type)(path, section_chars)
+
+
+def _temp_prefix(output_path: str) -> str:
+    # 临时文件带上输出文件名，同一目录下其他文件的解析任务不会被误删
+    return f".{os.path.basename(output_path)}."
+
+
+def remove_partial_output(output_path: str) -> int:
+    """删除 parse_to_file 被强制终止后残留的临时文件，返回删除数量"""
+    output_dir = os.path.dirname(output_path) or "."
+    prefix = _temp_prefix(output_path)
+    removed = 0
+    try:
+        names = os.listdir(output_dir)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if name.startswith(prefix) and name.endswith(".tmp"):
+            try:
+                os.remove(os.path.join(output_dir, name))
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def parse_to_file(path: str, output_path: str, file_type: Optional[str] = None,
+                  section_chars: int = 4000) -> Dict[str, Any]:
+    """
+    解析文档并逐段写入 JSONL 文件，写完后原子替换
+
+    Returns:
+        统计信息：sections、chars、pages（PDF 中最后一个有文本的页码）、output
+
+    Raises:
+        ParseError: 文件类型不支持或没有提取到任何文本
+    """
+    output_dir = os.path.dirname(output_path) or "."
+    os.makedirs(output_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, prefix=_temp_prefix(output_path), suffix=".tmp")
+    sections = chars = 0
+    pages = None
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for section in parse_document(path, file_type, section_chars):
+                f.write(json.dumps(section.to_dict(), ensure_ascii=False))
+                f.write("\n")
+                sections += 1
+                chars += len(section.text)
+                pages = section.page or pages
+        if not sections:
+            raise ParseError("未能从文件中提取到文本")
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return {"sections": sections, "chars": chars, "pages": pages, "output": output_path}
+
+
+def read_sections(output_path: str) -> Iterator[Dict[str, Any]]:
+    """逐段读取 parse_to_file 写出的解析结果"""
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
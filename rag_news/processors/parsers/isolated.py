@@ -0,0 +1,154 @@
+"""
+@comment: 在独立子进程中解析文档，限制耗时和内存
+
+几百页的 PDF 解析动辄数十秒、占用上百 MB 内存，损坏的文件还可能让解析库卡死或内存暴涨，
+不能放在 API 进程里执行。每个文件在一个新的子进程中解析：子进程启动时用 RLIMIT_AS 设置内存上限，
+超出时抛出 MemoryError 而不是拖垮整台机器；父进程等待超时或任务被取消时直接终止子进程。
+解析完成后子进程退出，解析库占用的内存随之全部归还系统。
+
+用法:
+    job = ParseJob("report.pdf", "report.jsonl", memory_limit_mb=1024)
+    job.start()
+    try:
+        result = job.wait(timeout=600)
+    finally:
+        job.terminate()
+"""
+
+import multiprocessing
+from typing import Any, Dict, Optional
+
+from .document_parser import ParseError, parse_to_file, remove_partial_output
+
+
+class ParseTimeout(ParseError):
+    """解析超时"""
+
+
+def _limit_memory(memory_limit_mb: Optional[int]) -> None:
+    if not memory_limit_mb:
+        return
+    try:
+        import resource
+    except ImportError:
+        # Windows 没有 resource 模块，只能依赖超时
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _child_main(conn, path: str, output_path: str, file_type: Optional[str],
+                section_chars: int, memory_limit_mb: Optional[int]) -> None:
+    """子进程入口，结果或错误信息通过管道发回父进程"""
+    try:
+        _limit_memory(memory_limit_mb)
+        message = ("ok", parse_to_file(path, output_path, file_type, section_chars))
+    except MemoryError:
+        message = ("error", f"MemoryError: 超出内存上限 {memory_limit_mb} MB")
+    except BaseException as e:
+        message = ("error", f"{type(e).__name__}: {e}")
+    try:
+        conn.send(message)
+    finally:
+        conn.close()
+
+
+class ParseJob:
+    """单个文件的子进程解析任务"""
+
+    def __init__(self, path: str, output_path: str, file_type: Optional[str] = None,
+                 section_chars: int = 4000, memory_limit_mb: Optional[int] = 1024):
+        """
+        初始化任务
+
+        Args:
+            path: 待解析文件路径
+            output_path: 解析结果 JSONL 路径
+            file_type: 上传时的 Content-Type
+            section_chars: 非 PDF 文档每段的最大字符数
+            memory_limit_mb: 子进程地址空间上限（MB），None 表示不限制
+        """
+        self.path = path
+        self.output_path = output_path
+        self.file_type = file_type
+        self.section_chars = section_chars
+        self.memory_limit_mb = memory_limit_mb
+        self._process = None
+        self._conn = None
+        self._waiting = False
+
+    def start(self) -> None:
+        # API 进程里有事件循环线程和数据库连接，用 spawn 而不是 fork 启动干净的子进程
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_child_main,
+            args=(child_conn, self.path, self.output_path, self.file_type,
+                  self.section_chars, self.memory_limit_mb),
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        阻塞等待解析结果
+
+        Returns:
+            parse_to_file 的统计信息
+
+        Raises:
+            ParseTimeout: 超时，子进程已被终止
+            ParseError: 解析失败或子进程异常退出
+        """
+        self._waiting = True
+        try:
+            if not self._conn.poll(timeout):
+                self._waiting = False
+                self.terminate()
+                raise ParseTimeout(f"解析超时（{timeout} 秒）")
+            try:
+                status, payload = self._conn.recv()
+            except EOFError:
+                # 子进程没有发回结果就退出了：被终止、被系统 OOM killer 杀掉或解析库崩溃
+                self._process.join(5)
+                raise ParseError(f"解析进程异常退出，exitcode={self._process.exitcode}")
+        finally:
+            self._waiting = False
+            self._process.join(5)
+            self._conn.close()
+        if status != "ok":
+            raise ParseError(payload)
+        return payload
+
+    def terminate(self) -> None:
+        """
+        终止子进程，已经结束的任务调用也是安全的
+
+        可以在另一个线程阻塞于 wait() 时调用：子进程退出后管道关闭，wait() 随即抛出 ParseError。
+        被强制终止的子进程来不及清理临时文件，由这里删除。
+        """
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+            self._process.join(5)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+            remove_partial_output(self.output_path)
+        if self._conn is not None and not self._waiting:
+            self._conn.close()
+
+
+def parse_isolated(path: str, output_path: str, file_type: Optional[str] = None,
+                   timeout: Optional[float] = 600, section_chars: int = 4000,
+                   memory_limit_mb: Optional[int] = 1024) -> Dict[str, Any]:
+    """在子进程中解析文档并等待结果，参数见 ParseJob"""
+    job = ParseJob(path, output_path, file_type, section_chars, memory_limit_mb)
+    job.start()
+    try:
+        return job.wait(timeout)
+    finally:
+        job.terminate()
@@ -0,0 +1,249 @@
+"""
+@comment: 父子块（small-to-big）索引
+
+文档先按句子合并成不超过 PARENT_CHUNK_SIZE 的父块，每个父块再切成不超过 CHUNK_SIZE 的子块。
+只有子块用于向量化检索；检索命中后扩展到所在父块，同一文档中相邻或重叠的父块合并成一段上下文。
+父块和子块都只记录在原文中的 (start, end) 偏移，原文只存一份，不会因为父子两级而重复存储文本。
+
+用法:
+    index = ParentChildIndex()
+    chunks = index.add_document(doc_id, text)       # [(chunk_id, 子块文本)] 交给向量化
+    contexts = index.expand({chunk_id: score, ...})  # 命中的子块 -> 合并后的父块上下文
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .sentence_splitter import SentenceSplitter, Span
+
+
+class ChildChunk:
+    """子块，记录自身和所属父块在原文中的偏移"""
+
+    __slots__ = ("chunk_id", "doc_id", "start", "end", "parent_start", "parent_end")
+
+    def __init__(self, chunk_id: str, doc_id: str, start: int, end: int,
+                 parent_start: int, parent_end: int):
+        self.chunk_id = chunk_id
+        self.doc_id = doc_id
+        self.start = start
+        self.end = end
+        self.parent_start = parent_start
+        self.parent_end = parent_end
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "chunk_id": self.chunk_id,
+            "doc_id": self.doc_id,
+            "start": self.start,
+            "end": self.end,
+            "parent_start": self.parent_start,
+            "parent_end": self.parent_end,
+        }
+
+
+class ParentChildSplitter:
+    """将文档切分为父块和子块的偏移"""
+
+    def __init__(self, child_size: int = 400, parent_size: int = 800,
+                 sentence_splitter: Optional[SentenceSplitter] = None):
+        """
+        初始化切分器，默认值与 main_config 中的 CHUNK_SIZE、PARENT_CHUNK_SIZE 一致
+
+        Args:
+            child_size: 子块大小（字符）
+            parent_size: 父块大小（字符）
+            sentence_splitter: 分句器
+        """
+        if child_size > parent_size:
+            raise ValueError("子块不能大于父块")
+        self.child_size = child_size
+        self.parent_size = parent_size
+        self.sentence_splitter = sentence_splitter or SentenceSplitter()
+
+    @classmethod
+    def from_config(cls) -> "ParentChildSplitter":
+        """使用 main_config 中的分割配置创建切分器"""
+        from rag_news.configs.main_config import CHUNK_SIZE, PARENT_CHUNK_SIZE
+        return cls(CHUNK_SIZE, PARENT_CHUNK_SIZE, SentenceSplitter.from_config())
+
+    def split(self, doc_id: str, text: str) -> List[ChildChunk]:
+        """
+        切分文档
+
+        Returns:
+            子块列表，按在原文中的位置排序
+        """
+        sentences = self.sentence_splitter.split_spans(text)
+        children: List[ChildChunk] = []
+        parents = self.sentence_splitter.chunk_spans(text, self.parent_size, sentences)
+        index = 0
+        for parent_start, parent_end in parents:
+            # 取出落在该父块内的句子，再合并成子块
+            parent_sentences: List[Span] = []
+            while index < len(sentences) and sentences[index][1] <= parent_end:
+                parent_sentences.append(sentences[index])
+                index += 1
+            for start, end in self.sentence_splitter.chunk_spans(text, self.child_size, parent_sentences):
+                children.append(ChildChunk(f"{doc_id}#{len(children)}", doc_id, start, end,
+                                           parent_start, parent_end))
+        return children
+
+
+class ParentChildIndex:
+    """父子块索引：原文存储一份，子块和父块都只存偏移"""
+
+    def __init__(self, db_path: Optional[str] = 'data/chunk_index.db',
+                 splitter: Optional[ParentChildSplitter] = None, merge_gap: int = 2):
+        """
+        初始化索引
+
+        Args:
+            db_path: SQLite 数据库路径，None 表示内存数据库
+            splitter: 父子块切分器
+            merge_gap: 两个父块间隔不超过该字符数时视为相邻并合并
+        """
+        self.splitter = splitter or ParentChildSplitter()
+        self.merge_gap = merge_gap
+        if db_path:
+            Path(db_path).parent.mkdir(exist_ok=True, parents=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path or ":memory:", check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents (doc_id TEXT PRIMARY KEY, text TEXT NOT NULL, "
+            "metadata TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "chunk_id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, start INTEGER NOT NULL, "
+            "end INTEGER NOT NULL, parent_start INTEGER NOT NULL, parent_end INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks (doc_id, start)")
+
+    def add_document(self, doc_id: str, text: str, metadata: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+        存储文档并生成子块，已存在的同 ID 文档会被替换
+
+        Args:
+            doc_id: 文档 ID
+            text: 文档全文
+            metadata: 附加信息（JSON 字符串）
+
+        Returns:
+            [(chunk_id, 子块文本)]，用于向量化
+        """
+        children = self.splitter.split(doc_id, text)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO documents (doc_id, text, metadata) VALUES (?, ?, ?)",
+                    (doc_id, text, metadata)
+                )
+                self._conn.executemany(
+                    "INSERT INTO chunks (chunk_id, doc_id, start, end, parent_start, parent_end) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(c.chunk_id, c.doc_id, c.start, c.end, c.parent_start, c.parent_end) for c in children]
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(c.chunk_id, text[c.start:c.end]) for c in children]
+
+    def delete_document(self, doc_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+    def _slice(self, doc_id: str, start: int, end: int) -> str:
+        # SQLite 的 substr 对 TEXT 按字符计数，从 1 开始；只取需要的片段，不读出全文
+        row = self._conn.execute(
+            "SELECT substr(text, ?, ?) FROM documents WHERE doc_id = ?", (start + 1, end - start, doc_id)
+        ).fetchone()
+        return row[0] if row else ""
+
+    def get_chunks(self, chunk_ids: Iterable[str]) -> Dict[str, ChildChunk]:
+        """按 ID 获取子块偏移"""
+        chunk_ids = list(chunk_ids)
+        result = {}
+        with self._lock:
+            for i in range(0, len(chunk_ids), 900):
+                batch = chunk_ids[i:i + 900]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT chunk_id, doc_id, start, end, parent_start, parent_end FROM chunks "
+                    f"WHERE chunk_id IN ({placeholders})", batch
+                ).fetchall()
+                for row in rows:
+                    result[row[0]] = ChildChunk(*row)
+        return result
+
+    def chunk_text(self, chunk_id: str) -> Optional[str]:
+        """获取子块文本"""
+        chunk = self.get_chunks([chunk_id]).get(chunk_id)
+        if chunk is None:
+            return None
+        with self._lock:
+            return self._slice(chunk.doc_id, chunk.start, chunk.end)
+
+    def expand(self, hits: Dict[str, float], max_contexts: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        将命中的子块扩展为父块上下文，同一文档中相邻或重叠的父块合并
+
+        Args:
+            hits: 子块 ID -> 相似度分数
+            max_contexts: 最多返回的上下文数量
+
+        Returns:
+            按分数从高到低排列的上下文列表，每项包含 doc_id、start、end、text、score、chunk_ids
+        """
+        chunks = self.get_chunks(hits)
+        by_doc: Dict[str, List[ChildChunk]] = {}
+        for chunk in chunks.values():
+            by_doc.setdefault(chunk.doc_id, []).append(chunk)
+
+        contexts: List[Dict[str, Any]] = []
+        for doc_id, doc_chunks in by_doc.items():
+            doc_chunks.sort(key=lambda c: (c.parent_start, c.parent_end))
+            current: Optional[Dict[str, Any]] = None
+            for chunk in doc_chunks:
+                score = hits[chunk.chunk_id]
+                if current is not None and chunk.parent_start <= current["end"] + self.merge_gap:
+                    current["end"] = max(current["end"], chunk.parent_end)
+                    current["score"] = max(current["score"], score)
+                    current["chunk_ids"].append(chunk.chunk_id)
+                    continue
+                current = {
+                    "doc_id": doc_id,
+                    "start": chunk.parent_start,
+                    "end": chunk.parent_end,
+                    "score": score,
+                    "chunk_ids": [chunk.chunk_id],
+                }
+                contexts.append(current)
+
+        contexts.sort(key=lambda c: c["score"], reverse=True)
+        if max_contexts is not None:
+            contexts = contexts[:max_contexts]
+        with self._lock:
+            for context in contexts:
+                context["text"] = self._slice(context["doc_id"], context["start"], context["end"])
+        return contexts
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            documents, chars = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length(text)), 0) FROM documents"
+            ).fetchone()
+            chunks = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        return {"documents": documents, "chars": chars, "chunks": chunks}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
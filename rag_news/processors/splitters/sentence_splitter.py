@@ -0,0 +1,229 @@
+"""
+@comment: 中英文混排新闻的分句器
+
+一次正则扫描找出全部句子边界，返回 (start, end) 偏移而不是复制出的子串，超长句子在逗号、
+分号等次级标点处再切分，仍然过长时按长度硬切（英文尽量落在空格处）。split_iter 惰性产出，
+split_stream 接受分块读入的文本流，超长文档无需整体载入内存。
+
+分句结果可以进一步按中英文各自的块大小（ZH_chunk_size / EN_chunk_size）合并成文本块。
+"""
+
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .text_splitter import TextSplitter
+
+Span = Tuple[int, int]
+
+# 句末：中文句号、问号、叹号、省略号，英文问号、叹号，后面可跟引号或右括号；
+# 英文句点要求后面是空白或文本结尾，避免切开小数和网址；换行始终是边界
+_SENTENCE_END = re.compile(
+    r'[。！？!?…]+[”’"\'」』》）)\]]*'
+    r'|\.+[”’"\'」』》）)\]]*(?=\s|$)'
+    r'|\n'
+)
+# 超长句子的次级切分点
+_CLAUSE_END = re.compile(r'[，,；;、：:]+[”’"\'」』）)\]]*')
+_SPACE = re.compile(r'\s*')
+# 句点前是这些缩写或连续的首字母缩写（J.K. Rowling、U.S.A.）时不是句末
+_ABBREVIATION = re.compile(
+    r'\b(?:Mr|Mrs|Ms|Dr|Prof|Sr|Jr|St|vs|etc|Inc|Ltd|Corp|Co|No|Gen|Gov|Sen|Rep|U\.S|U\.K|e\.g|i\.e'
+    r'|(?:[A-Z]\.)+[A-Z])$'
+)
+# 单个大写字母后的句点只有在下一个词小写开头时才视为缩写，"Plan B. Then" 仍在句点处断开
+_INITIAL = re.compile(r'\b[A-Z]$')
+_LOWER_NEXT = re.compile(r'\s+[a-z]')
+_CJK = re.compile(r'[㐀-鿿豈-﫿]')
+
+
+def is_chinese(text: str, start: int = 0, end: Optional[int] = None, sample: int = 2000) -> bool:
+    """根据汉字占比判断文本是否以中文为主，只抽样前 sample 个字符"""
+    end = len(text) if end is None else end
+    end = min(end, start + sample)
+    if end <= start:
+        return False
+    cjk = len(_CJK.findall(text, start, end))
+    return cjk * 4 >= (end - start)
+
+
+class SentenceSplitter(TextSplitter):
+    """中英文分句器"""
+
+    def __init__(self, max_sentence_chars: int = 100, zh_chunk_size: int = 600,
+                 en_chunk_size: int = 1500):
+        """
+        初始化分句器，默认值与 main_config 中的 SENTENCE_SIZE、ZH_chunk_size、EN_chunk_size 一致
+
+        Args:
+            max_sentence_chars: 单句最大长度，超过时在次级标点处切分或硬切
+            zh_chunk_size: 中文文本块大小（字符）
+            en_chunk_size: 英文文本块大小（字符）
+        """
+        self.max_sentence_chars = max_sentence_chars
+        self.zh_chunk_size = zh_chunk_size
+        self.en_chunk_size = en_chunk_size
+
+    @classmethod
+    def from_config(cls) -> "SentenceSplitter":
+        """使用 main_config 中的分割配置创建分句器"""
+        from rag_news.configs.main_config import SENTENCE_SIZE, ZH_chunk_size, EN_chunk_size
+        return cls(SENTENCE_SIZE, ZH_chunk_size, EN_chunk_size)
+
+    # ---------- 分句 ----------
+
+    def split_iter(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Span]:
+        """
+        惰性产出句子的 (start, end) 偏移，已去掉首尾空白，空句子跳过
+
+        Args:
+            text: 文本
+            start: 起始位置
+            end: 结束位置，默认文本末尾
+        """
+        for sentence_start, sentence_end in self._sentences(text, start, end):
+            yield from self._emit(text, sentence_start, sentence_end)
+
+    def _sentences(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Span]:
+        """按句末标点切分，产出未经长度处理的原始句子区间"""
+        end = len(text) if end is None else end
+        pos = start
+        for match in _SENTENCE_END.finditer(text, start, end):
+            boundary = match.end()
+            if match.group() == '\n':
+                sentence_end = match.start()
+            else:
+                if match.group()[0] == '.' and self._is_abbreviation(text, pos, match.start(), boundary, end):
+                    continue
+                sentence_end = boundary
+            yield pos, sentence_end
+            pos = boundary
+        yield pos, end
+
+    @staticmethod
+    def _is_abbreviation(text: str, pos: int, dot: int, after: int, end: int) -> bool:
+        """判断 dot 处的英文句点是否属于缩写，pos 为当前句子起点，after 为句点之后的位置"""
+        if _ABBREVIATION.search(text, max(pos, dot - 6), dot):
+            return True
+        return bool(_INITIAL.search(text, max(pos, dot - 2), dot) and _LOWER_NEXT.match(text, after, end))
+
+    def _emit(self, text: str, start: int, end: int) -> Iterator[Span]:
+        start = _SPACE.match(text, start, end).end()
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end <= start:
+            return
+        if end - start <= self.max_sentence_chars:
+            yield start, end
+            return
+        # 超长句子先在次级标点处切分
+        pos = start
+        for match in _CLAUSE_END.finditer(text, start, end):
+            if match.end() - pos >= self.max_sentence_chars // 2:
+                yield from self._hard_cut(text, pos, match.end())
+                pos = _SPACE.match(text, match.end(), end).end()
+        if pos < end:
+            yield from self._hard_cut(text, pos, end)
+
+    def _hard_cut(self, text: str, start: int, end: int) -> Iterator[Span]:
+        limit = self.max_sentence_chars
+        while end - start > limit:
+            cut = start + limit
+            # 英文尽量在空格处断开
+            space = text.rfind(' ', start + limit // 2, cut)
+            if space > 0:
+                cut = space
+            yield start, cut
+            start = _SPACE.match(text, cut, end).end()
+        if end > start:
+            yield start, end
+
+    def split_spans(self, text: str) -> List[Span]:
+        """返回全部句子的 (start, end) 偏移"""
+        return list(self.split_iter(text))
+
+    def split(self, text: str, **kwargs) -> List[str]:
+        """分割文本为句子列表
+
+        Args:
+            text: 要分割的文本
+            **kwargs: 其他参数
+
+        Returns:
+            句子列表
+        """
+        return [text[s:e] for s, e in self.split_iter(text)]
+
+    def split_stream(self, chunks: Iterable[str]) -> Iterator[Tuple[int, int, str]]:
+        """
+        对分块读入的文本流分句，适合超大文件
+
+        每次只保留最后一个可能不完整的句子，内存占用与单句长度相当。
+
+        Args:
+            chunks: 文本块迭代器，例如按固定大小读取的文件
+
+        Returns:
+            (全局 start, 全局 end, 句子文本) 的迭代器
+        """
+        buffer = ""
+        offset = 0
+        # 单句超过该长度时不再等待句末，先输出已切好的部分
+        max_carry = self.max_sentence_chars * 64
+        for chunk in chunks:
+            if not chunk:
+                continue
+            buffer += chunk
+            carry = 0
+            # 句点后只剩空白时要看下一块的首个单词才能判断是否为缩写，也留到下一块
+            tail = len(buffer.rstrip())
+            for sentence_start, sentence_end in self._sentences(buffer):
+                # 最后一句可能还没结束，留到下一块继续
+                if sentence_end >= tail:
+                    carry = sentence_start
+                    break
+                for s, e in self._emit(buffer, sentence_start, sentence_end):
+                    yield offset + s, offset + e, buffer[s:e]
+                carry = sentence_end
+            if len(buffer) - carry > max_carry:
+                spans = list(self._emit(buffer, carry, len(buffer)))
+                for s, e in spans[:-1]:
+                    yield offset + s, offset + e, buffer[s:e]
+                carry = spans[-1][0]
+            buffer = buffer[carry:]
+            offset += carry
+        for s, e in self.split_iter(buffer):
+            yield offset + s, offset + e, buffer[s:e]
+
+    # ---------- 合并成块 ----------
+
+    def chunk_size_for(self, text: str, start: int = 0, end: Optional[int] = None) -> int:
+        """按文本语言选择块大小"""
+        return self.zh_chunk_size if is_chinese(text, start, end) else self.en_chunk_size
+
+    def chunk_spans(self, text: str, chunk_size: Optional[int] = None,
+                    sentences: Optional[Iterable[Span]] = None) -> List[Span]:
+        """
+        将句子依次合并成不超过 chunk_size 的文本块，块不会切断句子
+
+        Args:
+            text: 文本
+            chunk_size: 块大小（字符），默认按语言选择
+            sentences: 已经计算好的句子偏移，默认重新分句
+
+        Returns:
+            文本块的 (start, end) 偏移列表
+        """
+        chunk_size = chunk_size or self.chunk_size_for(text)
+        chunks: List[Span] = []
+        chunk_start = chunk_end = None
+        for start, end in (sentences if sentences is not None else self.split_iter(text)):
+            if chunk_start is None:
+                chunk_start, chunk_end = start, end
+            elif end - chunk_start <= chunk_size:
+                chunk_end = end
+            else:
+                chunks.append((chunk_start, chunk_end))
+                chunk_start, chunk_end = start, end
+        if chunk_start is not None:
+            chunks.append((chunk_start, chunk_end))
+        return chunks
@@ -0,0 +1,131 @@
+"""
+@comment: 按 token 数切分文本
+
+字符数和 token 数之比在中英文之间相差数倍，按字符切分要么超出向量模型的长度被截断，要么大量浪费。
+这里整篇文档只编码一次，把句子边界映射到 token 下标后贪心装箱：每块尽量装满 max_tokens，
+优先在句末断开；装不到 min_fill 比例时改为在 token 边界硬切，保证既不截断也不欠填。
+
+token 上限只对同一个分词器有意义：按向量模型的 LOCAL_EMBED_MAX_LENGTH 切分时，必须用该模型
+自己的分词器计数（见 from_config），用 cl100k 计数会在中文上低估 token 数，切出的块仍会被截断。
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple
+
+from rag_news.utils.tokens import TokenCounter, get_hf_encoder, get_token_counter
+
+from .sentence_splitter import SentenceSplitter, Span
+from .text_splitter import TextSplitter
+
+
+class TokenSplitter(TextSplitter):
+    """按 token 数装箱的文本分割器"""
+
+    def __init__(self, max_tokens: int = 512, reserved_tokens: int = 0, min_fill: float = 0.8,
+                 counter: Optional[TokenCounter] = None,
+                 sentence_splitter: Optional[SentenceSplitter] = None):
+        """
+        初始化分割器
+
+        Args:
+            max_tokens: 每块最大 token 数，按 counter 的分词器计
+            reserved_tokens: 为模型特殊 token（如 [CLS]、[SEP]）预留的数量
+            min_fill: 在句末断开时每块至少达到的填充比例，达不到则在 token 边界硬切
+            counter: token 计数器，默认使用进程内共享的 cl100k 计数器；
+                max_tokens 来自某个模型的长度上限时，应传入使用该模型分词器的计数器
+            sentence_splitter: 分句器
+        """
+        self.limit = max_tokens - reserved_tokens
+        if self.limit <= 0:
+            raise ValueError("max_tokens 必须大于 reserved_tokens")
+        self.min_fill = min_fill
+        self.counter = counter or get_token_counter()
+        self.sentence_splitter = sentence_splitter or SentenceSplitter()
+
+    @classmethod
+    def from_config(cls, reserved_tokens: int = 2, model_path: Optional[str] = None) -> "TokenSplitter":
+        """
+        按 main_config 中本地向量模型的最大长度创建分割器
+
+        LOCAL_EMBED_MAX_LENGTH 是向量模型（LOCAL_EMBED_PATH）自身分词器的 token 数，
+        因此计数使用从模型目录加载的分词器，而不是 cl100k。
+
+        Args:
+            reserved_tokens: 为 [CLS]、[SEP] 等特殊 token 预留的数量
+            model_path: 向量模型目录，默认 LOCAL_EMBED_PATH
+
+        Raises:
+            ImportError: 没有安装 tokenizers
+            FileNotFoundError: 模型目录下没有分词器文件
+        """
+        from rag_news.configs.main_config import LOCAL_EMBED_MAX_LENGTH, LOCAL_EMBED_PATH
+        counter = TokenCounter(get_hf_encoder(model_path or LOCAL_EMBED_PATH))
+        return cls(LOCAL_EMBED_MAX_LENGTH, reserved_tokens, counter=counter,
+                   sentence_splitter=SentenceSplitter.from_config())
+
+    def split_with_counts(self, text: str) -> List[Tuple[int, int, int]]:
+        """
+        切分文本
+
+        Returns:
+            [(start, end, token 数)]，每块 token 数不超过 max_tokens - reserved_tokens
+        """
+        tokens = self.counter.encode(text)
+        if len(tokens) <= self.limit:
+            span = self._trim(text, 0, len(text))
+            return [(span[0], span[1], len(tokens))] if span else []
+
+        offsets = self.counter.token_offsets(text, tokens)
+        total = len(tokens)
+        # 句末字符偏移 -> 该位置之前的 token 数，即可以断开的 token 下标
+        boundaries = sorted({bisect_left(offsets, end) for _, end in self.sentence_splitter.split_iter(text)})
+
+        chunks: List[Tuple[int, int, int]] = []
+        i = 0
+        while i < total:
+            j = self._next_cut(boundaries, i, total)
+            while True:
+                span = self._trim(text, offsets[i], offsets[j] if j < total else len(text))
+                if span is None:
+                    break
+                # 重新编码核对：BPE 在断点两侧的合并方式可能不同
+                count = self.counter.count(text[span[0]:span[1]])
+                if count <= self.limit or j - i <= 1:
+                    chunks.append((span[0], span[1], count))
+                    break
+                j -= count - self.limit
+            i = j
+        return chunks
+
+    def _next_cut(self, boundaries: List[int], i: int, total: int) -> int:
+        hard = min(total, i + self.limit)
+        if hard == total:
+            return total
+        k = bisect_right(boundaries, hard) - 1
+        if k >= 0 and boundaries[k] > i and boundaries[k] - i >= self.limit * self.min_fill:
+            return boundaries[k]
+        return hard
+
+    @staticmethod
+    def _trim(text: str, start: int, end: int) -> Optional[Span]:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return (start, end) if end > start else None
+
+    def split_spans(self, text: str) -> List[Span]:
+        """返回每块的 (start, end) 偏移"""
+        return [(start, end) for start, end, _ in self.split_with_counts(text)]
+
+    def split(self, text: str, **kwargs) -> List[str]:
+        """分割文本
+
+        Args:
+            text: 要分割的文本
+            **kwargs: 其他参数
+
+        Returns:
+            每块不超过 token 上限的文本列表
+        """
+        return [text[start:end] for start, end, _ in self.split_with_counts(text)]
@@ -0,0 +1,300 @@
+"""
+自适应轮询调度器
+
+常驻进程，按每个源各自的间隔轮询。间隔根据该源观测到的条目变化率和失败情况自适应调整：
+变化快的源缩短间隔，变化慢的源拉长间隔，失败时指数退避，每次调度附加随机抖动。
+全局并发数有上限；调度状态持久化到文件，重启后按原计划继续，逾期的源会被打散，
+不会在启动瞬间集中请求上游。
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import orjson
+
+from .sources import source_manager
+from .delta import FingerprintStore
+from .main import refresh_source, write_ndjson, SOURCE_TIMEOUT, DEFAULT_CONCURRENCY
+
+# 没有声明 interval 的源使用的默认轮询间隔（秒）
+DEFAULT_INTERVAL = 300
+
+# 调度器的指纹单独存放，不与命令行 --delta 共用，两边互不消耗对方的增量
+SCHEDULER_FINGERPRINT_DIR = 'cache/fingerprints/scheduler'
+
+
+class SourceState:
+    """单个源的调度状态"""
+
+    def __init__(self, source_id: str, interval: float, next_run: float = 0.0,
+                 last_run: Optional[float] = None, churn: float = 0.0,
+                 error_rate: float = 0.0, consecutive_errors: int = 0):
+        self.source_id = source_id
+        self.interval = interval  # 当前自适应间隔（不含退避和抖动）
+        self.next_run = next_run
+        self.last_run = last_run
+        self.churn = churn  # 变化率的指数移动平均，0~1
+        self.error_rate = error_rate  # 失败率的指数移动平均，0~1
+        self.consecutive_errors = consecutive_errors
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'interval': self.interval,
+            'next_run': self.next_run,
+            'last_run': self.last_run,
+            'churn': self.churn,
+            'error_rate': self.error_rate,
+            'consecutive_errors': self.consecutive_errors,
+        }
+
+    @classmethod
+    def from_dict(cls, source_id: str, data: Dict[str, Any]) -> "SourceState":
+        return cls(source_id, **data)
+
+
+class AdaptiveScheduler:
+    """自适应轮询调度器"""
+
+    def __init__(self, state_file: str = 'cache/scheduler_state.json',
+                 concurrency: int = DEFAULT_CONCURRENCY, timeout: float = SOURCE_TIMEOUT,
+                 min_interval: float = 60, max_interval: float = 3600,
+                 high_churn: float = 0.3, low_churn: float = 0.05,
+                 speedup: float = 0.7, slowdown: float = 1.3,
+                 smoothing: float = 0.3, jitter: float = 0.1,
+                 on_update: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None,
+                 source_ids: Optional[List[str]] = None,
+                 fingerprints: Optional[FingerprintStore] = None):
+        """
+        初始化调度器
+
+        Args:
+            state_file: 调度状态持久化文件
+            concurrency: 全局最大并发数
+            timeout: 单次轮询超时时间（秒）
+            min_interval: 最小轮询间隔（秒）
+            max_interval: 最大轮询间隔（秒），同时也是退避上限
+            high_churn: 变化率高于该值时缩短间隔
+            low_churn: 变化率低于该值时拉长间隔
+            speedup: 缩短间隔的倍数
+            slowdown: 拉长间隔的倍数
+            smoothing: 变化率/失败率指数移动平均的平滑系数
+            jitter: 随机抖动比例，如 0.1 表示 ±10%
+            on_update: 每次成功轮询后的回调，参数为 (源ID, 增量条目列表)
+            source_ids: 只调度这些源，默认调度所有源
+            fingerprints: 计算增量用的指纹存储，默认使用调度器专用目录
+        """
+        self.state_file = Path(state_file)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.high_churn = high_churn
+        self.low_churn = low_churn
+        self.speedup = speedup
+        self.slowdown = slowdown
+        self.smoothing = smoothing
+        self.jitter = jitter
+        self.on_update = on_update
+        self.source_ids = source_ids or list(source_manager.get_all_sources().keys())
+        self.fingerprints = fingerprints or FingerprintStore(SCHEDULER_FINGERPRINT_DIR)
+        self.states: Dict[str, SourceState] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stop_event: Optional[asyncio.Event] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def load_state(self) -> None:
+        """加载持久化的调度状态，间隔按当前的最小 / 最大间隔重新限定，逾期的源在 min_interval 内打散"""
+        saved: Dict[str, Any] = {}
+        try:
+            saved = orjson.loads(self.state_file.read_bytes())
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取调度状态失败，重新开始调度: {e}", file=sys.stderr)
+
+        now = time.time()
+        for source_id in self.source_ids:
+            if source_id in saved:
+                state = SourceState.from_dict(source_id, saved[source_id])
+                # 命令行调整了最小 / 最大间隔时，已持久化的源也立即生效
+                state.interval = self._clamp(state.interval)
+            else:
+                source = source_manager.get_source(source_id)
+                interval = getattr(source, 'interval', None) or DEFAULT_INTERVAL
+                state = SourceState(source_id, self._clamp(interval))
+            if state.next_run <= now:
+                # 逾期或首次调度的源随机分布在接下来的 min_interval（不超过自身间隔）内，
+                # 避免重启后同时请求，又不会让逾期的源再等上一个完整间隔
+                state.next_run = now + random.uniform(0, min(state.interval, self.min_interval))
+            self.states[source_id] = state
+
+    def save_state(self) -> None:
+        """原子地保存调度状态"""
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        data = orjson.dumps({source_id: state.to_dict() for source_id, state in self.states.items()})
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_file.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.state_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def stop(self) -> None:
+        """请求停止调度"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    async def run(self) -> None:
+        """运行调度循环，直到 stop() 被调用"""
+        self._stop_event = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        self.load_state()
+        print(f"调度器启动，共 {len(self.states)} 个源，最大并发 {self.concurrency}")
+
+        try:
+            while not self._stop_event.is_set():
+                now = time.time()
+                for source_id, state in self.states.items():
+                    if state.next_run <= now and source_id not in self._running:
+                        task = asyncio.ensure_future(self._poll(source_id, semaphore))
+                        self._running[source_id] = task
+                        task.add_done_callback(lambda _, sid=source_id: self._on_done(sid))
+
+                waiting = [s.next_run for sid, s in self.states.items() if sid not in self._running]
+                delay = max(0.0, min(waiting) - time.time()) if waiting else self.max_interval
+                self._wakeup.clear()
+                stop_wait = asyncio.ensure_future(self._stop_event.wait())
+                wakeup_wait = asyncio.ensure_future(self._wakeup.wait())
+                await asyncio.wait([stop_wait, wakeup_wait], timeout=delay,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                stop_wait.cancel()
+                wakeup_wait.cancel()
+        finally:
+            for task in self._running.values():
+                task.cancel()
+            if self._running:
+                await asyncio.gather(*self._running.values(), return_exceptions=True)
+            self.save_state()
+            print("调度器已停止，状态已保存")
+
+    def _on_done(self, source_id: str) -> None:
+        self._running.pop(source_id, None)
+        self.save_state()
+        # 该源的下一次运行时间已更新，唤醒调度循环重新计算等待时间
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _poll(self, source_id: str, semaphore: asyncio.Semaphore) -> None:
+        """轮询单个源并更新其调度状态"""
+        state = self.states[source_id]
+        async with semaphore:
+            start = time.time()
+            try:
+                items = await asyncio.wait_for(refresh_source(source_id), self.timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._record_failure(state)
+                print(f"轮询{source_id}失败（连续{state.consecutive_errors}次），"
+                      f"{state.next_run - time.time():.0f}秒后重试: {e!r}", file=sys.stderr)
+                return
+            if not items:
+                # 空结果多半是源页面改版或被限流，按失败处理，也不用它覆盖指纹
+                self._record_failure(state)
+                print(f"轮询{source_id}没有返回条目（连续{state.consecutive_errors}次），"
+                      f"{state.next_run - time.time():.0f}秒后重试", file=sys.stderr)
+                return
+
+        delta = self.fingerprints.diff(source_id, items)
+        self._record_success(state, len(delta) / len(items), start)
+        print(f"轮询{source_id}: {len(items)}条，变化{len(delta)}条，"
+              f"下次间隔{state.next_run - time.time():.0f}秒")
+        if self.on_update is not None and delta:
+            try:
+                self.on_update(source_id, delta)
+            except Exception as e:
+                print(f"处理{source_id}的更新失败: {e!r}", file=sys.stderr)
+
+    def _record_success(self, state: SourceState, churn: float, start: float) -> None:
+        """根据本次变化率和近期失败率调整间隔"""
+        a = self.smoothing
+        state.churn = a * churn + (1 - a) * state.churn
+        state.error_rate = (1 - a) * state.error_rate
+        state.consecutive_errors = 0
+        state.last_run = start
+
+        if state.churn > self.high_churn:
+            state.interval = self._clamp(state.interval * self.speedup)
+        elif state.churn < self.low_churn:
+            state.interval = self._clamp(state.interval * self.slowdown)
+        # 近期频繁失败的源即使本次成功也适当放慢
+        state.next_run = time.time() + self._jittered(state.interval * (1 + state.error_rate))
+
+    def _record_failure(self, state: SourceState) -> None:
+        """失败后按连续失败次数指数退避"""
+        a = self.smoothing
+        state.error_rate = a + (1 - a) * state.error_rate
+        state.consecutive_errors += 1
+        backoff = min(self.max_interval, state.interval * (2 ** state.consecutive_errors))
+        state.next_run = time.time() + self._jittered(backoff)
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _jittered(self, delay: float) -> float:
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="热榜自适应轮询调度器")
+    parser.add_argument("-s", "--source", action="append", help="只调度指定的源ID，可重复指定")
+    parser.add_argument("-o", "--output", help="以 NDJSON 追加写出每次轮询的增量条目")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="全局最大并发数")
+    parser.add_argument("--timeout", type=float, default=SOURCE_TIMEOUT, help="单次轮询超时时间（秒）")
+    parser.add_argument("--min-interval", type=float, default=60, help="最小轮询间隔（秒）")
+    parser.add_argument("--max-interval", type=float, default=3600, help="最大轮询间隔（秒）")
+    parser.add_argument("--state-file", default="cache/scheduler_state.json", help="调度状态文件")
+    args, _ = parser.parse_known_args()
+
+    out = None
+    on_update = None
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        out = open(args.output, 'ab')
+
+        def on_update(source_id: str, items: List[Dict[str, Any]]) -> None:
+            write_ndjson(out, source_id, items)
+
+    scheduler = AdaptiveScheduler(
+        state_file=args.state_file, concurrency=args.concurrency, timeout=args.timeout,
+        min_interval=args.min_interval, max_interval=args.max_interval,
+        on_update=on_update, source_ids=args.source
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, scheduler.stop)
+        except NotImplementedError:
+            # Windows 不支持 add_signal_handler，依赖 KeyboardInterrupt 退出
+            pass
+
+    try:
+        await scheduler.run()
+    finally:
+        if out is not None:
+            out.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
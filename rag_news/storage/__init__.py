@@ -1,17 +1,20 @@
 """
 RAG News 存储模块
 
-提供文档存储、向量存储和元数据管理功能
+提供文档存储、向量存储、元数据管理和原始页面存档功能
 """
 
-from rag_news.storage.base import BaseStorage
-from rag_news.storage.document_store import DocumentStore
-from rag_news.storage.vector_store import VectorStore
-from rag_news.storage.metadata_store import MetadataStore
+from rag_news.storage.page_archive import PageArchive
 
-__all__ = [
-    'BaseStorage',
-    'DocumentStore',
-    'VectorStore',
-    'MetadataStore'
-]
+__all__ = ['PageArchive']
+
+# 文档、向量和元数据存储尚未全部实现，缺失时不影响页面存档等已有模块的导入
+try:
+    from rag_news.storage.base import BaseStorage
+    from rag_news.storage.document_store import DocumentStore
+    from rag_news.storage.vector_store import VectorStore
+    from rag_news.storage.metadata_store import MetadataStore
+except ImportError:
+    pass
+else:
+    __all__ += ['BaseStorage', 'DocumentStore', 'VectorStore', 'MetadataStore']
@@ -0,0 +1,309 @@
+"""
+@comment: 按内容寻址、zstd 压缩的原始页面存档
+
+抓取到的 HTML / Markdown 以内容的 SHA-256 为键保存，相同内容只存一份。数据用 zstd 压缩，
+可以用已存档的页面训练字典，同一站点模板高度相似的页面压缩率会明显提升。
+另有 URL -> 内容哈希 -> 抓取时间 的索引，解析逻辑修改后可以直接从本地重放历史抓取，无需重新联网。
+
+目录结构:
+    <root>/index.db                     抓取记录、内容块索引和当前字典 ID（SQLite）
+    <root>/objects/ab/cd/<sha256>.zst   压缩后的内容块
+    <root>/dicts/<dict_id>.zdict        训练得到的 zstd 字典
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import zstandard
+
+
+class PageArchive:
+    """原始页面存档"""
+
+    def __init__(self, root: str = 'data/page_archive', compress_level: int = 6,
+                 use_dictionary: bool = True, fsync: bool = False):
+        """
+        初始化页面存档
+
+        Args:
+            root: 存档根目录
+            compress_level: zstd 压缩级别
+            use_dictionary: 存在已训练的字典时是否用它压缩新内容
+            fsync: 重命名前是否 fsync
+        """
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.dicts_dir = self.root / "dicts"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.dicts_dir.mkdir(parents=True, exist_ok=True)
+        self.compress_level = compress_level
+        self.use_dictionary = use_dictionary
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            "hash TEXT PRIMARY KEY, size INTEGER NOT NULL, stored_size INTEGER NOT NULL, "
+            "dict_id INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fetches ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, kind TEXT NOT NULL, "
+            "hash TEXT NOT NULL, fetched_at REAL NOT NULL, status_code INTEGER, content_type TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_fetches_url ON fetches (url, kind, fetched_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_fetches_time ON fetches (fetched_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        # zstd 压缩/解压对象不能被多个线程同时使用，按线程各自持有
+        self._local = threading.local()
+        self._dicts: Dict[int, zstandard.ZstdCompressionDict] = {}
+        self._current_dict_id = self._latest_dict_id() if use_dictionary else 0
+
+    # ---------- 字典 ----------
+
+    def _latest_dict_id(self) -> int:
+        # zstd 字典 ID 是随机数，不能按大小判断新旧，当前字典 ID 单独记录在 meta 表中
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'current_dict_id'").fetchone()
+        if row is not None:
+            return int(row[0])
+        # 兼容没有 meta 表时训练的字典：取最后写入的字典文件
+        paths = [p for p in self.dicts_dir.glob("*.zdict") if p.stem.isdigit()]
+        return int(max(paths, key=lambda p: p.stat().st_mtime).stem) if paths else 0
+
+    def _dictionary(self, dict_id: int) -> zstandard.ZstdCompressionDict:
+        if dict_id not in self._dicts:
+            data = (self.dicts_dir / f"{dict_id}.zdict").read_bytes()
+            self._dicts[dict_id] = zstandard.ZstdCompressionDict(data)
+        return self._dicts[dict_id]
+
+    def train_dictionary(self, sample_count: int = 2000, dict_size: int = 112640,
+                         min_samples: int = 10) -> int:
+        """
+        用最近存档的内容训练 zstd 字典，之后写入的内容使用新字典压缩
+
+        Args:
+            sample_count: 训练样本数量
+            dict_size: 字典大小（字节）
+            min_samples: 可用样本少于该数量时不训练
+
+        Returns:
+            新字典的 ID
+
+        Raises:
+            ValueError: 可用样本不足（内容块文件缺失的记录会被跳过）
+        """
+        with self._lock:
+            hashes = [row[0] for row in self._conn.execute(
+                "SELECT hash FROM blobs ORDER BY created_at DESC LIMIT ?", (sample_count,)
+            )]
+        samples = [sample for sample in (self.get(h) for h in hashes) if sample]
+        if len(samples) < min_samples:
+            raise ValueError(f"可用于训练字典的样本不足: {len(samples)} < {min_samples}")
+        dictionary = zstandard.train_dictionary(dict_size, samples)
+        dict_id = dictionary.dict_id()
+        self._write_file(self.dicts_dir / f"{dict_id}.zdict", dictionary.as_bytes())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('current_dict_id', ?)", (str(dict_id),)
+            )
+        self._dicts[dict_id] = dictionary
+        self._current_dict_id = dict_id
+        # 已缓存的压缩对象绑定了旧字典，需要重建
+        self._local = threading.local()
+        return dict_id
+
+    def _compressor(self) -> Tuple[int, zstandard.ZstdCompressor]:
+        dict_id = self._current_dict_id if self.use_dictionary else 0
+        cached = getattr(self._local, 'compressor', None)
+        if cached is None or cached[0] != dict_id:
+            kwargs = {"dict_data": self._dictionary(dict_id)} if dict_id else {}
+            cached = (dict_id, zstandard.ZstdCompressor(level=self.compress_level, **kwargs))
+            self._local.compressor = cached
+        return cached
+
+    def _decompressor(self, dict_id: int) -> zstandard.ZstdDecompressor:
+        if not hasattr(self._local, 'decompressors'):
+            self._local.decompressors = {}
+        if dict_id not in self._local.decompressors:
+            kwargs = {"dict_data": self._dictionary(dict_id)} if dict_id else {}
+            self._local.decompressors[dict_id] = zstandard.ZstdDecompressor(**kwargs)
+        return self._local.decompressors[dict_id]
+
+    # ---------- 读写 ----------
+
+    def _object_path(self, content_hash: str) -> Path:
+        return self.objects_dir / content_hash[:2] / content_hash[2:4] / f"{content_hash}.zst"
+
+    def _write_file(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def put(self, url: str, content: Union[str, bytes], kind: str = "html",
+            fetched_at: Optional[float] = None, status_code: Optional[int] = None,
+            content_type: Optional[str] = None) -> str:
+        """
+        存档一次抓取结果
+
+        Args:
+            url: 页面地址
+            content: 页面内容，str 按 UTF-8 编码
+            kind: 内容类型，如 'html'、'markdown'
+            fetched_at: 抓取时间，默认当前时间
+            status_code: HTTP 状态码
+            content_type: Content-Type
+
+        Returns:
+            内容的 SHA-256 哈希
+        """
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        content_hash = hashlib.sha256(data).hexdigest()
+        fetched_at = fetched_at or time.time()
+
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+        if not exists:
+            dict_id, compressor = self._compressor()
+            compressed = compressor.compress(data)
+            self._write_file(self._object_path(content_hash), compressed)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO blobs (hash, size, stored_size, dict_id, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (content_hash, len(data), len(compressed), dict_id, time.time())
+                )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO fetches (url, kind, hash, fetched_at, status_code, content_type) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, kind, content_hash, fetched_at, status_code, content_type)
+            )
+        return content_hash
+
+    def get(self, content_hash: str) -> Optional[bytes]:
+        """按内容哈希读取内容，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT dict_id FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+        if row is None:
+            return None
+        try:
+            compressed = self._object_path(content_hash).read_bytes()
+        except FileNotFoundError:
+            print(f"存档内容丢失: {content_hash}")
+            return None
+        return self._decompressor(row[0]).decompress(compressed)
+
+    def get_text(self, content_hash: str, encoding: str = "utf-8") -> Optional[str]:
+        data = self.get(content_hash)
+        return data.decode(encoding, errors="replace") if data is not None else None
+
+    def latest(self, url: str, kind: str = "html", before: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        获取 URL 最近一次（或某时间点之前最近一次）的抓取记录
+
+        Returns:
+            {url, kind, hash, fetched_at, status_code, content_type}，没有记录时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, kind, hash, fetched_at, status_code, content_type FROM fetches "
+                "WHERE url = ? AND kind = ? AND fetched_at <= ? ORDER BY fetched_at DESC LIMIT 1",
+                (url, kind, before if before is not None else float("inf"))
+            ).fetchone()
+        return self._fetch_record(row) if row else None
+
+    def history(self, url: str, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """获取 URL 的全部抓取记录，按时间排序"""
+        sql = "SELECT url, kind, hash, fetched_at, status_code, content_type FROM fetches WHERE url = ?"
+        params: Tuple = (url,)
+        if kind:
+            sql += " AND kind = ?"
+            params += (kind,)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY fetched_at", params).fetchall()
+        return [self._fetch_record(row) for row in rows]
+
+    def replay(self, since: float = 0, until: Optional[float] = None, kind: Optional[str] = "html",
+               latest_only: bool = True) -> Iterator[Tuple[Dict[str, Any], bytes]]:
+        """
+        按抓取时间重放存档，用于修改解析逻辑后重新处理
+
+        Args:
+            since: 起始时间戳
+            until: 结束时间戳，默认不限
+            kind: 只重放该类型的内容，None 表示全部
+            latest_only: 每个 URL 只重放时间范围内最近一次抓取
+
+        Returns:
+            (抓取记录, 内容) 的迭代器
+        """
+        sql = ("SELECT url, kind, hash, MAX(fetched_at), status_code, content_type FROM fetches "
+               if latest_only else
+               "SELECT url, kind, hash, fetched_at, status_code, content_type FROM fetches ")
+        sql += "WHERE fetched_at >= ? AND fetched_at <= ?"
+        params: Tuple = (since, until if until is not None else float("inf"))
+        if kind:
+            sql += " AND kind = ?"
+            params += (kind,)
+        sql += " GROUP BY url, kind ORDER BY 4" if latest_only else " ORDER BY fetched_at"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        for row in rows:
+            content = self.get(row[2])
+            if content is not None:
+                yield self._fetch_record(row), content
+
+    @staticmethod
+    def _fetch_record(row: Tuple) -> Dict[str, Any]:
+        return {
+            "url": row[0],
+            "kind": row[1],
+            "hash": row[2],
+            "fetched_at": row[3],
+            "status_code": row[4],
+            "content_type": row[5],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """返回存档统计信息"""
+        with self._lock:
+            blobs, size, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs"
+            ).fetchone()
+            fetches, urls = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT url) FROM fetches").fetchone()
+        return {
+            "fetches": fetches,
+            "urls": urls,
+            "blobs": blobs,
+            "raw_bytes": size,
+            "stored_bytes": stored,
+            "compression_ratio": size / stored if stored else 0,
+            "dict_id": self._current_dict_id,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,5 +1,6 @@
-import newspaper
-from newspaper import news_pool
+import asyncio
+
+from rag_news.collectors.crawlers.article_collector import ArticleCollector
 
 class FreeNewsCrawler:
     def __init__(self):
@@ -11,30 +12,18 @@ class FreeNewsCrawler:
         ]
     
     def parallel_scrape(self):
-        papers = [newspaper.build(url) for url in self.news_sources]
-        news_pool.set(papers, threads_per_source=2)
-        news_pool.join()
-        
-        all_articles = []
-        for paper in papers:
-            for article in paper.articles:
-                try:
-                    article.download()
-                    article.parse()
-                    all_articles.append({
-                        'title': article.title,
-                        'text': article.text,
-                        'url': article.url,
-                        'publish_date': article.publish_date,
-                        'source': paper.brand
-                    })
-                except:
-                    continue
-        
-        return all_articles
+        # 异步并发下载，正文抽取放到进程池；失败按来源统计而不是静默跳过
+        async def scrape():
+            async with ArticleCollector() as collector:
+                articles = await collector.collect_sites(self.news_sources)
+                for source, stats in collector.report().items():
+                    print(source, stats)
+                return articles
+
+        return asyncio.run(scrape())
     
 
 if __name__ == "__main__":
     crawler = FreeNewsCrawler()
     articles = crawler.parallel_scrape()
-    print(articles)
\ No newline at end of file
+    print(articles)
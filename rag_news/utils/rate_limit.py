@@ -0,0 +1,95 @@
+"""
+@comment: 按主机的令牌桶限流
+
+同一主机的所有请求共享一个令牌桶：按固定速率补充令牌，允许一定的突发容量。
+遇到 429 或验证码时可以让整个主机暂停一段时间（退避），暂停对共享该限流器的所有批次生效。
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """异步令牌桶"""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量，即允许的突发请求数
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """等待直到获得指定数量的令牌"""
+        # 加锁保证等待者按先来后到获得令牌
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """暂停发放令牌一段时间，并清空已积累的突发容量"""
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0
+        self.updated = max(self.updated, self.paused_until)
+
+
+class HostRateLimiter:
+    """按主机分配令牌桶的限流器"""
+
+    def __init__(self, rate: float = 0.2, capacity: float = 2,
+                 per_host: Optional[Dict[str, tuple]] = None):
+        """
+        初始化限流器
+
+        Args:
+            rate: 默认每秒请求数
+            capacity: 默认突发容量
+            per_host: 个别主机的 (rate, capacity) 配置
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.per_host = per_host or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def bucket(self, url: str) -> TokenBucket:
+        """获取 URL 所属主机的令牌桶"""
+        host = self.host_of(url)
+        if host not in self._buckets:
+            rate, capacity = self.per_host.get(host, (self.rate, self.capacity))
+            self._buckets[host] = TokenBucket(rate, capacity)
+        return self._buckets[host]
+
+    async def acquire(self, url: str) -> None:
+        """等待直到允许向 URL 所属主机发起请求"""
+        await self.bucket(url).acquire()
+
+    def backoff(self, url: str, seconds: float) -> None:
+        """让 URL 所属主机暂停一段时间"""
+        self.bucket(url).pause(seconds)
@@ -0,0 +1,45 @@
+"""
+@comment: 异步请求合并（single-flight）
+
+同一个键同时只执行一次异步调用，其余并发调用方等待同一个结果（包括异常）。
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """按键合并并发的异步调用"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        执行 func(*args, **kwargs)，若同一键已有调用在进行中则等待其结果
+
+        Args:
+            key: 合并键
+            func: 异步函数
+
+        Returns:
+            调用结果；调用抛出的异常会传递给所有等待方
+        """
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        # shield 保证某个调用方被取消时不会取消共享的调用
+        return await asyncio.shield(future)
+
+    def in_flight(self, key: str) -> bool:
+        """判断某个键是否有调用正在进行"""
+        return key in self._calls
+
+    def _forget(self, key: str, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # 标记异常已被读取，避免所有调用方都取消时出现 "exception was never retrieved"
+        if not future.cancelled():
+            future.exception()
@@ -0,0 +1,194 @@
+"""
+@comment: 基于 tiktoken 的批量 token 计数
+
+tiktoken 编码器加载一次需要读取并解析 BPE 词表，每个进程只加载一次后复用；批量计数时未命中缓存的
+文本交给 encode_ordinary_batch 多线程编码，重复出现的文本（页眉页脚、模板段落等）直接命中缓存。
+
+不同模型的分词器切出的 token 数相差很大，例如 cl100k 与 BERT 类中文向量模型在中文上可差一倍。
+按某个模型的长度上限切分时，应使用该模型自己的分词器计数：HuggingFace 模型目录下的分词器
+可以用 get_hf_encoder 加载后传给 TokenCounter。
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Iterable, List, Union
+
+import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoder(name: str = DEFAULT_ENCODING) -> tiktoken.Encoding:
+    """获取 tiktoken 编码器，同一进程内每种编码只加载一次"""
+    return tiktoken.get_encoding(name)
+
+
+class HFTokenizerEncoding:
+    """将 HuggingFace tokenizers 分词器包装成 TokenCounter 使用的 tiktoken 风格接口，不计入特殊 token"""
+
+    def __init__(self, tokenizer: Any):
+        """
+        Args:
+            tokenizer: tokenizers.Tokenizer 或 tokenizers.implementations 中的分词器
+        """
+        self.tokenizer = tokenizer
+        # 计数需要完整的 token 序列，关闭模型配置里可能带的截断和补齐
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+
+    def encode_ordinary(self, text: str) -> List[int]:
+        return self.tokenizer.encode(text, add_special_tokens=False).ids
+
+    def encode_ordinary_batch(self, texts: List[str], num_threads: int = 8) -> List[List[int]]:
+        # tokenizers 自带多线程批量编码，线程数由其自身管理
+        return [encoding.ids for encoding in self.tokenizer.encode_batch(texts, add_special_tokens=False)]
+
+    def token_offsets(self, text: str) -> List[int]:
+        """返回文本编码后每个 token 在原文中的起始字符偏移"""
+        offsets = []
+        position = 0
+        for start, _ in self.tokenizer.encode(text, add_special_tokens=False).offsets:
+            # 个别分词器的偏移不是单调的，取累计最大值以便二分查找
+            position = max(position, start)
+            offsets.append(position)
+        return offsets
+
+
+@lru_cache(maxsize=None)
+def get_hf_encoder(model_path: str) -> HFTokenizerEncoding:
+    """
+    加载 HuggingFace 模型目录下的分词器，同一进程内每个目录只加载一次
+
+    Args:
+        model_path: 模型目录，包含 tokenizer.json 或 BERT 类模型的 vocab.txt
+
+    Raises:
+        ImportError: 没有安装 tokenizers
+        FileNotFoundError: 目录下没有可用的分词器文件
+    """
+    try:
+        from tokenizers import Tokenizer
+        from tokenizers.implementations import BertWordPieceTokenizer
+    except ImportError as e:
+        raise ImportError("加载模型分词器需要安装 tokenizers: pip install tokenizers") from e
+
+    tokenizer_file = os.path.join(model_path, "tokenizer.json")
+    if os.path.exists(tokenizer_file):
+        return HFTokenizerEncoding(Tokenizer.from_file(tokenizer_file))
+    vocab_file = os.path.join(model_path, "vocab.txt")
+    if os.path.exists(vocab_file):
+        return HFTokenizerEncoding(BertWordPieceTokenizer(vocab_file))
+    raise FileNotFoundError(f"{model_path} 下没有 tokenizer.json 或 vocab.txt")
+
+
+class TokenCounter:
+    """带 LRU 缓存的 token 计数器"""
+
+    def __init__(self, encoding: Union[str, tiktoken.Encoding, HFTokenizerEncoding] = DEFAULT_ENCODING,
+                 cache_size: int = 100_000, num_threads: int = 8):
+        """
+        初始化计数器
+
+        Args:
+            encoding: tiktoken 编码名称、tiktoken.Encoding 实例，或 get_hf_encoder 加载的模型分词器
+            cache_size: 缓存的文本数量
+            num_threads: 批量编码的线程数
+        """
+        self.encoder = get_encoder(encoding) if isinstance(encoding, str) else encoding
+        self.cache_size = cache_size
+        self.num_threads = num_threads
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(text: str) -> str:
+        # 长文本用摘要作键，避免缓存本身占用大量内存
+        if len(text) <= 256:
+            return text
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def encode(self, text: str) -> List[int]:
+        """编码文本，特殊 token 按普通文本处理"""
+        return self.encoder.encode_ordinary(text)
+
+    def token_offsets(self, text: str, tokens: List[int]) -> List[int]:
+        """返回 encode(text) 得到的 tokens 中每个 token 在原文中的起始字符偏移"""
+        if isinstance(self.encoder, HFTokenizerEncoding):
+            return self.encoder.token_offsets(text)
+        _, offsets = self.encoder.decode_with_offsets(tokens)
+        return offsets
+
+    def count(self, text: str) -> int:
+        """统计单个文本的 token 数"""
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts: Iterable[str]) -> List[int]:
+        """
+        批量统计 token 数
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            与输入顺序一致的 token 数列表
+        """
+        texts = list(texts)
+        keys = [self._key(text) for text in texts]
+        counts: List[int] = [0] * len(texts)
+        missing: "OrderedDict[str, List[int]]" = OrderedDict()
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    counts[i] = cached
+                    self.hits += 1
+                else:
+                    # 同一批次内重复的文本只编码一次
+                    missing.setdefault(key, []).append(i)
+
+        if missing:
+            batch = [texts[positions[0]] for positions in missing.values()]
+            encoded = self.encoder.encode_ordinary_batch(batch, num_threads=self.num_threads)
+            with self._lock:
+                for (key, positions), tokens in zip(missing.items(), encoded):
+                    for i in positions:
+                        counts[i] = len(tokens)
+                    self.misses += 1
+                    self._cache[key] = len(tokens)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return counts
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0,
+        }
+
+
+_default_counter = None
+
+
+def get_token_counter() -> TokenCounter:
+    """获取进程内共享的默认计数器"""
+    global _default_counter
+    if _default_counter is None:
+        _default_counter = TokenCounter()
+    return _default_counter
+
+
+def count_tokens(texts: Union[str, Iterable[str]]):
+    """统计一个或一批文本的 token 数"""
+    if isinstance(texts, str):
+        return get_token_counter().count(texts)
+    return get_token_counter().count_batch(texts)
@@ -2,6 +2,7 @@
 """
 热榜爬虫启动脚本
 """
+import os
 import sys
 import asyncio
 import argparse
@@ -13,6 +14,7 @@ def main():
     
     # 导入rag_news模块
     from rag_news.sources import source_manager
+    from rag_news.main import DEFAULT_CONCURRENCY, SOURCE_TIMEOUT
     
     # 创建命令行参数解析器
     parser = argparse.ArgumentParser(description="热榜爬虫")
@@ -21,6 +23,13 @@ def main():
     parser.add_argument("-l", "--list", action="store_true", help="列出所有可用的源")
     parser.add_argument("--no-cache", action="store_true", help="不使用缓存")
     parser.add_argument("--force", action="store_true", help="强制刷新缓存")
+    parser.add_argument("--swr", action="store_true", help="缓存软过期后先返回旧数据并在后台刷新")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同时抓取的最大源数量")
+    parser.add_argument("--timeout", type=float, default=SOURCE_TIMEOUT, help="单个源的超时时间（秒）")
+    parser.add_argument("--deadline", type=float, default=None, help="抓取所有源的整体截止时间（秒）")
+    parser.add_argument("--stream", choices=["item", "source"],
+                        help="以 NDJSON 流式输出到 -o 指定的文件（'-' 为标准输出），每行一个条目或一个源")
+    parser.add_argument("--delta", action="store_true", help="只输出相比上次增量抓取新增或变化的条目")
     parser.add_argument("--top", type=int, default=0, help="只显示前N条结果，默认显示全部")
     args = parser.parse_args()
     
@@ -29,7 +38,7 @@ def main():
     
     # 如果指定了--top参数，设置环境变量
     if args.top > 0:
-        sys.environ["RAG_NEWS_TOP_N"] = str(args.top)
+        os.environ["RAG_NEWS_TOP_N"] = str(args.top)
     
     # 运行爬虫
     asyncio.run(crawler_main())
@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+"""
+热榜自适应轮询调度器启动脚本
+"""
+import sys
+import asyncio
+
+def main():
+    """主函数，启动调度器"""
+    # 将当前目录添加到模块搜索路径，以便导入rag_news模块
+    sys.path.insert(0, ".")
+    
+    from rag_news.scheduler import main as scheduler_main
+    
+    # 运行调度器，直到收到 SIGINT / SIGTERM
+    asyncio.run(scheduler_main())
+
+if __name__ == "__main__":
+    main()